@@ -8,17 +8,31 @@ from typing import List, Optional
 from datetime import datetime, timedelta
 import logging
 
+try:
+    from sqlalchemy.orm import Session
+except ImportError:
+    Session = None
+
 from database import (
-    get_db, is_database_enabled,
+    get_session, iso_timestamp, enum_value, money_sum, is_database_enabled,
     User, UserTier,
     Payout, PayoutStatus,
     Job, Clip, Campaign, MarketplaceJob
 )
 from auth import get_current_user
+from cache import TTLCache, user_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+# Dashboard aggregates change slowly but are polled often
+ADMIN_STATS_TTL = 30  # seconds
+admin_stats_cache = TTLCache(ttl=ADMIN_STATS_TTL, maxsize=8)
+
+# Upper bounds for list pagination (deep pages should use the `before` cursor)
+MAX_PAGE_SIZE = 500
+MAX_OFFSET = 1_000_000
+
 
 # ============================================================================
 # ADMIN CHECK
@@ -31,6 +45,13 @@ async def require_admin(current_user: dict = Depends(get_current_user)):
     return current_user
 
 
+def get_admin_db():
+    """Dependency yielding a pooled DB session (503 when no database is configured)"""
+    if not is_database_enabled():
+        raise HTTPException(status_code=503, detail="Database not configured")
+    yield from get_session()
+
+
 # ============================================================================
 # MODELS
 # ============================================================================
@@ -62,40 +83,48 @@ class StatsResponse(BaseModel):
 # ============================================================================
 
 @router.get("/stats", response_model=StatsResponse)
-async def get_admin_stats(admin: dict = Depends(require_admin)):
-    """Get admin dashboard statistics"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+async def get_admin_stats(admin: dict = Depends(require_admin), db: Session = Depends(get_admin_db)):
+    """Get admin dashboard statistics (cached for ADMIN_STATS_TTL seconds)"""
+    cached = admin_stats_cache.get("stats")
+    if cached is not None:
+        return cached
     
-    db = get_db()
-    try:
-        total_users = db.query(User).count()
-        verified_users = db.query(User).filter(User.email_verified == True).count()
-        total_jobs = db.query(Job).count()
-        completed_jobs = db.query(Job).filter(Job.status == "completed").count()
-        total_clips = db.query(Clip).count()
-        
-        # Calculate total revenue from clips
-        clips_revenue = db.query(Clip).all()
-        total_revenue = sum(c.revenue or 0 for c in clips_revenue)
-        
-        # Pending payouts
-        pending_payouts = db.query(Payout).filter(Payout.status == PayoutStatus.PENDING).all()
-        pending_count = len(pending_payouts)
-        pending_amount = sum(p.amount for p in pending_payouts)
-        
-        return StatsResponse(
-            total_users=total_users,
-            verified_users=verified_users,
-            total_jobs=total_jobs,
-            completed_jobs=completed_jobs,
-            total_clips=total_clips,
-            total_revenue=total_revenue,
-            pending_payouts=pending_count,
-            pending_payout_amount=pending_amount
-        )
-    finally:
-        db.close()
+    from sqlalchemy import func, case
+    
+    # One conditional-aggregate query per table instead of one query per number
+    total_users, verified_users = db.query(
+        func.count(User.id),
+        func.count(case((User.email_verified == True, 1)))
+    ).one()
+    total_jobs, completed_jobs = db.query(
+        func.count(Job.id),
+        func.count(case((Job.status == "completed", 1)))
+    ).one()
+    
+    # Total revenue from clips (summed and rounded to cents in SQL)
+    total_clips, total_revenue = db.query(
+        func.count(Clip.id),
+        money_sum(Clip.revenue)
+    ).one()
+    
+    # Pending payouts
+    pending_count, pending_amount = db.query(
+        func.count(Payout.id),
+        money_sum(Payout.amount)
+    ).filter(Payout.status == PayoutStatus.PENDING).one()
+    
+    stats = StatsResponse(
+        total_users=total_users,
+        verified_users=verified_users,
+        total_jobs=total_jobs,
+        completed_jobs=completed_jobs,
+        total_clips=total_clips,
+        total_revenue=total_revenue,
+        pending_payouts=pending_count,
+        pending_payout_amount=pending_amount
+    )
+    admin_stats_cache.set("stats", stats)
+    return stats
 
 
 # ============================================================================
@@ -105,115 +134,104 @@ async def get_admin_stats(admin: dict = Depends(require_admin)):
 @router.get("/users")
 async def list_users(
     admin: dict = Depends(require_admin),
-    limit: int = Query(50, le=200),
-    offset: int = 0,
+    db: Session = Depends(get_admin_db),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_OFFSET),
+    before: Optional[datetime] = None,
     search: Optional[str] = None
 ):
-    """List all users with optional search"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    """List all users with optional search (`before` = last row's created_at for keyset paging)"""
+    # Only the columns the listing returns (skips password hashes, tokens, etc.) as plain
+    # rows; tier default and timestamp formatting happen in SQL when the dialect allows
+    created_col = iso_timestamp(User.created_at)
+    query = db.query(
+        User.id, User.email, User.credits,
+        enum_value(User.tier, "bronze").label("tier"),
+        User.is_admin, User.email_verified, User.disabled, User.total_clips, User.total_earnings,
+        (User.created_at if created_col is None else created_col).label("created_at")
+    )
     
-    db = get_db()
-    try:
-        query = db.query(User)
-        
-        if search:
-            query = query.filter(User.email.ilike(f"%{search}%"))
-        
-        users = query.order_by(User.created_at.desc()).offset(offset).limit(limit).all()
-        
-        return [
-            {
-                "id": u.id,
-                "email": u.email,
-                "credits": u.credits,
-                "tier": u.tier.value if u.tier else "bronze",
-                "is_admin": u.is_admin,
-                "email_verified": u.email_verified,
-                "disabled": u.disabled,
-                "total_clips": u.total_clips,
-                "total_earnings": u.total_earnings,
-                "created_at": u.created_at.isoformat() if u.created_at else None
-            }
-            for u in users
-        ]
-    finally:
-        db.close()
+    if search:
+        query = query.filter(User.email.ilike(f"%{search}%"))
+    if before is not None:
+        query = query.filter(User.created_at < before)
+    
+    rows = query.order_by(User.created_at.desc()).offset(offset).limit(limit).all()
+    
+    return [row._asdict() for row in rows]
 
 
 @router.patch("/users/{user_id}")
 async def update_user(
     user_id: int,
     update: UserUpdate,
-    admin: dict = Depends(require_admin)
+    admin: dict = Depends(require_admin),
+    db: Session = Depends(get_admin_db)
 ):
     """Update user (credits, tier, admin status, etc.)"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    db = get_db()
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        if update.credits is not None:
-            user.credits = update.credits
-        
-        if update.tier is not None:
-            try:
-                user.tier = UserTier[update.tier.upper()]
-            except KeyError:
-                raise HTTPException(status_code=400, detail="Invalid tier")
-        
-        if update.is_admin is not None:
-            user.is_admin = update.is_admin
-        
-        if update.disabled is not None:
-            user.disabled = update.disabled
-        
-        db.commit()
-        
-        return {
-            "message": "User updated",
-            "user_id": user_id,
-            "credits": user.credits,
-            "tier": user.tier.value,
-            "is_admin": user.is_admin,
-            "disabled": user.disabled
-        }
-    finally:
-        db.close()
+    if update.credits is not None:
+        user.credits = update.credits
+    
+    if update.tier is not None:
+        try:
+            user.tier = UserTier[update.tier.upper()]
+        except KeyError:
+            raise HTTPException(status_code=400, detail="Invalid tier")
+    
+    if update.is_admin is not None:
+        user.is_admin = update.is_admin
+    
+    if update.disabled is not None:
+        user.disabled = update.disabled
+    
+    db.commit()
+    user_cache.invalidate(user_id)
+    
+    return {
+        "message": "User updated",
+        "user_id": user_id,
+        "credits": user.credits,
+        "tier": user.tier.value,
+        "is_admin": user.is_admin,
+        "disabled": user.disabled
+    }
 
 
 @router.post("/users/{user_id}/add-credits")
 async def add_credits(
     user_id: int,
     amount: int = Query(..., gt=0),
-    admin: dict = Depends(require_admin)
+    admin: dict = Depends(require_admin),
+    db: Session = Depends(get_admin_db)
 ):
     """Add credits to a user (for manual top-ups or gifts)"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    from sqlalchemy import update, func
     
-    db = get_db()
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user.credits = (user.credits or 0) + amount
-        db.commit()
-        
-        logger.info(f"Admin added {amount} credits to user {user.email}")
-        
-        return {
-            "message": f"Added {amount} credits",
-            "user_id": user_id,
-            "new_balance": user.credits
-        }
-    finally:
-        db.close()
+    # Atomic server-side increment: one round-trip, safe under concurrent grants
+    row = db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(credits=func.coalesce(User.credits, 0) + amount)
+        .returning(User.credits, User.email)
+    ).one_or_none()
+    if row is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
+    db.commit()
+    user_cache.invalidate(user_id)
+    
+    new_balance, email = row
+    logger.info(f"Admin added {amount} credits to user {email}")
+    
+    return {
+        "message": f"Added {amount} credits",
+        "user_id": user_id,
+        "new_balance": new_balance
+    }
 
 
 # ============================================================================
@@ -223,91 +241,81 @@ async def add_credits(
 @router.get("/payouts")
 async def list_payouts(
     admin: dict = Depends(require_admin),
+    db: Session = Depends(get_admin_db),
     status: Optional[str] = None,
-    limit: int = Query(50, le=200),
-    offset: int = 0
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_OFFSET),
+    before: Optional[datetime] = None
 ):
-    """List all payouts"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    """List all payouts (`before` = last row's requested_at for keyset paging)"""
+    # Join the clipper's email in so each payout doesn't need its own user lookup
+    query = db.query(Payout, User.email).outerjoin(User, User.id == Payout.clipper_id)
     
-    db = get_db()
-    try:
-        query = db.query(Payout)
-        
-        if status:
-            try:
-                query = query.filter(Payout.status == PayoutStatus[status.upper()])
-            except KeyError:
-                raise HTTPException(status_code=400, detail="Invalid status")
-        
-        payouts = query.order_by(Payout.requested_at.desc()).offset(offset).limit(limit).all()
-        
-        result = []
-        for p in payouts:
-            # Get user email
-            user = db.query(User).filter(User.id == p.clipper_id).first()
-            result.append({
-                "id": p.id,
-                "clipper_id": p.clipper_id,
-                "clipper_email": user.email if user else "Unknown",
-                "amount": p.amount,
-                "status": p.status.value,
-                "requested_at": p.requested_at.isoformat() if p.requested_at else None,
-                "completed_at": p.completed_at.isoformat() if p.completed_at else None
-            })
-        
-        return result
-    finally:
-        db.close()
+    if status:
+        try:
+            query = query.filter(Payout.status == PayoutStatus[status.upper()])
+        except KeyError:
+            raise HTTPException(status_code=400, detail="Invalid status")
+    if before is not None:
+        query = query.filter(Payout.requested_at < before)
+    
+    rows = query.order_by(Payout.requested_at.desc()).offset(offset).limit(limit).all()
+    
+    result = []
+    for p, clipper_email in rows:
+        result.append({
+            "id": p.id,
+            "clipper_id": p.clipper_id,
+            "clipper_email": clipper_email or "Unknown",
+            "amount": p.amount,
+            "status": p.status.value,
+            "requested_at": p.requested_at,
+            "completed_at": p.completed_at
+        })
+    
+    return result
 
 
 @router.patch("/payouts/{payout_id}")
 async def update_payout(
     payout_id: int,
     update: PayoutUpdate,
-    admin: dict = Depends(require_admin)
+    admin: dict = Depends(require_admin),
+    db: Session = Depends(get_admin_db)
 ):
     """Update payout status (approve, complete, reject)"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    payout = db.query(Payout).filter(Payout.id == payout_id).first()
+    if not payout:
+        raise HTTPException(status_code=404, detail="Payout not found")
     
-    db = get_db()
     try:
-        payout = db.query(Payout).filter(Payout.id == payout_id).first()
-        if not payout:
-            raise HTTPException(status_code=404, detail="Payout not found")
-        
-        try:
-            new_status = PayoutStatus[update.status.upper()]
-        except KeyError:
-            raise HTTPException(status_code=400, detail="Invalid status")
-        
-        payout.status = new_status
-        
-        if new_status == PayoutStatus.PROCESSING:
-            payout.processed_at = datetime.utcnow()
-        elif new_status == PayoutStatus.COMPLETED:
-            payout.completed_at = datetime.utcnow()
-            
-            # Send notification email
-            user = db.query(User).filter(User.id == payout.clipper_id).first()
-            if user:
-                try:
-                    from email_service import send_payout_ready_email
-                    send_payout_ready_email(user.email, payout.amount, payout.id)
-                except Exception as e:
-                    logger.warning(f"Failed to send payout email: {e}")
-        
-        db.commit()
+        new_status = PayoutStatus[update.status.upper()]
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid status")
+    
+    payout.status = new_status
+    
+    if new_status == PayoutStatus.PROCESSING:
+        payout.processed_at = datetime.utcnow()
+    elif new_status == PayoutStatus.COMPLETED:
+        payout.completed_at = datetime.utcnow()
         
-        return {
-            "message": "Payout updated",
-            "payout_id": payout_id,
-            "status": payout.status.value
-        }
-    finally:
-        db.close()
+        # Send notification email
+        user = db.query(User).filter(User.id == payout.clipper_id).first()
+        if user:
+            try:
+                from email_service import send_payout_ready_email
+                send_payout_ready_email(user.email, payout.amount, payout.id)
+            except Exception as e:
+                logger.warning(f"Failed to send payout email: {e}")
+    
+    db.commit()
+    
+    return {
+        "message": "Payout updated",
+        "payout_id": payout_id,
+        "status": payout.status.value
+    }
 
 
 # ============================================================================
@@ -317,67 +325,55 @@ async def update_payout(
 @router.get("/jobs")
 async def list_jobs(
     admin: dict = Depends(require_admin),
+    db: Session = Depends(get_admin_db),
     status: Optional[str] = None,
-    limit: int = Query(50, le=200),
-    offset: int = 0
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_OFFSET)
 ):
     """List all processing jobs"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    query = db.query(Job)
     
-    db = get_db()
-    try:
-        query = db.query(Job)
-        
-        if status:
-            query = query.filter(Job.status == status)
-        
-        jobs = query.order_by(Job.created_at.desc()).offset(offset).limit(limit).all()
-        
-        return [
-            {
-                "id": j.id,
-                "job_id": j.job_id,
-                "user_email": j.user_email,
-                "status": j.status,
-                "progress": j.progress,
-                "num_clips": j.num_clips,
-                "created_at": j.created_at.isoformat() if j.created_at else None,
-                "completed_at": j.completed_at.isoformat() if j.completed_at else None
-            }
-            for j in jobs
-        ]
-    finally:
-        db.close()
+    if status:
+        query = query.filter(Job.status == status)
+    
+    jobs = query.order_by(Job.created_at.desc()).offset(offset).limit(limit).all()
+    
+    return [
+        {
+            "id": j.id,
+            "job_id": j.job_id,
+            "user_email": j.user_email,
+            "status": j.status,
+            "progress": j.progress,
+            "num_clips": j.num_clips,
+            "created_at": j.created_at,
+            "completed_at": j.completed_at
+        }
+        for j in jobs
+    ]
 
 
 @router.get("/recent-activity")
 async def get_recent_activity(
     admin: dict = Depends(require_admin),
+    db: Session = Depends(get_admin_db),
     days: int = Query(7, le=30)
 ):
     """Get recent activity summary"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    since = datetime.utcnow() - timedelta(days=days)
     
-    db = get_db()
-    try:
-        since = datetime.utcnow() - timedelta(days=days)
-        
-        new_users = db.query(User).filter(User.created_at >= since).count()
-        new_jobs = db.query(Job).filter(Job.created_at >= since).count()
-        completed_jobs = db.query(Job).filter(
-            Job.created_at >= since,
-            Job.status == "completed"
-        ).count()
-        new_clips = db.query(Clip).filter(Clip.created_at >= since).count()
-        
-        return {
-            "period_days": days,
-            "new_users": new_users,
-            "new_jobs": new_jobs,
-            "completed_jobs": completed_jobs,
-            "new_clips": new_clips
-        }
-    finally:
-        db.close()
+    new_users = db.query(User).filter(User.created_at >= since).count()
+    new_jobs = db.query(Job).filter(Job.created_at >= since).count()
+    completed_jobs = db.query(Job).filter(
+        Job.created_at >= since,
+        Job.status == "completed"
+    ).count()
+    new_clips = db.query(Clip).filter(Clip.created_at >= since).count()
+    
+    return {
+        "period_days": days,
+        "new_users": new_users,
+        "new_jobs": new_jobs,
+        "completed_jobs": completed_jobs,
+        "new_clips": new_clips
+    }
@@ -0,0 +1,156 @@
+"""
+Small TTL caches for slow-changing, frequently polled responses
+(admin dashboards, health checks, lookups).
+
+TTLCache is in-process only: each worker keeps its own copy, which is fine for
+values that are allowed to be a few seconds stale. UserResponseCache can be
+backed by Redis so invalidations are seen by every worker.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe dict with per-entry expiry and a max size (oldest entry evicted)"""
+
+    def __init__(self, ttl: float, maxsize: int = 128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                # dicts keep insertion order: drop the oldest entry
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def incr(self, key: Hashable, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Increment a counter; the expiry is set when the counter is created and kept after"""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is None and len(self._data) >= self.maxsize:
+                    self._data.pop(next(iter(self._data)))
+                self._data[key] = (now + (self.ttl if ttl is None else ttl), amount)
+                return amount
+            expires, value = entry
+            self._data[key] = (expires, value + amount)
+            return value + amount
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing and storing it on a miss"""
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+
+def _json_default(value):
+    """Encode datetimes the way the API responses render them (ISO-8601)"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class UserResponseCache:
+    """
+    Per-user response cache (keys: user:{id}:{kind}) with explicit invalidation.
+    Stored in Redis when a connection is attached, otherwise in a local TTLCache.
+    Keys always include the user id, so one user can never be served another's data.
+    """
+
+    KINDS = ("profile", "credits")
+
+    def __init__(self, ttl: float, redis=None):
+        self.ttl = ttl
+        self.redis = redis
+        self._local = TTLCache(ttl=ttl, maxsize=4096)
+
+    @staticmethod
+    def _key(user_id, kind: str) -> str:
+        return f"user:{user_id}:{kind}"
+
+    def get(self, user_id, kind: str) -> Optional[dict]:
+        key = self._key(user_id, kind)
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(key)
+                return json.loads(raw) if raw is not None else None
+            except Exception as e:
+                logger.debug(f"User cache read failed for {key}: {e}")
+                return None
+        return self._local.get(key)
+
+    def set(self, user_id, kind: str, value: dict):
+        key = self._key(user_id, kind)
+        if self.redis is not None:
+            try:
+                self.redis.setex(key, int(self.ttl), json.dumps(value, default=_json_default))
+            except Exception as e:
+                logger.debug(f"User cache write failed for {key}: {e}")
+            return
+        self._local.set(key, value)
+
+    def invalidate(self, user_id):
+        """Drop every cached response for a user; call after any write to their row"""
+        keys = [self._key(user_id, kind) for kind in self.KINDS]
+        for key in keys:
+            self._local.pop(key)
+        if self.redis is not None:
+            try:
+                self.redis.delete(*keys)
+            except Exception as e:
+                logger.warning(f"User cache invalidation failed for user {user_id}: {e}")
+
+
+# /user/profile and /user/credits; main.py attaches Redis when it is configured
+user_cache = UserResponseCache(ttl=int(os.getenv("USER_CACHE_TTL", "120")))
+
+
+def invalidate_users_out_of_process(user_ids):
+    """
+    Drop cached responses for users whose rows were changed outside the API
+    (admin scripts). The API shares user_cache through Redis when USE_QUEUE is
+    on, so the keys are deleted there; otherwise each worker's in-process copy
+    simply expires within USER_CACHE_TTL.
+    """
+    if user_cache.redis is None and os.getenv("USE_QUEUE", "false").lower() in ("1", "true", "yes"):
+        try:
+            from redis import Redis
+            user_cache.redis = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        except Exception as e:
+            logger.warning(f"Could not connect to Redis to invalidate cached user responses: {e}")
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
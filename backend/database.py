@@ -10,22 +10,35 @@ UPDATED January 2025:
 
 from datetime import datetime
 from typing import Optional
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 # Try to import SQLAlchemy - it's optional
 try:
-    from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Enum, event
+    from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Enum, Index, UniqueConstraint, Numeric, event, text, func, cast, table, column
     from sqlalchemy.orm import declarative_base, sessionmaker, Session, relationship
     from sqlalchemy.pool import QueuePool
+    from sqlalchemy.engine import make_url
     import enum
     SQLALCHEMY_AVAILABLE = True
 except ImportError:
     SQLALCHEMY_AVAILABLE = False
     logger.warning("SQLAlchemy not installed - database features disabled. Install with: pip install sqlalchemy psycopg[binary]")
 
+# Optional: asyncio engine (needs asyncpg for PostgreSQL or aiosqlite for SQLite)
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    ASYNC_SQLALCHEMY_AVAILABLE = SQLALCHEMY_AVAILABLE
+except ImportError:
+    ASYNC_SQLALCHEMY_AVAILABLE = False
+
 if SQLALCHEMY_AVAILABLE:
     Base = declarative_base()
 else:
@@ -149,6 +162,20 @@ if SQLALCHEMY_AVAILABLE:
         created_at = Column(DateTime, default=datetime.utcnow)
         updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
         completed_at = Column(DateTime, nullable=True)
+        
+        # Covers "clips for this user" joins (user_email filter -> job_id join key)
+        __table_args__ = (
+            Index("ix_jobs_user_email_job_id", "user_email", "job_id"),
+        )
+        
+        # clips.job_id is an indexed string column (no FK), so the join is declared explicitly.
+        # Read-only: clips are still created via db.add(Clip(...)).
+        clips = relationship(
+            "Clip",
+            primaryjoin="Job.job_id == foreign(Clip.job_id)",
+            order_by="Clip.clip_number",
+            viewonly=True,
+        )
 else:
     Job = None
 
@@ -189,10 +216,32 @@ if SQLALCHEMY_AVAILABLE:
         last_updated = Column(DateTime, nullable=True)
         
         created_at = Column(DateTime, default=datetime.utcnow)
+        
+        # Clip listings filter by job_id (via the jobs join) and sort/filter on these columns
+        __table_args__ = (
+            Index("ix_clip_job_created", "job_id", "created_at"),
+            Index("ix_clip_job_views", "job_id", "views"),
+            Index("ix_clip_job_platform", "job_id", "platform"),
+        )
 else:
     Clip = None
 
 
+if SQLALCHEMY_AVAILABLE:
+    class YouTubeUpload(Base):
+        """Clip files already uploaded to YouTube, by content hash (retried uploads reuse the video)"""
+        __tablename__ = "youtube_uploads"
+        
+        content_hash = Column(String(32), primary_key=True)
+        clip_id = Column(Integer, ForeignKey('clips.id'), nullable=True, index=True)
+        video_id = Column(String, nullable=False)
+        youtube_url = Column(String, nullable=False)
+        tracking_code = Column(String, nullable=True)
+        created_at = Column(DateTime, default=datetime.utcnow)
+else:
+    YouTubeUpload = None
+
+
 if SQLALCHEMY_AVAILABLE:
     class CampaignStatus(enum.Enum):
         """Campaign status"""
@@ -284,6 +333,22 @@ if SQLALCHEMY_AVAILABLE:
         submitted_at = Column(DateTime, nullable=True)
         approved_at = Column(DateTime, nullable=True)
         paid_at = Column(DateTime, nullable=True)
+        
+        # Composite indexes for the marketplace's hot filters (payouts, bonus runs, my-jobs).
+        # The unique pair also makes "one claim per clipper per campaign" a DB guarantee.
+        __table_args__ = (
+            UniqueConstraint("campaign_id", "clipper_id", name="uq_marketplace_job_campaign_clipper"),
+            Index("ix_marketplace_job_clipper_status", "clipper_id", "status"),
+            Index("ix_marketplace_job_status_ytid", "status", "youtube_video_id"),
+            Index("ix_marketplace_job_clipper_claimed", "clipper_id", "claimed_at"),
+            # View sync reads (youtube_video_id, clip_id) of every job with a video:
+            # partial + covering on Postgres, so it's an index-only scan
+            Index(
+                "ix_marketplace_job_ytid_posted", "youtube_video_id",
+                postgresql_include=["clip_id"],
+                postgresql_where=text("youtube_video_id IS NOT NULL"),
+            ),
+        )
 else:
     MarketplaceJob = None
     MarketplaceJobStatus = None
@@ -308,8 +373,12 @@ if SQLALCHEMY_AVAILABLE:
         amount = Column(Float, nullable=False)
         currency = Column(String, default="USD")
         
-        # Jobs included in this payout
-        job_ids = Column(Text, nullable=False)  # JSON array of job IDs
+        # Jobs included in this payout (rows in payout_jobs)
+        jobs = relationship("MarketplaceJob", secondary="payout_jobs", order_by="MarketplaceJob.id")
+        
+        # JSON array of job IDs, kept in step with payout_jobs (payout_jobs is what's
+        # queried; older databases still have this column NOT NULL)
+        job_ids = Column(Text, nullable=True)
         
         # Status
         status = Column(Enum(PayoutStatus), default=PayoutStatus.PENDING)
@@ -322,14 +391,116 @@ if SQLALCHEMY_AVAILABLE:
         requested_at = Column(DateTime, default=datetime.utcnow)
         processed_at = Column(DateTime, nullable=True)
         completed_at = Column(DateTime, nullable=True)
+    
+    class PayoutJob(Base):
+        """Association between a payout and the marketplace jobs it pays for"""
+        __tablename__ = "payout_jobs"
+        
+        payout_id = Column(Integer, ForeignKey('payouts.id', ondelete="CASCADE"), primary_key=True)
+        job_id = Column(Integer, ForeignKey('marketplace_jobs.id'), primary_key=True, index=True)
 else:
     Payout = None
     PayoutStatus = None
+    PayoutJob = None
 
 
 # Database connection
 _engine = None
 _SessionLocal = None
+_async_engine = None
+_AsyncSessionLocal = None
+
+# Sync driver name -> asyncio driver name
+_ASYNC_DRIVERS = {
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+# libpq query parameters asyncpg.connect() doesn't accept (it raises TypeError)
+_LIBPQ_ONLY_PARAMS = ("sslmode", "channel_binding")
+
+
+def _async_url(database_url: str):
+    """
+    Translate a sync DATABASE_URL to (async URL, connect_args), or (None, None)
+    
+    libpq's sslmode (e.g. Neon's ?sslmode=require) becomes asyncpg's `ssl`
+    argument, which takes the same mode names.
+    """
+    url = make_url(database_url)
+    async_driver = _ASYNC_DRIVERS.get(url.drivername)
+    if async_driver is None:
+        return None, None
+    
+    query = dict(url.query)
+    sslmode = query.get("sslmode")
+    connect_args = {}
+    if async_driver == "postgresql+asyncpg":
+        for param in _LIBPQ_ONLY_PARAMS:
+            query.pop(param, None)
+        if sslmode:
+            connect_args["ssl"] = sslmode
+    return url.set(drivername=async_driver, query=query), connect_args
+
+
+def _check_async_engine(engine):
+    """
+    Open one real connection (engines connect lazily, so a bad driver/URL only
+    shows up here). Runs on its own event loop in a worker thread, since this is
+    called from sync startup code that may already be inside a running loop.
+    """
+    async def probe():
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        finally:
+            # Don't keep connections bound to the probe's event loop
+            await engine.dispose()
+    
+    result = {}
+    
+    def run():
+        try:
+            asyncio.run(probe())
+        except BaseException as e:
+            result["error"] = e
+    
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(timeout=30)
+    if worker.is_alive():
+        raise TimeoutError("async database connection check timed out")
+    if "error" in result:
+        raise result["error"]
+
+
+def _pool_settings(engine: str = "sync") -> dict:
+    """
+    Connection pool settings for the sync and async engines.
+    Connections stay checked in between requests, so get_db()/close() only
+    borrow and return a warm connection (no TCP/auth handshake per request).
+    
+    DB_POOL_SIZE + DB_MAX_OVERFLOW (default 5 + 10) is the connection budget for
+    the whole process: when the async engine is enabled the two engines split it
+    (sync 3 + 5, async 2 + 5 by default), so a process never holds more than 15
+    connections. Size managed Postgres limits as 15 x (uvicorn + RQ worker processes).
+    """
+    pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+    max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    if engine == "async":
+        pool_size, max_overflow = max(1, pool_size // 2), max_overflow // 2
+    elif _async_engine is not None:
+        pool_size, max_overflow = max(1, pool_size - pool_size // 2), max_overflow - max_overflow // 2
+    
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),  # 30 minutes
+        "pool_pre_ping": True,  # Verify connections before using (handles stale connections)
+    }
 
 
 def init_database(database_url: str):
@@ -349,20 +520,16 @@ def init_database(database_url: str):
         return False
     
     try:
+        # The async engine first: when it's available the two engines split the pool budget
+        init_async_database(database_url)
+        
         # Production-ready connection pool settings
-        pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
-        max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
-        pool_timeout = int(os.getenv("DB_POOL_TIMEOUT", "30"))
-        pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 30 minutes
+        pool_settings = _pool_settings()
         
         _engine = create_engine(
             database_url,
             poolclass=QueuePool,
-            pool_pre_ping=True,  # Verify connections before using (handles stale connections)
-            pool_size=pool_size,
-            max_overflow=max_overflow,
-            pool_timeout=pool_timeout,
-            pool_recycle=pool_recycle,  # Recycle connections to prevent stale connections
+            **pool_settings,
             echo=os.getenv("DB_ECHO", "false").lower() == "true",  # SQL logging for debugging
         )
         
@@ -377,6 +544,7 @@ def init_database(database_url: str):
         
         # Create tables
         Base.metadata.create_all(bind=_engine)
+        ensure_claim_unique_index()
         
         # Create session factory with expire_on_commit=False for better performance
         _SessionLocal = sessionmaker(
@@ -388,9 +556,10 @@ def init_database(database_url: str):
         
         # Test connection
         with _engine.connect() as conn:
-            conn.execute("SELECT 1")
+            conn.execute(text("SELECT 1"))
         
-        logger.info(f"Database initialized successfully (pool_size={pool_size}, max_overflow={max_overflow})")
+        logger.info(f"Database initialized successfully (pool_size={pool_settings['pool_size']}, max_overflow={pool_settings['max_overflow']})")
+        init_clip_rollup()
         return True
         
     except Exception as e:
@@ -418,6 +587,289 @@ def get_db():
     return _SessionLocal()
 
 
+def get_session():
+    """
+    FastAPI dependency yielding a pooled session that is always returned to the pool
+    
+    Usage:
+        @router.get("/items")
+        async def list_items(db: Session = Depends(get_session)):
+            ...
+    """
+    db = get_db()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def init_async_database(database_url: str) -> bool:
+    """
+    Initialize the asyncio engine used by get_async_db()
+    
+    Optional: if asyncpg/aiosqlite isn't installed, get_async_db() falls back to
+    running the sync session in a worker thread.
+    """
+    global _async_engine, _AsyncSessionLocal
+    
+    if not ASYNC_SQLALCHEMY_AVAILABLE:
+        return False
+    
+    try:
+        async_url, connect_args = _async_url(database_url)
+        if async_url is None:
+            logger.info("No asyncio driver mapping for DATABASE_URL - async sessions use a thread fallback")
+            return False
+        
+        _async_engine = create_async_engine(
+            async_url,
+            poolclass=AsyncAdaptedQueuePool,
+            connect_args=connect_args,
+            **_pool_settings("async"),
+        )
+        _check_async_engine(_async_engine)
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+        logger.info("Async database engine initialized")
+        return True
+    except Exception as e:
+        # Typically the asyncio driver (asyncpg/aiosqlite) isn't installed or can't connect
+        logger.info(f"Async database engine unavailable ({e}) - async sessions use a thread fallback")
+        _async_engine = None
+        _AsyncSessionLocal = None
+        return False
+
+
+class _ThreadedSession:
+    """
+    Minimal AsyncSession stand-in backed by a sync session.
+    Statements run in a worker thread and results are buffered there, so the
+    event loop never blocks on database I/O.
+    """
+    
+    def __init__(self, session):
+        self._session = session
+    
+    async def execute(self, statement, *args, **kwargs):
+        def _run():
+            result = self._session.execute(statement, *args, **kwargs)
+            # Bulk/executemany writes return no rows and can't be frozen
+            return result.freeze() if result.returns_rows else result
+        result = await asyncio.to_thread(_run)
+        return result() if callable(result) else result
+    
+    async def scalar(self, statement, *args, **kwargs):
+        return await asyncio.to_thread(self._session.scalar, statement, *args, **kwargs)
+    
+    async def get(self, entity, ident):
+        return await asyncio.to_thread(self._session.get, entity, ident)
+    
+    def add(self, instance):
+        self._session.add(instance)
+    
+    async def flush(self):
+        await asyncio.to_thread(self._session.flush)
+    
+    async def refresh(self, instance):
+        await asyncio.to_thread(self._session.refresh, instance)
+    
+    async def commit(self):
+        await asyncio.to_thread(self._session.commit)
+    
+    async def rollback(self):
+        await asyncio.to_thread(self._session.rollback)
+    
+    async def close(self):
+        await asyncio.to_thread(self._session.close)
+
+
+@asynccontextmanager
+async def get_async_db():
+    """
+    Get an async database session
+    
+    Usage:
+        async with get_async_db() as db:
+            result = await db.execute(select(Clip).where(...))
+            clips = result.scalars().all()
+    """
+    if _AsyncSessionLocal is not None:
+        async with _AsyncSessionLocal() as session:
+            yield session
+        return
+    
+    session = _ThreadedSession(get_db())
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+def dialect_name() -> Optional[str]:
+    """Name of the configured database dialect ('postgresql', 'sqlite', ...), or None"""
+    return _engine.dialect.name if _engine is not None else None
+
+
+def iso_timestamp(column):
+    """
+    SQL expression that renders a DateTime column as an ISO-8601 string in the database,
+    so list endpoints don't call .isoformat() per row. Returns None for dialects
+    without a known formatter (callers then format in Python).
+    """
+    dialect = dialect_name()
+    if dialect == "postgresql":
+        return func.to_char(column, 'YYYY-MM-DD"T"HH24:MI:SS.US')
+    if dialect == "sqlite":
+        return func.strftime('%Y-%m-%dT%H:%M:%f', column)
+    return None
+
+
+def enum_value(column, default: str):
+    """
+    SQL expression for an Enum column's lowercase value (our enums use value == name.lower()),
+    with `default` substituted for NULL - avoids per-row `x.value if x else default`.
+    """
+    return func.coalesce(func.lower(cast(column, String)), default)
+
+
+def money_sum(column):
+    """
+    SQL expression for SUM(column) rounded to cents (0 when there are no rows).
+    Cast to NUMERIC first: PostgreSQL has no round(double precision, int).
+    """
+    return func.round(cast(func.coalesce(func.sum(column), 0), Numeric), 2, type_=Float)
+
+
+# ============================================================================
+# PER-USER CLIP ROLLUP (PostgreSQL materialized view)
+# ============================================================================
+
+# Dashboard totals/breakdowns are read from this view instead of re-aggregating
+# every clip on each request. NULL platform/category are stored as '' so the
+# unique index (required for REFRESH ... CONCURRENTLY) covers every row.
+CLIP_ROLLUP_MAX_AGE = int(os.getenv("CLIP_ROLLUP_MAX_AGE", "300"))  # seconds
+
+_CLIP_ROLLUP_DDL = (
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS user_clip_rollup AS
+    SELECT
+        j.user_email AS user_email,
+        COALESCE(c.platform, '') AS platform,
+        COALESCE(c.category, '') AS category,
+        COUNT(c.id) AS clips,
+        COALESCE(SUM(c.views), 0) AS views,
+        COALESCE(SUM(c.revenue), 0) AS revenue,
+        COALESCE(SUM(NULLIF(c.virality_score, 0)), 0) AS virality_sum,
+        COUNT(NULLIF(c.virality_score, 0)) AS virality_count
+    FROM clips c
+    JOIN jobs j ON j.job_id = c.job_id
+    GROUP BY j.user_email, COALESCE(c.platform, ''), COALESCE(c.category, '')
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_user_clip_rollup "
+    "ON user_clip_rollup (user_email, platform, category)",
+)
+
+if SQLALCHEMY_AVAILABLE:
+    user_clip_rollup = table(
+        "user_clip_rollup",
+        column("user_email"), column("platform"), column("category"),
+        column("clips"), column("views"), column("revenue"),
+        column("virality_sum"), column("virality_count"),
+    )
+else:
+    user_clip_rollup = None
+
+_clip_rollup_ready = False
+_clip_rollup_refreshed_at = 0.0
+_clip_rollup_lock = threading.Lock()
+
+
+def init_clip_rollup() -> bool:
+    """Create the user_clip_rollup materialized view (PostgreSQL only)"""
+    global _clip_rollup_ready, _clip_rollup_refreshed_at
+    
+    if _engine is None or _engine.dialect.name != "postgresql":
+        return False
+    
+    try:
+        with _engine.begin() as conn:
+            for statement in _CLIP_ROLLUP_DDL:
+                conn.execute(text(statement))
+        _clip_rollup_ready = True
+        # An existing view may be arbitrarily old: let the first reader trigger a refresh
+        _clip_rollup_refreshed_at = 0.0
+        logger.info("user_clip_rollup materialized view ready")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not create user_clip_rollup view - dashboard aggregates live: {e}")
+        _clip_rollup_ready = False
+        return False
+
+
+def clip_rollup_available() -> bool:
+    """True when dashboard aggregates can be read from user_clip_rollup"""
+    return _clip_rollup_ready
+
+
+def clip_rollup_stale() -> bool:
+    """True when the rollup is older than CLIP_ROLLUP_MAX_AGE seconds"""
+    return _clip_rollup_ready and time.monotonic() - _clip_rollup_refreshed_at > CLIP_ROLLUP_MAX_AGE
+
+
+def refresh_clip_rollup() -> bool:
+    """
+    Refresh user_clip_rollup without blocking readers.
+    Skips if another thread is already refreshing.
+    """
+    global _clip_rollup_refreshed_at
+    
+    if not _clip_rollup_ready or not _clip_rollup_lock.acquire(blocking=False):
+        return False
+    try:
+        # CONCURRENTLY can't run inside a transaction block
+        with _engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY user_clip_rollup"))
+        _clip_rollup_refreshed_at = time.monotonic()
+        return True
+    except Exception as e:
+        logger.warning(f"user_clip_rollup refresh failed: {e}")
+        return False
+    finally:
+        _clip_rollup_lock.release()
+
+
+_claim_unique_index_ready = False
+
+
+def ensure_claim_unique_index() -> bool:
+    """
+    Make sure marketplace_jobs has the (campaign_id, clipper_id) unique index that
+    claim_job's INSERT ... ON CONFLICT relies on. New tables get it from the model's
+    UniqueConstraint; create_all doesn't add it to tables created before it existed.
+    """
+    global _claim_unique_index_ready
+    
+    try:
+        with _engine.begin() as conn:
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_marketplace_job_campaign_clipper "
+                "ON marketplace_jobs (campaign_id, clipper_id)"
+            ))
+        _claim_unique_index_ready = True
+    except Exception as e:
+        # e.g. existing duplicate claims: claims keep the check-then-insert path
+        logger.warning(f"Could not create unique index on marketplace_jobs (campaign_id, clipper_id): {e}")
+        _claim_unique_index_ready = False
+    return _claim_unique_index_ready
+
+
+def claim_unique_index_available() -> bool:
+    """True when claims can use INSERT ... ON CONFLICT (campaign_id, clipper_id)"""
+    return _claim_unique_index_ready
+
+
 def is_database_enabled() -> bool:
     """Check if database is configured"""
     return _engine is not None
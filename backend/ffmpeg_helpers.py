@@ -3,7 +3,10 @@ import tempfile
 import os
 import wave
 import math
-from typing import List, Dict, Optional
+import heapq
+import threading
+from functools import lru_cache
+from typing import Callable, List, Dict, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -109,8 +112,8 @@ def get_top_energy_windows(video_path: str, window_size_sec: float = 1.0, top_k:
     try:
         wav = extract_audio_to_wav(video_path)
         windows = compute_rms_windows(wav, window_size_sec=window_size_sec)
-        windows_sorted = sorted(windows, key=lambda x: x["rms"], reverse=True)
-        return windows_sorted[:top_k]
+        # One window per second of video: keep a top_k heap instead of sorting them all
+        return heapq.nlargest(top_k, windows, key=lambda x: x["rms"])
     finally:
         # best-effort cleanup
         try:
@@ -168,3 +171,207 @@ def fast_clip_copy(input_path: str, start: float, duration: float, output_path:
         ]
         subprocess.run(cmd2, check=True)
         return output_path
+
+
+# H.264 hardware encoders in order of preference, with rate-control arguments that
+# roughly match libx264 -preset veryfast at its default quality
+_HW_ENCODERS = [
+    ("h264_nvenc", ["-preset", "p4", "-rc", "vbr", "-cq", "23"]),
+    ("h264_videotoolbox", ["-b:v", "8M"]),
+    ("h264_qsv", ["-preset", "veryfast", "-global_quality", "23"]),
+    ("h264_amf", ["-quality", "speed", "-rc", "cqp", "-qp_i", "23", "-qp_p", "23"]),
+]
+SOFTWARE_ENCODER_ARGS = ["-c:v", "libx264", "-preset", "veryfast"]
+# Force libx264 (e.g. to rule out driver issues)
+DISABLE_HWENC = os.getenv("CLIPGEN_DISABLE_HWENC", "false").lower() in ("1", "true", "yes")
+# Concurrent hardware encodes allowed per process (consumer NVENC cards cap open
+# sessions at a handful); encodes beyond this use libx264
+HWENC_MAX_SESSIONS = int(os.getenv("CLIPGEN_HWENC_MAX_SESSIONS", "3"))
+_hwenc_sessions = threading.BoundedSemaphore(max(1, HWENC_MAX_SESSIONS))
+
+
+@lru_cache(maxsize=1)
+def video_encoder_args() -> List[str]:
+    """
+    ffmpeg video codec arguments for clip encodes: the first hardware H.264 encoder
+    that works on this machine, else libx264. Probed once per process.
+    """
+    if DISABLE_HWENC:
+        return SOFTWARE_ENCODER_ARGS
+    try:
+        listed = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=10
+        ).stdout
+    except Exception:
+        return SOFTWARE_ENCODER_ARGS
+
+    for name, args in _HW_ENCODERS:
+        if f" {name} " not in listed:
+            continue
+        # Compiled in doesn't mean usable (no GPU/driver): encode a few frames to check
+        try:
+            subprocess.run(
+                ["ffmpeg", "-hide_banner", "-loglevel", "error",
+                 "-f", "lavfi", "-i", "color=size=256x256:duration=0.2",
+                 "-c:v", name, *args, "-f", "null", "-"],
+                check=True, capture_output=True, timeout=20
+            )
+        except Exception:
+            continue
+        logger.info(f"Using hardware video encoder: {name}")
+        return ["-c:v", name, *args]
+    return SOFTWARE_ENCODER_ARGS
+
+
+def run_encode(build_cmd: Callable[[List[str]], List[str]]) -> subprocess.CompletedProcess:
+    """
+    Run an ffmpeg encode built by build_cmd(video codec args). Uses the hardware
+    encoder while a session slot is free; when none is, or the hardware encode
+    fails (e.g. the driver's session limit is hit by another process), the
+    encode runs with libx264 instead.
+    """
+    encoder_args = video_encoder_args()
+    if encoder_args is not SOFTWARE_ENCODER_ARGS and _hwenc_sessions.acquire(blocking=False):
+        try:
+            return subprocess.run(build_cmd(encoder_args), check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            logger.warning(
+                "Hardware encode failed, retrying with libx264: %s",
+                e.stderr.decode(errors='ignore')[-300:]
+            )
+        finally:
+            _hwenc_sessions.release()
+    return subprocess.run(build_cmd(SOFTWARE_ENCODER_ARGS), check=True, capture_output=True)
+
+
+# Caption look for burned-in clip subtitles (libass force_style)
+CAPTION_STYLE = (
+    "Fontname=Arial,Bold=1,Fontsize=22,PrimaryColour=&H00FFFFFF&,"
+    "OutlineColour=&H00000000&,Outline=2,Alignment=2,MarginV=40"
+)
+
+
+def escape_filter_path(path: str) -> str:
+    """Escape a file path for use as a quoted value inside an ffmpeg filtergraph"""
+    return path.replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+
+
+def probe_dimensions(video_path: str) -> Optional[Tuple[int, int]]:
+    """(width, height) of the first video stream, or None if ffprobe can't tell"""
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "stream=width,height", "-of", "csv=p=0:s=x", video_path],
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
+        width, height = out.split("x")[:2]
+        return int(width), int(height)
+    except (subprocess.CalledProcessError, ValueError, OSError):
+        return None
+
+
+def render_clip(
+    video_path: str,
+    start: float,
+    end: float,
+    resolution: Tuple[int, int],
+    output_path: str,
+    caption: Optional[str] = None,
+    threads: Optional[int] = None,
+) -> str:
+    """
+    Cut [start, end) from video_path into a `resolution` clip with one ffmpeg process:
+    scale to cover, center-crop, and burn in `caption` for the whole clip via libass.
+
+    With no caption and a source already at `resolution`, the cut is a stream copy.
+    """
+    target_w, target_h = resolution
+
+    # Nothing to scale or burn in: cut with stream copy (no re-encode; the cut
+    # starts on the keyframe at or before `start`)
+    if not caption and probe_dimensions(video_path) == (target_w, target_h):
+        fast_clip_copy(video_path, start, end - start, output_path)
+        return output_path
+
+    # Cover scaling: fit the side that is short relative to the target aspect, crop the other
+    wider = f"gt(a,{target_w}/{target_h})"
+    filters = f"scale='if({wider},-2,{target_w})':'if({wider},{target_h},-2)',crop={target_w}:{target_h}"
+
+    srt_path = None
+    if caption:
+        import subtitles
+
+        fd, srt_path = tempfile.mkstemp(suffix=".srt")
+        os.close(fd)
+        subtitles.create_srt_from_transcription(
+            {"segments": [{"start": 0.0, "end": end - start, "text": caption}]}, srt_path
+        )
+        filters += f",subtitles='{escape_filter_path(srt_path)}':force_style='{CAPTION_STYLE}'"
+
+    # -ss before -i seeks the demuxer to the keyframe preceding `start` (no decode
+    # from the head of the file); when re-encoding, ffmpeg then decodes and drops
+    # the frames up to `start` itself (-accurate_seek, on by default), so the cut
+    # is frame-exact without a second output-side -ss. -t past EOF just stops early.
+    def build_cmd(encoder_args: List[str]) -> List[str]:
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-ss",
+            str(start),
+            "-i",
+            video_path,
+            "-t",
+            str(end - start),
+            "-vf",
+            filters,
+            *encoder_args,
+            "-c:a",
+            "aac",
+            "-movflags",
+            "+faststart",
+        ]
+        if threads:
+            cmd += ["-threads", str(threads)]
+        cmd.append(output_path)
+        return cmd
+
+    try:
+        run_encode(build_cmd)
+        return output_path
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg failed: {e.stderr.decode(errors='ignore')[-500:]}")
+    finally:
+        if srt_path and os.path.exists(srt_path):
+            os.remove(srt_path)
+
+
+def decode_audio_16k(video_path: str):
+    """
+    Decode the first audio stream to 16 kHz mono float32 samples in-process with
+    PyAV (pip install av): the array both openai-whisper and faster-whisper take
+    directly, without each spawning its own ffmpeg decode.
+
+    Returns a NumPy array, or None if PyAV isn't installed or the file has no audio.
+    """
+    try:
+        import av
+        import numpy as np
+    except ImportError:
+        return None
+
+    with av.open(video_path) as container:
+        if not container.streams.audio:
+            return None
+        stream = container.streams.audio[0]
+        resampler = av.audio.resampler.AudioResampler(format="flt", layout="mono", rate=16000)
+        chunks = []
+        for frame in container.decode(stream):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        # Drain samples still buffered in the resampler
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+
+    if not chunks:
+        return None
+    return np.concatenate(chunks).astype(np.float32, copy=False)
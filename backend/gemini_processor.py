@@ -13,15 +13,20 @@ Streaming: Real-time progress updates for better UX
 
 import os
 import json
+import heapq
 import tempfile
 import shutil
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional, Callable
 import requests
 
 logger = logging.getLogger(__name__)
 
+# Read/write block size for direct HTTP downloads
+DOWNLOAD_BUFFER_SIZE = 16 * 1024 * 1024
+
 # Optional whisper import (requires openai-whisper package)
 try:
     import whisper
@@ -76,6 +81,17 @@ try:
 except ImportError:
     ytdlp = None
 
+# yt-dlp hands downloads to aria2c when it's on PATH: 16 connections, 1MB pieces
+ARIA2C_AVAILABLE = shutil.which("aria2c") is not None
+ARIA2C_ARGS = ["-x", "16", "-s", "16", "-k", "1M"]
+
+
+def _temp_path(suffix: str) -> str:
+    """Reserve a new temp file path (created empty, unlike the racy tempfile.mktemp)"""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
 
 class GeminiVideoProcessor:
     def __init__(self, gemini_api_key: str, stt_engine: str = "whisper"):
@@ -92,6 +108,16 @@ class GeminiVideoProcessor:
         else:
             logger.warning("Gemini AI not available - AI analysis disabled")
     
+    @classmethod
+    def download_only(cls) -> "GeminiVideoProcessor":
+        """Processor for downloads only (no Gemini configuration, no API key needed)"""
+        proc = cls.__new__(cls)
+        proc.gemini_api_key = None
+        proc.whisper_model = None
+        proc.stt_engine = "whisper"
+        proc.model = None
+        return proc
+    
     def load_whisper_model(self):
         """Load the configured STT model for transcription"""
         if self.whisper_model is not None:
@@ -144,11 +170,14 @@ class GeminiVideoProcessor:
         except Exception as e:
             raise Exception(f"Failed to download YouTube video: {str(e)}")
     
-    def download_video_from_url(self, url: str, cookies_text: Optional[str] = None, extra_headers: Optional[dict] = None) -> str:
+    def download_video_from_url(self, url: str, cookies_text: Optional[str] = None, extra_headers: Optional[dict] = None,
+                                cookiefile_path: Optional[str] = None) -> str:
         """Download video from a URL or page.
 
         If `cookies_text` is provided it should be the contents of a Netscape-format
         cookies.txt file and will be written to a temp file and passed to yt-dlp.
+        A cookies file already on disk can be given as `cookiefile_path` instead,
+        which yt-dlp reads directly (no copy).
         `extra_headers` is a dict of HTTP headers to set when using yt-dlp or
         when falling back to a direct requests download.
         """
@@ -171,23 +200,24 @@ class GeminiVideoProcessor:
             if ytdlp is not None:
                 # Common hosts that require extractor support
                 if any(d in url for d in ("kick.com", "kick.tv", "twitch.tv", "youtube.com", "youtu.be")):
-                    return self._download_with_ytdlp(url, cookiefile_path=cookiefile.name if cookiefile else None, extra_headers=headers)
+                    return self._download_with_ytdlp(url, cookiefile_path=cookiefile.name if cookiefile else cookiefile_path, extra_headers=headers)
 
             # Fallback: attempt a direct HTTP download using requests
             temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
             temp_path = temp_file.name
+            temp_file.close()
 
             req_headers = headers if headers else {}
             # Provide a sensible UA header if none supplied
             req_headers.setdefault('User-Agent', 'python-requests/2.x')
 
-            response = requests.get(url, stream=True, timeout=30, headers=req_headers)
-            response.raise_for_status()
-
-            with open(temp_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            with requests.get(url, stream=True, timeout=30, headers=req_headers) as response:
+                response.raise_for_status()
+                # Copy the raw socket stream in 16MB blocks (undoing any gzip/deflate
+                # transfer encoding) rather than looping over small chunks in Python
+                response.raw.decode_content = True
+                with open(temp_path, 'wb') as f:
+                    shutil.copyfileobj(response.raw, f, length=DOWNLOAD_BUFFER_SIZE)
 
             return temp_path
         except Exception as e:
@@ -235,6 +265,11 @@ class GeminiVideoProcessor:
         if cookiefile_path:
             ytdlp_opts['cookiefile'] = cookiefile_path
 
+        # Split downloads across parallel connections when aria2c is installed
+        if ARIA2C_AVAILABLE:
+            ytdlp_opts['external_downloader'] = {'default': 'aria2c'}
+            ytdlp_opts['external_downloader_args'] = {'aria2c': ARIA2C_ARGS}
+
         try:
             with ytdlp.YoutubeDL(ytdlp_opts) as ydl:
                 info = ydl.extract_info(url, download=True)
@@ -463,87 +498,28 @@ Sort by virality_score (highest first). Return ONLY the JSON array, no other tex
         text: str,
         output_path: str,
         resolution: tuple = (1080, 1920),  # Portrait by default
-        add_subtitles: bool = True
+        add_subtitles: bool = True,
+        threads: Optional[int] = None
     ) -> str:
-        """Generate a single clip with optional subtitles"""
+        """Generate a single clip with optional subtitles (one ffmpeg process, captions via libass)"""
+        if ffmpeg_helpers is None:
+            raise Exception("Clip generation failed: ffmpeg_helpers is unavailable")
         try:
-            # Import MoviePy lazily so the module can be imported even when
-            # moviepy isn't installed (helps running the API without video deps).
-            try:
-                from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
-                from moviepy.video.fx.crop import crop
-            except Exception as e:
-                raise Exception("moviepy is required for clip generation. Install moviepy or run the server without calling video generation.")
-
-            video = VideoFileClip(video_path)
-            
-            # Ensure end time doesn't exceed video duration
-            end_time = min(end_time, video.duration)
-            
-            # Extract clip
-            clip = video.subclip(start_time, end_time)
-            
-            # Resize and crop to target resolution
-            target_width, target_height = resolution
-            
-            # Calculate scaling
-            scale = max(target_width / clip.w, target_height / clip.h)
-            clip_resized = clip.resize(scale)
-            
-            # Crop to exact dimensions
-            clip_cropped = crop(
-                clip_resized,
-                width=target_width,
-                height=target_height,
-                x_center=clip_resized.w / 2,
-                y_center=clip_resized.h / 2
-            )
-            
-            # Add subtitles if requested
+            caption = None
             if add_subtitles and text:
                 # Limit text length for readability
-                display_text = text[:100] + "..." if len(text) > 100 else text
-                
-                txt_clip = TextClip(
-                    display_text,
-                    fontsize=40,
-                    color='white',
-                    font='Arial-Bold',
-                    stroke_color='black',
-                    stroke_width=2,
-                    method='caption',
-                    size=(int(target_width * 0.9), None),
-                    align='center'
-                )
-                
-                # Position at bottom
-                txt_clip = txt_clip.set_position(('center', target_height - 150))
-                txt_clip = txt_clip.set_duration(clip_cropped.duration)
-                
-                # Composite
-                final_clip = CompositeVideoClip([clip_cropped, txt_clip])
-            else:
-                final_clip = clip_cropped
+                caption = text[:100] + "..." if len(text) > 100 else text
             
-            # Write output
-            final_clip.write_videofile(
+            return ffmpeg_helpers.render_clip(
+                video_path,
+                start_time,
+                end_time,
+                resolution,
                 output_path,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile=tempfile.mktemp(suffix='.m4a'),
-                remove_temp=True,
-                verbose=False,
-                logger=None
+                caption=caption,
+                threads=threads
             )
             
-            # Cleanup
-            video.close()
-            clip.close()
-            if add_subtitles and text:
-                final_clip.close()
-            
-            return output_path
-            
         except Exception as e:
             raise Exception(f"Clip generation failed: {str(e)}")
     
@@ -681,13 +657,13 @@ Sort by virality_score (highest first). Return ONLY the JSON array, no other tex
                 scene_boost = float(s.get('scene_proximity', 0.0))
                 s['combined_score'] = vir * (1.0 + float(s.get('energy_norm', 0.0)) + 0.5 * hype + 0.3 * scene_boost)
 
-            segments = sorted(segments, key=lambda x: x.get('combined_score', 0), reverse=True)[:num_clips]
+            segments = heapq.nlargest(num_clips, segments, key=lambda x: x.get('combined_score', 0))
             
             if progress_callback:
                 progress_callback("AI analysis complete", 60)
             
             # Step 3: Generate clips
-            print("Step 3: Generating clips with MoviePy...")
+            print("Step 3: Generating clips with ffmpeg...")
             if progress_callback:
                 progress_callback("Generating clips...", 65)
             
@@ -698,8 +674,8 @@ Sort by virality_score (highest first). Return ONLY the JSON array, no other tex
             vtt_path = None
             if subtitles is not None:
                 try:
-                    srt_path = tempfile.mktemp(suffix=".srt")
-                    vtt_path = tempfile.mktemp(suffix=".vtt")
+                    srt_path = _temp_path(".srt")
+                    vtt_path = _temp_path(".vtt")
                     subtitles.create_srt_from_transcription(transcription_result, srt_path)
                     subtitles.create_vtt_from_srt(srt_path, vtt_path)
                 except Exception as e:
@@ -707,28 +683,14 @@ Sort by virality_score (highest first). Return ONLY the JSON array, no other tex
                     srt_path = None
                     vtt_path = None
 
-            for i, segment in enumerate(segments):
-                output_path = tempfile.mktemp(suffix=f"_clip_{i+1}.mp4")
-
-                # Update progress
-                clip_progress = 65 + int((i / len(segments)) * 30)
-                if progress_callback:
-                    progress_callback(f"Generating clip {i+1}/{len(segments)}...", clip_progress)
+            def render(i, segment):
+                output_path = _temp_path(f"_clip_{i+1}.mp4")
 
                 # Adjust end time based on desired clip duration
                 start = float(segment["start"])
                 end = min(float(segment["end"]), start + clip_duration)
 
-                # Fast preview: try lossless copy clip (very fast) - optional
-                preview_path = None
-                if ffmpeg_helpers is not None:
-                    try:
-                        preview_path = tempfile.mktemp(suffix=f"_preview_{i+1}.mp4")
-                        ffmpeg_helpers.fast_clip_copy(video_path, start, end - start, preview_path)
-                    except Exception:
-                        preview_path = None
-
-                # Produce final clip. If subtitles/burn-in requested, we re-encode using MoviePy
+                # Produce final clip (re-encoded by ffmpeg with the caption burned in)
                 try:
                     clip_path = self.generate_clip(
                         video_path=video_path,
@@ -737,13 +699,24 @@ Sort by virality_score (highest first). Return ONLY the JSON array, no other tex
                         text=segment.get("hook", ""),  # Use hook for caption
                         output_path=output_path,
                         resolution=target_resolution,
-                        add_subtitles=True
+                        add_subtitles=True,
+                        threads=threads
                     )
                 except Exception:
-                    # Fallback to preview if generate_clip fails
-                    clip_path = preview_path
-
-                generated_clips.append({
+                    # Fallback: lossless stream-copy cut (fast, uncaptioned), only
+                    # made when the real render failed
+                    if os.path.exists(output_path):
+                        os.remove(output_path)
+                    clip_path = None
+                    if ffmpeg_helpers is not None:
+                        try:
+                            preview_path = _temp_path(f"_preview_{i+1}.mp4")
+                            ffmpeg_helpers.fast_clip_copy(video_path, start, end - start, preview_path)
+                            clip_path = preview_path
+                        except Exception:
+                            clip_path = None
+
+                return {
                     "clip_number": i + 1,
                     "path": clip_path,
                     "start_time": start,
@@ -756,7 +729,21 @@ Sort by virality_score (highest first). Return ONLY the JSON array, no other tex
                     "energy_score": segment.get("energy_score", 0.0),
                     "energy_norm": segment.get("energy_norm", 0.0),
                     "duration": end - start
-                })
+                }
+
+            # Clips render concurrently (each is an ffmpeg subprocess, so threads
+            # suffice); the cores are split between them and progress is reported
+            # from this thread as they finish
+            if segments:
+                cores = os.cpu_count() or 1
+                workers = min(len(segments), cores)
+                threads = max(1, cores // workers)
+                with ThreadPoolExecutor(max_workers=workers) as ex:
+                    futures = [ex.submit(render, i, segment) for i, segment in enumerate(segments)]
+                    for done, _ in enumerate(as_completed(futures), start=1):
+                        if progress_callback:
+                            progress_callback(f"Generated clip {done}/{len(segments)}", 65 + int((done / len(segments)) * 30))
+                    generated_clips = [f.result() for f in futures]
             
             if progress_callback:
                 progress_callback("All clips generated successfully!", 100)
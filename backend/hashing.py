@@ -0,0 +1,61 @@
+"""
+Password hashing shared by the API and the admin/dev scripts.
+
+The passlib context is built lazily, once per cost, so scripts that create many
+users pay for passlib's bcrypt backend probing only once per process.
+"""
+
+import argparse
+import os
+from functools import lru_cache
+
+from passlib.context import CryptContext
+
+# bcrypt work factor for new hashes (existing hashes verify at whatever cost they carry)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Seeding scripts: low bcrypt costs make them fast but are unsafe outside dev
+DEV_MODE = os.getenv("CLIP_DEV_MODE", "") == "1"
+DEFAULT_SCRIPT_COST = 4 if DEV_MODE else 12
+
+
+def bcrypt_cost(value: str) -> int:
+    """argparse type for --cost: bcrypt rounds (4-31); below 10 requires CLIP_DEV_MODE=1"""
+    cost = int(value)
+    if not 4 <= cost <= 31:
+        raise argparse.ArgumentTypeError("bcrypt cost must be between 4 and 31")
+    if cost < 10 and not DEV_MODE:
+        raise argparse.ArgumentTypeError("bcrypt cost below 10 is for dev only (set CLIP_DEV_MODE=1)")
+    return cost
+
+
+@lru_cache(maxsize=None)
+def get_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    """Passlib bcrypt context for a given cost; long passwords are truncated, not rejected"""
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds, bcrypt__truncate_error=False)
+
+
+def _truncate(password) -> str:
+    # bcrypt has a 72-byte input limit; truncate to avoid ValueError on long inputs.
+    pw_bytes = str(password).encode('utf-8', errors='ignore')
+    if len(pw_bytes) > 72:
+        pw_bytes = pw_bytes[:72]
+    return pw_bytes.decode('utf-8', errors='ignore')
+
+
+def hash_password(password, rounds: int = BCRYPT_ROUNDS) -> str:
+    if password is None:
+        raise ValueError("Password cannot be None")
+    return get_context(rounds).hash(_truncate(password))
+
+
+def verify_password(plain_password, hashed_password) -> bool:
+    if plain_password is None:
+        return False
+    # "!..." marks accounts without a password (e.g. OAuth sign-ups); never a bcrypt hash
+    if not hashed_password or hashed_password.startswith("!"):
+        return False
+    try:
+        return get_context().verify(_truncate(plain_password), hashed_password)
+    except Exception:
+        return False
@@ -0,0 +1,47 @@
+"""
+Shared outbound HTTP client.
+
+One pooled httpx.AsyncClient per process so repeated calls to the same hosts
+(OAuth token/userinfo endpoints) reuse keep-alive connections instead of
+paying a TCP + TLS handshake per request.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+_client: Optional[httpx.AsyncClient] = None
+_lock = asyncio.Lock()
+
+
+async def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        async with _lock:
+            if _client is None or _client.is_closed:
+                _client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=LIMITS, timeout=TIMEOUT)
+                logger.info(f"Shared HTTP client ready (http2={HTTP2_AVAILABLE})")
+    return _client
+
+
+async def close_client():
+    """Close the shared client (app shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
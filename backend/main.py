@@ -1,16 +1,19 @@
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, status, BackgroundTasks, Request
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, status, BackgroundTasks, Request, WebSocket, WebSocketDisconnect, Query
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel, EmailStr, validator
 from typing import Optional, List
 import jwt
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
+import hashing
 import os
 import shutil
 import uuid
+import json
+import secrets
 import asyncio
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -25,7 +28,14 @@ logger = logging.getLogger(__name__)
 
 from gemini_processor import GeminiVideoProcessor
 from storage import init_storage, get_storage
-from database import init_database, get_db, is_database_enabled, User as DBUser, Video as DBVideo, Job as DBJob, Clip as DBClip, Payout, PayoutStatus
+from cache import TTLCache, user_cache
+from redis_client import set_redis, get_async_redis
+from database import init_database, get_db, get_async_db, iso_timestamp, enum_value, money_sum, is_database_enabled, clip_rollup_available, clip_rollup_stale, refresh_clip_rollup, user_clip_rollup, User as DBUser, Video as DBVideo, Job as DBJob, Clip as DBClip, Payout, PayoutStatus
+try:
+    from sqlalchemy import select, func, update, lambda_stmt
+    from sqlalchemy.orm import selectinload, load_only
+except ImportError:
+    select = func = update = lambda_stmt = selectinload = load_only = None
 
 # Optional queueing imports will be attempted later (lazy)
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -61,12 +71,48 @@ except ImportError:
 # Rate limiting
 limiter = Limiter(key_func=get_remote_address)
 
+# Serialize responses with orjson when installed (much faster for large clip/analytics lists)
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    orjson = None
+    from fastapi.responses import JSONResponse as DefaultResponse
+
+# Job state/event payloads go through Redis on every progress update; orjson
+# returns bytes directly (Redis takes them as-is) and parses bytes without decoding
+if orjson is not None:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
 app = FastAPI(
     title="Clip Generator API",
     description="AI-powered video clip generation API with marketplace",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=DefaultResponse
 )
 
+# Shared outbound HTTP client (keep-alive pool for OAuth provider calls)
+try:
+    import http_pool
+except ImportError:
+    http_pool = None
+
+
+@app.on_event("startup")
+async def open_http_pool():
+    if http_pool is not None:
+        await http_pool.get_client()
+
+
+@app.on_event("shutdown")
+async def close_http_pool():
+    if http_pool is not None:
+        await http_pool.close_client()
+
 # Add rate limiter
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -117,8 +163,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 # DEFAULT IS NOW FALSE - auth is enabled by default for production safety
 DISABLE_AUTH = os.getenv("DISABLE_AUTH", "false").lower() in ("1", "true", "yes")
 
-# Configure bcrypt with truncate_error=False to handle long passwords gracefully
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__truncate_error=False)
 # oauth2_scheme is imported from auth module - don't redefine here
 
 # Gemini API Key (using Flash Lite - 133x cheaper than GPT-4!)
@@ -128,6 +172,8 @@ STT_ENGINE = os.getenv("STT_ENGINE", "whisper")
 # Queueing config: set USE_QUEUE=true and REDIS_URL to enable Redis+RQ
 USE_QUEUE = os.getenv("USE_QUEUE", "false").lower() in ("1", "true", "yes")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Skip Pydantic re-validation of job payloads in RQ workers (payloads are validated at enqueue)
+TRUST_QUEUE_PAYLOADS = os.getenv("TRUST_QUEUE_PAYLOADS", "false").lower() in ("1", "true", "yes")
 # Option to require Gemini processor for processing jobs. Set to 'false' to allow enqueueing
 # jobs even when GEMINI_API_KEY is not set (dev/testing). Default is 'true' so the app treats
 # Gemini as the main/required video processor.
@@ -145,6 +191,8 @@ if USE_QUEUE:
         from rq import Queue
         redis_conn = Redis.from_url(REDIS_URL)
         rq_queue = Queue("default", connection=redis_conn)
+        user_cache.redis = redis_conn
+        set_redis(redis_conn, REDIS_URL)
         logger.info("✓ Redis queue connected")
     except Exception as e:
         logger.warning(f"⚠ Could not connect to Redis at {REDIS_URL}: {e}. Falling back to background tasks.")
@@ -171,14 +219,79 @@ STORAGE_REGION = os.getenv("STORAGE_REGION", "auto")
 
 if STORAGE_BUCKET and STORAGE_ACCESS_KEY and STORAGE_SECRET_KEY:
     init_storage(STORAGE_BUCKET, STORAGE_ACCESS_KEY, STORAGE_SECRET_KEY, STORAGE_ENDPOINT, STORAGE_REGION)
-    logger.info("✓ Cloud storage connected")
+    logger.info("✓ Cloud storage configured")
 else:
     logger.warning("⚠ Storage not configured - files will be stored locally (not recommended for production)")
 
+# Remove local clip files once they are safely in cloud storage
+DELETE_LOCAL_AFTER_UPLOAD = os.getenv("DELETE_LOCAL_AFTER_UPLOAD", "true").lower() in ("1", "true", "yes")
+
 # Fallback: In-memory storage (only if database not available)
 users_db = {}
 videos_db = {}
-jobs_db = {}  # Store processing jobs
+jobs_db = {}  # Store processing jobs (single-process dev mode)
+
+# Per-job state lives in a Redis hash when queueing is enabled so that RQ workers and
+# API processes see the same progress; otherwise it falls back to the jobs_db dict.
+JOB_STATE_TTL = int(os.getenv("JOB_STATE_TTL", 86400))
+
+
+def _job_state_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def set_job_state(job_id: str, **fields):
+    """Merge fields into the in-memory state of a job (Redis hash or jobs_db)"""
+    fields.setdefault("updated_at", datetime.utcnow().isoformat())
+    if redis_conn is not None:
+        try:
+            key = _job_state_key(job_id)
+            # State write, expiry and the subscriber event go out in one round-trip
+            pipe = redis_conn.pipeline(transaction=False)
+            pipe.hset(key, mapping={k: _json_dumps(v) for k, v in fields.items()})
+            pipe.expire(key, JOB_STATE_TTL)
+            pipe.publish(f"{key}:events", _json_dumps(fields))
+            pipe.execute()
+            return
+        except Exception as e:
+            logger.warning(f"Redis job state write failed for {job_id}: {e}. Using in-memory state.")
+    jobs_db.setdefault(job_id, {"job_id": job_id}).update(fields)
+
+
+def publish_job_event(job_id: str, **event):
+    """Push a progress/status event to subscribers of job:{job_id}:events (no-op without Redis)"""
+    if redis_conn is None:
+        return
+    try:
+        redis_conn.publish(f"{_job_state_key(job_id)}:events", _json_dumps(event))
+    except Exception as e:
+        logger.debug(f"Could not publish event for job {job_id}: {e}")
+
+
+def get_job_state(job_id: str) -> Optional[dict]:
+    """Return the in-memory state of a job, or None if unknown"""
+    if redis_conn is not None:
+        try:
+            raw = redis_conn.hgetall(_job_state_key(job_id))
+            if raw:
+                return {k.decode(): _json_loads(v) for k, v in raw.items()}
+        except Exception as e:
+            logger.warning(f"Redis job state read failed for {job_id}: {e}")
+    return jobs_db.get(job_id)
+
+
+def iter_job_states():
+    """Yield every known in-memory job state (used by dev-mode lookups)"""
+    if redis_conn is not None:
+        try:
+            for key in redis_conn.scan_iter(match="job:*", count=500):
+                raw = redis_conn.hgetall(key)
+                if raw:
+                    yield {k.decode(): _json_loads(v) for k, v in raw.items()}
+            return
+        except Exception as e:
+            logger.warning(f"Redis job state scan failed: {e}")
+    yield from list(jobs_db.values())
 
 # Dev account seeding (in-memory fallback).
 # If you want a quick dev user without a DB, set DEV_USER_EMAIL and DEV_USER_PASSWORD
@@ -199,10 +312,61 @@ if not is_database_enabled():
 # Configuration - File Size Limits by Plan
 MAX_FILE_SIZE_FREE = 500 * 1024 * 1024   # 500MB for free users
 MAX_FILE_SIZE_PAID = 5 * 1024 * 1024 * 1024  # 5GB for Pro/Agency users
+
+
+def format_file_size(size: int) -> str:
+    """Human-readable upload limit: '5.0GB' at or above 1GB, otherwise '500MB'"""
+    size_gb = size / 1024 / 1024 / 1024
+    return f"{size_gb:.1f}GB" if size_gb >= 1 else f"{size / 1024 / 1024:.0f}MB"
+
+
+# Display strings for the plan limits, computed once
+_SIZE_DISPLAY = {size: format_file_size(size) for size in (MAX_FILE_SIZE_FREE, MAX_FILE_SIZE_PAID)}
+
+
+def file_size_display(size: int) -> str:
+    return _SIZE_DISPLAY.get(size) or format_file_size(size)
+
+
 ALLOWED_VIDEO_TYPES = ["video/mp4", "video/quicktime", "video/x-msvideo", "video/x-matroska"]
 ALLOWED_EXTENSIONS = [".mp4", ".mov", ".avi", ".mkv"]
 
 
+def stat_file(path: Optional[str]) -> Optional[os.stat_result]:
+    """Single stat() call replacing exists()+size checks; None if the path is missing"""
+    if not path:
+        return None
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+class VideoFileResponse(FileResponse):
+    """
+    FileResponse for clip videos: 1MB read chunks instead of Starlette's 64KB (far fewer
+    read/send iterations per file; servers implementing the zero-copy send extension use
+    sendfile automatically), byte-range support, and private browser caching.
+    """
+    chunk_size = 1024 * 1024
+    
+    def __init__(self, path: str, stat_result: os.stat_result, filename: str):
+        super().__init__(
+            path,
+            stat_result=stat_result,
+            media_type="video/mp4",
+            filename=filename,
+            headers={"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=3600"}
+        )
+
+
+def _as_iso(value) -> Optional[str]:
+    """Pass through SQL-formatted timestamps; format datetimes only when the DB couldn't"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
 def get_user_max_file_size(user_email: str) -> int:
     """Get the maximum file size allowed for a user based on their subscription plan"""
     if is_database_enabled():
@@ -292,27 +456,10 @@ class JobStatus(BaseModel):
 
 # Helper functions
 def verify_password(plain_password, hashed_password):
-    # bcrypt has a 72-byte input limit; truncate to avoid ValueError on long inputs.
-    if plain_password is None:
-        return False
-    try:
-        pw_bytes = str(plain_password).encode('utf-8', errors='ignore')
-        if len(pw_bytes) > 72:
-            pw_bytes = pw_bytes[:72]
-        pw = pw_bytes.decode('utf-8', errors='ignore')
-        return pwd_context.verify(pw, hashed_password)
-    except Exception:
-        return False
+    return hashing.verify_password(plain_password, hashed_password)
 
 def get_password_hash(password):
-    # Truncate to bcrypt 72-byte limit to avoid encoding errors across environments.
-    if password is None:
-        raise ValueError("Password cannot be None")
-    pw_bytes = str(password).encode('utf-8', errors='ignore')
-    if len(pw_bytes) > 72:
-        pw_bytes = pw_bytes[:72]
-    pw = pw_bytes.decode('utf-8', errors='ignore')
-    return pwd_context.hash(pw)
+    return hashing.hash_password(password)
 
 # Auth functions moved to auth.py module
 
@@ -533,18 +680,17 @@ async def seed_dev_data(current_user: dict = Depends(get_current_user)):
         db.close()
 
 @app.post("/users/register", response_model=User)
-async def register(user: UserCreate, password: str):
+async def register(user: UserCreate, password: str, background_tasks: BackgroundTasks):
     if is_database_enabled():
         # Use database
         db = get_db()
         try:
             # Check if user exists
-            existing_user = db.query(DBUser).filter(DBUser.email == user.email).first()
-            if existing_user:
+            email_taken = db.query(db.query(DBUser.id).filter(DBUser.email == user.email).exists()).scalar()
+            if email_taken:
                 raise HTTPException(status_code=400, detail="Email already registered")
             
             # Generate verification token
-            import secrets
             verification_token = secrets.token_urlsafe(32)
             
             # Create new user with free credits
@@ -562,12 +708,8 @@ async def register(user: UserCreate, password: str):
             db.commit()
             db.refresh(db_user)
             
-            # Send verification email
-            try:
-                from email_service import send_verification_email
-                send_verification_email(db_user.email, verification_token)
-            except Exception as e:
-                logger.warning(f"Failed to send verification email: {e}")
+            # Send verification email after the response
+            send_email_in_background(background_tasks, "send_verification_email", db_user.email, verification_token)
             
             return User(email=db_user.email)
         finally:
@@ -676,9 +818,7 @@ async def upload_video(
                 file_size += len(chunk)
                 if file_size > max_file_size:
                     os.remove(local_path)
-                    max_size_mb = max_file_size / 1024 / 1024
-                    max_size_gb = max_file_size / 1024 / 1024 / 1024
-                    size_str = f"{max_size_gb:.1f}GB" if max_size_gb >= 1 else f"{max_size_mb:.0f}MB"
+                    size_str = file_size_display(max_file_size)
                     upgrade_msg = " Upgrade to Pro for 5GB uploads." if max_file_size == MAX_FILE_SIZE_FREE else ""
                     raise HTTPException(
                         status_code=413,
@@ -691,7 +831,7 @@ async def upload_video(
         storage_key = None
         if storage and storage.enabled:
             storage_key = f"videos/{current_user['email']}/{unique_filename}"
-            storage_url = storage.upload_file(local_path, storage_key)
+            storage_url = await storage.async_upload_file(local_path, storage_key)
             if storage_url:
                 logger.info(f"Uploaded to cloud storage: {storage_key}")
         
@@ -767,11 +907,9 @@ async def process_video_task(job_id: str, request: VideoProcessRequest, user_ema
                 job.progress = 10
                 job.message = "Preparing video..."
                 db.commit()
+                publish_job_event(job_id, status="processing", progress=10, message="Preparing video...")
         else:
-            jobs_db[job_id]["status"] = "processing"
-            jobs_db[job_id]["progress"] = 10
-            jobs_db[job_id]["message"] = "Preparing video..."
-            jobs_db[job_id]["updated_at"] = datetime.utcnow().isoformat()
+            set_job_state(job_id, status="processing", progress=10, message="Preparing video...")
         
         if not video_processor:
             raise Exception("Video processor not initialized. Check GEMINI_API_KEY in .env file")
@@ -793,18 +931,18 @@ async def process_video_task(job_id: str, request: VideoProcessRequest, user_ema
                 job.progress = 20
                 job.message = "Downloading from YouTube..."
                 db.commit()
+                publish_job_event(job_id, progress=20, message="Downloading from YouTube...")
             else:
-                jobs_db[job_id]["progress"] = 20
-                jobs_db[job_id]["message"] = "Downloading from YouTube..."
+                set_job_state(job_id, progress=20, message="Downloading from YouTube...")
             video_path = video_processor.download_youtube_video(request.video_url)
         elif request.video_source == "kick":
             if db:
                 job.progress = 20
                 job.message = "Downloading from Kick..."
                 db.commit()
+                publish_job_event(job_id, progress=20, message="Downloading from Kick...")
             else:
-                jobs_db[job_id]["progress"] = 20
-                jobs_db[job_id]["message"] = "Downloading from Kick..."
+                set_job_state(job_id, progress=20, message="Downloading from Kick...")
             # Use the generic URL downloader which will use yt-dlp when available
             video_path = video_processor.download_video_from_url(
                 request.video_url,
@@ -816,16 +954,16 @@ async def process_video_task(job_id: str, request: VideoProcessRequest, user_ema
                 job.progress = 20
                 job.message = "Downloading video..."
                 db.commit()
+                publish_job_event(job_id, progress=20, message="Downloading video...")
             else:
-                jobs_db[job_id]["progress"] = 20
-                jobs_db[job_id]["message"] = "Downloading video..."
+                set_job_state(job_id, progress=20, message="Downloading video...")
             video_path = video_processor.download_video_from_url(
                 request.video_url,
                 cookies_text=getattr(request, 'download_cookies', None),
                 extra_headers=getattr(request, 'download_headers', None)
             )
         
-        if not video_path or not os.path.exists(video_path):
+        if stat_file(video_path) is None:
             raise Exception("Video file not found")
         
         # Process video with progress callback
@@ -834,13 +972,15 @@ async def process_video_task(job_id: str, request: VideoProcessRequest, user_ema
                 job.progress = progress
                 job.message = message
                 db.commit()
+                publish_job_event(job_id, progress=progress, message=message)
             else:
-                jobs_db[job_id]["progress"] = progress
-                jobs_db[job_id]["message"] = message
-                jobs_db[job_id]["updated_at"] = datetime.utcnow().isoformat()
+                set_job_state(job_id, progress=progress, message=message)
             logger.info(f"Job {job_id}: {message} ({progress}%)")
         
-        result = video_processor.process_video_for_clips(
+        # Transcription and the ffmpeg clip renders block for minutes: run them in a
+        # worker thread so this coroutine doesn't stall the event loop meanwhile
+        result = await asyncio.to_thread(
+            video_processor.process_video_for_clips,
             video_path=video_path,
             num_clips=request.num_clips,
             clip_duration=request.clip_duration,
@@ -849,72 +989,82 @@ async def process_video_task(job_id: str, request: VideoProcessRequest, user_ema
         )
         
         if result["success"]:
-            # Upload clips to cloud storage
-            for clip_data in result["clips"]:
-                clip_local_path = clip_data["path"]
-                storage_key = None
-                
-                if storage and storage.enabled:
-                    # Upload to cloud
-                    storage_key = f"clips/{user_email}/{job_id}/clip_{clip_data['clip_number']}.mp4"
-                    storage_url = storage.upload_file(clip_local_path, storage_key)
-                    if storage_url:
-                        logger.info(f"Clip {clip_data['clip_number']} uploaded to cloud: {storage_key}")
-                        clip_data["storage_key"] = storage_key
-                        clip_data["url"] = storage_url
-                
-                # Save clip to database
-                if db:
-                    db_clip = DBClip(
-                        job_id=job_id,
-                        clip_number=clip_data["clip_number"],
-                        storage_key=storage_key,
-                        local_path=clip_local_path,
-                        start_time=clip_data["start_time"],
-                        end_time=clip_data["end_time"],
-                        duration=clip_data["duration"],
-                        text=clip_data.get("text"),
-                        hook=clip_data.get("hook"),
-                        reason=clip_data.get("reason"),
-                        category=clip_data.get("category"),
-                        virality_score=clip_data.get("virality_score")
-                    )
-                    db.add(db_clip)
-            # Upload captions (SRT/VTT) if present
+            clips = result["clips"]
             srt_local = result.get("srt_path")
             vtt_local = result.get("vtt_path")
-            if (srt_local or vtt_local) and storage and storage.enabled:
-                try:
-                    if srt_local and os.path.exists(srt_local):
-                        srt_key = f"captions/{user_email}/{job_id}/transcript.srt"
-                        srt_url = storage.upload_file(srt_local, srt_key)
-                        if srt_url:
-                            result["srt_url"] = srt_url
-                            logger.info(f"Uploaded SRT for job {job_id}: {srt_key}")
-                    if vtt_local and os.path.exists(vtt_local):
-                        vtt_key = f"captions/{user_email}/{job_id}/transcript.vtt"
-                        vtt_url = storage.upload_file(vtt_local, vtt_key)
-                        if vtt_url:
-                            result["vtt_url"] = vtt_url
-                            logger.info(f"Uploaded VTT for job {job_id}: {vtt_key}")
-                except Exception as e:
-                    logger.warning(f"Failed to upload captions for job {job_id}: {e}")
-            
-            # Update job status
+
+            # Upload clips and captions to cloud storage concurrently
+            if storage and storage.enabled:
+                clip_prefix = f"clips/{user_email}/{job_id}/"
+                caption_prefix = f"captions/{user_email}/{job_id}/"
+                upload_keys = [
+                    f"{clip_prefix}clip_{clip_data['clip_number']}.mp4"
+                    for clip_data in clips
+                ]
+                uploads = [(clip_data["path"], key) for clip_data, key in zip(clips, upload_keys)]
+                caption_jobs = []
+                if stat_file(srt_local):
+                    caption_jobs.append(("srt", caption_prefix + "transcript.srt"))
+                    uploads.append((srt_local, caption_jobs[-1][1]))
+                if stat_file(vtt_local):
+                    caption_jobs.append(("vtt", caption_prefix + "transcript.vtt"))
+                    uploads.append((vtt_local, caption_jobs[-1][1]))
+
+                urls = await storage.upload_many(uploads)
+
+                for clip_data, key, url in zip(clips, upload_keys, urls):
+                    if isinstance(url, Exception):
+                        logger.warning(f"Failed to upload clip {clip_data['clip_number']} for job {job_id}: {url}")
+                    elif url:
+                        logger.info(f"Clip {clip_data['clip_number']} uploaded to cloud: {key}")
+                        clip_data["storage_key"] = key
+                        clip_data["url"] = url
+                        # Clip is served from storage now; free local disk (DB mode only,
+                        # the in-memory fallback still serves downloads from the local path)
+                        if db and DELETE_LOCAL_AFTER_UPLOAD:
+                            try:
+                                os.unlink(clip_data["path"])
+                                clip_data["path"] = None
+                            except OSError as e:
+                                logger.warning(f"Could not remove local clip {clip_data['path']}: {e}")
+
+                for (fmt, key), url in zip(caption_jobs, urls[len(clips):]):
+                    if isinstance(url, Exception):
+                        logger.warning(f"Failed to upload captions for job {job_id}: {url}")
+                    elif url:
+                        result[f"{fmt}_url"] = url
+                        logger.info(f"Uploaded {fmt.upper()} for job {job_id}: {key}")
+
             num_clips_generated = len(result.get("clips", []))
             if db:
-                job.status = "completed"
-                job.progress = 100
-                job.message = "Processing complete!"
-                job.transcription = result.get("transcription")
-                job.completed_at = datetime.utcnow()
-                db.commit()
+                # Clip rows and the final job status are written atomically: a failure
+                # part-way rolls everything back instead of leaving half a job behind.
+                if db.in_transaction():
+                    db.commit()
+                with db.begin():
+                    for clip_data in clips:
+                        db.add(DBClip(
+                            job_id=job_id,
+                            clip_number=clip_data["clip_number"],
+                            storage_key=clip_data.get("storage_key"),
+                            local_path=clip_data["path"],
+                            start_time=clip_data["start_time"],
+                            end_time=clip_data["end_time"],
+                            duration=clip_data["duration"],
+                            text=clip_data.get("text"),
+                            hook=clip_data.get("hook"),
+                            reason=clip_data.get("reason"),
+                            category=clip_data.get("category"),
+                            virality_score=clip_data.get("virality_score")
+                        ))
+                    job.status = "completed"
+                    job.progress = 100
+                    job.message = "Processing complete!"
+                    job.transcription = result.get("transcription")
+                    job.completed_at = datetime.utcnow()
+                publish_job_event(job_id, status="completed", progress=100, message="Processing complete!")
             else:
-                jobs_db[job_id]["status"] = "completed"
-                jobs_db[job_id]["progress"] = 100
-                jobs_db[job_id]["message"] = "Processing complete!"
-                jobs_db[job_id]["result"] = result
-                jobs_db[job_id]["updated_at"] = datetime.utcnow().isoformat()
+                set_job_state(job_id, status="completed", progress=100, message="Processing complete!", result=result)
             
             logger.info(f"Job {job_id} completed successfully with {num_clips_generated} clips")
             
@@ -933,29 +1083,44 @@ async def process_video_task(job_id: str, request: VideoProcessRequest, user_ema
             job.status = "failed"
             job.error = str(e)
             db.commit()
+            publish_job_event(job_id, status="failed", error=str(e))
         else:
-            jobs_db[job_id]["status"] = "failed"
-            jobs_db[job_id]["error"] = str(e)
-            jobs_db[job_id]["updated_at"] = datetime.utcnow().isoformat()
+            set_job_state(job_id, status="failed", error=str(e))
     finally:
         if db:
             db.close()
 
 
+# Event loop reused across RQ jobs in the same worker process (avoids per-job loop setup)
+_worker_loop = None
+
+
+def _get_worker_loop():
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+
 def process_video_task_sync(job_id: str, request_payload: dict, user_email: str):
     """
     Synchronous wrapper to allow enqueuing the async `process_video_task` with RQ.
-    Accepts a serializable dict for the request and runs the async task in an event loop.
+    Accepts a serializable dict for the request and runs the async task on the
+    worker's persistent event loop.
     """
-    import asyncio
     try:
-        # Recreate Pydantic model if needed
+        # Recreate Pydantic model if needed. The payload was already validated by FastAPI
+        # at enqueue time, so trusted deployments can skip re-validation.
         if isinstance(request_payload, dict):
-            req = VideoProcessRequest(**request_payload)
+            if TRUST_QUEUE_PAYLOADS and hasattr(VideoProcessRequest, "model_construct"):
+                req = VideoProcessRequest.model_construct(**request_payload)
+            else:
+                req = VideoProcessRequest(**request_payload)
         else:
             req = request_payload
 
-        asyncio.run(process_video_task(job_id, req, user_email))
+        _get_worker_loop().run_until_complete(process_video_task(job_id, req, user_email))
     except Exception as e:
         # RQ will capture exceptions; log here as well
         logger = logging.getLogger(__name__)
@@ -989,6 +1154,7 @@ async def process_video(
                     # Deduct credit
                     user.credits = (user.credits or 0) - 1
                     db.commit()
+                    user_cache.invalidate(user.id)
                     logger.info(f"Deducted 1 credit from {user.email}, remaining: {user.credits}")
                     
                     # Send low credits warning if needed
@@ -1030,17 +1196,19 @@ async def process_video(
             finally:
                 db.close()
         else:
-            jobs_db[job_id] = {
-                "job_id": job_id,
-                "status": "queued",
-                "progress": 0,
-                "message": "Job queued...",
-                "result": None,
-                "error": None,
-                "user": current_user["email"],
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }
+            now = datetime.utcnow().isoformat()
+            set_job_state(
+                job_id,
+                job_id=job_id,
+                status="queued",
+                progress=0,
+                message="Job queued...",
+                result=None,
+                error=None,
+                user=current_user["email"],
+                created_at=now,
+                updated_at=now
+            )
         
         # Start processing: enqueue to Redis+RQ if enabled, otherwise use BackgroundTasks
         if USE_QUEUE and rq_queue is not None:
@@ -1085,19 +1253,16 @@ async def get_job_status(
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        # If using Redis queue, try to surface queue job info if available
-        if USE_QUEUE and rq_queue is not None:
-            try:
-                from rq.registry import FailedJobRegistry
-                failed_reg = FailedJobRegistry("default", connection=redis_conn)
-                failed_count = len(failed_reg)
-            except Exception:
-                failed_count = None
-
         if is_database_enabled():
             db = get_db()
             try:
-                job = db.query(DBJob).filter(DBJob.job_id == job_id).first()
+                # Load job and its clips in one go (selectin = one extra IN query, no per-row lazy loads)
+                job = (
+                    db.query(DBJob)
+                    .options(selectinload(DBJob.clips))
+                    .filter(DBJob.job_id == job_id)
+                    .first()
+                )
                 if not job:
                     raise HTTPException(status_code=404, detail="Job not found")
                 
@@ -1108,7 +1273,7 @@ async def get_job_status(
                 # Get clips if completed
                 result = None
                 if job.status == "completed":
-                    clips = db.query(DBClip).filter(DBClip.job_id == job_id).all()
+                    clips = job.clips
                     result = {
                         "clips": [
                             {
@@ -1140,13 +1305,12 @@ async def get_job_status(
             finally:
                 db.close()
         else:
-            if job_id not in jobs_db:
+            job = get_job_state(job_id)
+            if not job:
                 raise HTTPException(status_code=404, detail="Job not found")
             
-            job = jobs_db[job_id]
-            
             # Verify ownership
-            if job["user"] != current_user["email"]:
+            if job.get("user") != current_user["email"]:
                 raise HTTPException(status_code=403, detail="Access denied")
             
             return JobStatus(**job)
@@ -1158,6 +1322,106 @@ async def get_job_status(
         raise HTTPException(status_code=500, detail="Failed to fetch job status")
 
 
+# Job status WebSocket: how long to wait for an event before re-reading the job
+# state, and the longest a single stream is kept open
+JOB_STREAM_POLL_SECONDS = float(os.getenv("JOB_STREAM_POLL_SECONDS", "15"))
+JOB_STREAM_MAX_SECONDS = float(os.getenv("JOB_STREAM_MAX_SECONDS", str(2 * 60 * 60)))
+
+
+def _job_snapshot(job_id: str):
+    """(owner email, {status, progress, message, error}) for a job, or (None, None)"""
+    if is_database_enabled():
+        db = get_db()
+        try:
+            job = db.query(DBJob).filter(DBJob.job_id == job_id).first()
+            if job:
+                return job.user_email, {"status": job.status, "progress": job.progress, "message": job.message, "error": job.error}
+        finally:
+            db.close()
+        return None, None
+    job = get_job_state(job_id)
+    if job:
+        return job.get("user"), {k: job.get(k) for k in ("status", "progress", "message", "error")}
+    return None, None
+
+
+@app.websocket("/jobs/{job_id}/stream")
+async def stream_job_status(websocket: WebSocket, job_id: str, token: str = ""):
+    """
+    Push job progress over a WebSocket instead of polling /jobs/{job_id}.
+    Authenticate with ?token=<jwt>. The first message is the current job state,
+    followed by events published by the worker until the job completes or fails.
+    """
+    try:
+        current_user = await get_current_user(token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    # Look up initial state and verify ownership
+    owner, snapshot = await asyncio.to_thread(_job_snapshot, job_id)
+    if snapshot is None or owner != current_user["email"]:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+
+    if redis_conn is None:
+        # No pub/sub available: send the snapshot and let the client fall back to polling
+        await websocket.send_json(snapshot)
+        await websocket.close()
+        return
+
+    pubsub = get_async_redis().pubsub()
+    channel = f"{_job_state_key(job_id)}:events"
+    try:
+        # Subscribe first, then read the state to send: an event published after
+        # the read is then always delivered (at worst one update arrives twice)
+        await pubsub.subscribe(channel)
+        _, snapshot = await asyncio.to_thread(_job_snapshot, job_id)
+        if snapshot is None:
+            return
+        await websocket.send_json(snapshot)
+        if snapshot.get("status") in ("completed", "failed"):
+            return
+
+        deadline = time.monotonic() + JOB_STREAM_MAX_SECONDS
+        while time.monotonic() < deadline:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=JOB_STREAM_POLL_SECONDS)
+            if message is None:
+                # Quiet period: re-read the state in case an event was lost (e.g. a
+                # Redis reconnect), which also keeps idle proxies from dropping the socket
+                _, latest = await asyncio.to_thread(_job_snapshot, job_id)
+                if latest is None:
+                    break
+                if latest != snapshot:
+                    snapshot = latest
+                    await websocket.send_json(snapshot)
+                if snapshot.get("status") in ("completed", "failed"):
+                    break
+                continue
+            if message.get("type") != "message":
+                continue
+            data = message["data"]
+            await websocket.send_text(data.decode() if isinstance(data, bytes) else data)
+            if _json_loads(data).get("status") in ("completed", "failed"):
+                break
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"Job stream for {job_id} ended with error: {e}")
+    finally:
+        try:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+        except Exception:
+            pass
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+
 @app.get("/jobs/{job_id}/captions/{fmt}")
 async def download_captions(
     job_id: str,
@@ -1189,11 +1453,11 @@ async def download_captions(
         finally:
             db.close()
     else:
-        # In-memory jobs_db contains job['result'] with srt_path/vtt_path OR srt_url/vtt_url
-        if job_id not in jobs_db:
+        # In-memory job state contains job['result'] with srt_path/vtt_path OR srt_url/vtt_url
+        job = get_job_state(job_id)
+        if not job:
             raise HTTPException(status_code=404, detail="Job not found")
-        job = jobs_db[job_id]
-        if job["user"] != current_user["email"]:
+        if job.get("user") != current_user["email"]:
             raise HTTPException(status_code=403, detail="Access denied")
 
         result = job.get("result") or {}
@@ -1205,26 +1469,40 @@ async def download_captions(
             from fastapi.responses import RedirectResponse
             return RedirectResponse(url=result.get(url_key))
 
-        if result.get(local_key) and os.path.exists(result.get(local_key)):
-            return FileResponse(result.get(local_key), media_type='text/vtt' if fmt == 'vtt' else 'text/plain', filename=f"transcript.{fmt}")
+        local_path = result.get(local_key)
+        local_stat = stat_file(local_path)
+        if local_stat:
+            # Hand the stat result to FileResponse so it doesn't stat the file again
+            return FileResponse(local_path, stat_result=local_stat, media_type='text/vtt' if fmt == 'vtt' else 'text/plain', filename=f"transcript.{fmt}")
 
         raise HTTPException(status_code=404, detail="Captions not available for this job")
 
 
 # Admin endpoints when queueing is enabled
+FAILED_COUNT_TTL = 5  # seconds; admin dashboards poll this often
+_failed_count_cache = {"value": None, "expires": 0.0}
+
+
+def get_failed_job_count() -> int:
+    """Failed-job count via ZCARD (FailedJobRegistry.count), cached for a few seconds"""
+    now = time.monotonic()
+    if _failed_count_cache["value"] is None or now >= _failed_count_cache["expires"]:
+        from rq.registry import FailedJobRegistry
+        _failed_count_cache["value"] = FailedJobRegistry(rq_queue.name, connection=redis_conn).count
+        _failed_count_cache["expires"] = now + FAILED_COUNT_TTL
+    return _failed_count_cache["value"]
+
+
 @app.get("/admin/queue/status")
 async def admin_queue_status():
     if not USE_QUEUE or rq_queue is None:
         raise HTTPException(status_code=404, detail="Queueing not enabled")
     try:
-        from rq.registry import FailedJobRegistry
-        from rq import Queue
-
         q = rq_queue
         stats = {
             "queue_name": q.name,
             "queued_jobs": q.count,
-            "failed_jobs": len(FailedJobRegistry(q.name, connection=redis_conn)),
+            "failed_jobs": get_failed_job_count(),
         }
         return stats
     except Exception as e:
@@ -1233,7 +1511,11 @@ async def admin_queue_status():
 
 
 @app.get("/admin/queue/failed")
-async def admin_failed_jobs():
+async def admin_failed_jobs(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0)
+):
+    """List failed queue jobs (paginated). Tracebacks are served by /admin/queue/failed/{job_id}."""
     if not USE_QUEUE or rq_queue is None:
         raise HTTPException(status_code=404, detail="Queueing not enabled")
     try:
@@ -1241,26 +1523,58 @@ async def admin_failed_jobs():
         from rq.job import Job
 
         failed_reg = FailedJobRegistry(rq_queue.name, connection=redis_conn)
-        failed_ids = failed_reg.get_job_ids()
+        failed_ids = failed_reg.get_job_ids(offset, offset + limit - 1)
+        # fetch_many pipelines the HGETALLs into a single round-trip
+        jobs = Job.fetch_many(failed_ids, connection=redis_conn)
         failed_jobs = []
-        for jid in failed_ids:
-            try:
-                job = Job.fetch(jid, connection=redis_conn)
-                failed_jobs.append({
-                    "id": jid,
-                    "origin": job.origin,
-                    "exc_info": job.exc_info,
-                    "last_failed_at": str(job.enqueued_at)
-                })
-            except Exception:
+        for jid, job in zip(failed_ids, jobs):
+            if job is None:
                 failed_jobs.append({"id": jid, "error": "could not fetch job"})
+                continue
+            failed_jobs.append({
+                "id": jid,
+                "origin": job.origin,
+                "last_failed_at": str(job.enqueued_at)
+            })
 
-        return {"failed_jobs": failed_jobs}
+        return {
+            "failed_jobs": failed_jobs,
+            "total": get_failed_job_count(),
+            "limit": limit,
+            "offset": offset
+        }
     except Exception as e:
         logger.error(f"Error fetching failed jobs: {e}")
         raise HTTPException(status_code=500, detail="Failed to list failed jobs")
 
 
+@app.get("/admin/queue/failed/{rq_job_id}")
+async def admin_failed_job_detail(rq_job_id: str):
+    """Full details (including traceback) for a single failed queue job"""
+    if not USE_QUEUE or rq_queue is None:
+        raise HTTPException(status_code=404, detail="Queueing not enabled")
+    try:
+        from rq.job import Job
+        from rq.exceptions import NoSuchJobError
+
+        try:
+            job = Job.fetch(rq_job_id, connection=redis_conn)
+        except NoSuchJobError:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        return {
+            "id": rq_job_id,
+            "origin": job.origin,
+            "exc_info": job.exc_info,
+            "last_failed_at": str(job.enqueued_at)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching failed job {rq_job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch failed job")
+
+
 # ============================================================================
 # ADMIN DASHBOARD ENDPOINTS
 # ============================================================================
@@ -1280,71 +1594,93 @@ async def require_admin(current_user: dict = Depends(get_current_user)):
         db.close()
 
 
+admin_stats_cache = TTLCache(ttl=30, maxsize=8)
+
+
 @app.get("/admin/stats")
 async def admin_stats(current_user: dict = Depends(require_admin)):
-    """Get admin dashboard statistics"""
+    """Get admin dashboard statistics (cached for 30s)"""
+    cached = admin_stats_cache.get("stats")
+    if cached is not None:
+        return cached
+    
     db = get_db()
     try:
-        from sqlalchemy import func
+        from sqlalchemy import func, case
         
-        # User stats
-        total_users = db.query(func.count(DBUser.id)).scalar() or 0
-        verified_users = db.query(func.count(DBUser.id)).filter(DBUser.email_verified == True).scalar() or 0
+        # One conditional-aggregate query per table instead of one query per number
+        total_users, verified_users = db.query(
+            func.count(DBUser.id),
+            func.count(case((DBUser.email_verified == True, 1)))
+        ).one()
         
-        # Job stats
-        total_jobs = db.query(func.count(DBJob.id)).scalar() or 0
-        completed_jobs = db.query(func.count(DBJob.id)).filter(DBJob.status == "completed").scalar() or 0
+        total_jobs, completed_jobs = db.query(
+            func.count(DBJob.id),
+            func.count(case((DBJob.status == "completed", 1)))
+        ).one()
         
-        # Clip stats
-        total_clips = db.query(func.count(DBClip.id)).scalar() or 0
-        total_revenue = db.query(func.sum(DBClip.revenue)).scalar() or 0
+        # Sums are rounded to cents in SQL
+        total_clips, total_revenue = db.query(
+            func.count(DBClip.id),
+            money_sum(DBClip.revenue)
+        ).one()
         
         # Payout stats
         pending_payouts = 0
         pending_payout_amount = 0.0
         if Payout:
-            pending_payouts = db.query(func.count(Payout.id)).filter(Payout.status == PayoutStatus.PENDING).scalar() or 0
-            pending_payout_amount = db.query(func.sum(Payout.amount)).filter(Payout.status == PayoutStatus.PENDING).scalar() or 0.0
+            pending_payouts, pending_payout_amount = db.query(
+                func.count(Payout.id),
+                money_sum(Payout.amount)
+            ).filter(Payout.status == PayoutStatus.PENDING).one()
         
-        return {
+        stats = {
             "total_users": total_users,
             "verified_users": verified_users,
             "total_jobs": total_jobs,
             "completed_jobs": completed_jobs,
             "total_clips": total_clips,
-            "total_revenue": round(total_revenue, 2),
+            "total_revenue": total_revenue,
             "pending_payouts": pending_payouts,
-            "pending_payout_amount": round(pending_payout_amount, 2)
+            "pending_payout_amount": pending_payout_amount
         }
+        admin_stats_cache.set("stats", stats)
+        return stats
     finally:
         db.close()
 
 
 @app.get("/admin/users")
 async def admin_list_users(
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0, le=1_000_000),
+    before: Optional[datetime] = None,
     current_user: dict = Depends(require_admin)
 ):
-    """List all users for admin"""
+    """List all users for admin (pass the last row's created_at as `before` for keyset paging)"""
     db = get_db()
     try:
-        users = db.query(DBUser).order_by(DBUser.created_at.desc()).offset(offset).limit(limit).all()
+        # Plain column rows: tier default and timestamp formatting happen in SQL
+        # (or in the JSON encoder when the dialect has no formatter)
+        created_col = iso_timestamp(DBUser.created_at)
+        query = db.query(
+            DBUser.id, DBUser.email, DBUser.credits,
+            enum_value(DBUser.tier, "bronze").label("tier"),
+            DBUser.email_verified, DBUser.is_admin, DBUser.total_clips, DBUser.total_earnings,
+            (DBUser.created_at if created_col is None else created_col).label("created_at")
+        )
+        if before is not None:
+            query = query.filter(DBUser.created_at < before)
+        
+        rows = (
+            query
+            .order_by(DBUser.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
         
-        return [
-            {
-                "id": u.id,
-                "email": u.email,
-                "credits": u.credits,
-                "tier": u.tier.value if u.tier else "bronze",
-                "email_verified": u.email_verified,
-                "is_admin": u.is_admin,
-                "total_clips": u.total_clips,
-                "total_earnings": u.total_earnings,
-                "created_at": u.created_at.isoformat() if u.created_at else None
-            }
-            for u in users
-        ]
+        return [row._asdict() for row in rows]
     finally:
         db.close()
 
@@ -1361,14 +1697,21 @@ async def admin_add_credits(
     
     db = get_db()
     try:
-        user = db.query(DBUser).filter(DBUser.id == user_id).first()
-        if not user:
+        # Atomic server-side increment (no read-modify-write race between concurrent grants)
+        row = db.execute(
+            update(DBUser)
+            .where(DBUser.id == user_id)
+            .values(credits=func.coalesce(DBUser.credits, 0) + amount)
+            .returning(DBUser.credits, DBUser.email)
+        ).one_or_none()
+        if row is None:
+            db.rollback()
             raise HTTPException(status_code=404, detail="User not found")
-        
-        user.credits += amount
         db.commit()
+        user_cache.invalidate(user_id)
         
-        return {"message": f"Added {amount} credits to {user.email}", "new_balance": user.credits}
+        new_balance, email = row
+        return {"message": f"Added {amount} credits to {email}", "new_balance": new_balance}
     finally:
         db.close()
 
@@ -1408,6 +1751,7 @@ async def admin_set_subscription(
             user.subscription_expires = None  # Never expires
         
         db.commit()
+        user_cache.invalidate(user_id)
         
         expires_str = user.subscription_expires.isoformat() if user.subscription_expires else "never"
         return {
@@ -1422,27 +1766,39 @@ async def admin_set_subscription(
 
 @app.get("/admin/payouts")
 async def admin_list_payouts(
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=500),
+    offset: int = Query(0, ge=0, le=1_000_000),
+    before: Optional[datetime] = None,
     current_user: dict = Depends(require_admin)
 ):
-    """List payout requests"""
+    """List payout requests (pass the last row's requested_at as `before` for keyset paging)"""
     if not Payout:
         return []
     
     db = get_db()
     try:
-        payouts = db.query(Payout).order_by(Payout.requested_at.desc()).limit(limit).all()
+        # Resolve clipper emails in the same query (outer join) instead of one lookup per payout
+        query = db.query(Payout, DBUser.email).outerjoin(DBUser, DBUser.id == Payout.clipper_id)
+        if before is not None:
+            query = query.filter(Payout.requested_at < before)
+        
+        rows = (
+            query
+            .order_by(Payout.requested_at.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
         
         result = []
-        for p in payouts:
-            clipper = db.query(DBUser).filter(DBUser.id == p.clipper_id).first()
+        for p, clipper_email in rows:
             result.append({
                 "id": p.id,
                 "clipper_id": p.clipper_id,
-                "clipper_email": clipper.email if clipper else "Unknown",
+                "clipper_email": clipper_email or "Unknown",
                 "amount": p.amount,
                 "status": p.status.value if p.status else "pending",
-                "requested_at": p.requested_at.isoformat() if p.requested_at else None
+                "requested_at": p.requested_at
             })
         
         return result
@@ -1521,16 +1877,16 @@ async def download_clip(
         if is_database_enabled():
             db = get_db()
             try:
-                # Find clip by ID
-                clip = db.query(DBClip).filter(DBClip.id == clip_id).first()
+                # Find clip by ID, scoped to the current user's jobs
+                clip = (
+                    db.query(DBClip)
+                    .join(DBJob, DBJob.job_id == DBClip.job_id)
+                    .filter(DBClip.id == clip_id, DBJob.user_email == current_user["email"])
+                    .first()
+                )
                 if not clip:
                     raise HTTPException(status_code=404, detail="Clip not found")
                 
-                # Verify ownership
-                job = db.query(DBJob).filter(DBJob.job_id == clip.job_id).first()
-                if not job or job.user_email != current_user["email"]:
-                    raise HTTPException(status_code=403, detail="Access denied")
-                
                 # If clip is in cloud storage, generate presigned URL
                 if clip.storage_key and storage and storage.enabled:
                     presigned_url = storage.generate_presigned_url(clip.storage_key, expiration=3600)
@@ -1540,12 +1896,9 @@ async def download_clip(
                         return RedirectResponse(url=presigned_url)
                 
                 # Fallback to local file
-                if clip.local_path and os.path.exists(clip.local_path):
-                    return FileResponse(
-                        clip.local_path,
-                        media_type="video/mp4",
-                        filename=f"clip_{clip.clip_number}.mp4"
-                    )
+                local_stat = stat_file(clip.local_path)
+                if local_stat:
+                    return VideoFileResponse(clip.local_path, local_stat, f"clip_{clip.clip_number}.mp4")
                 
                 raise HTTPException(status_code=404, detail="Clip file not found")
             finally:
@@ -1553,21 +1906,18 @@ async def download_clip(
         else:
             # Fallback to in-memory
             clip_path = None
-            for job in jobs_db.values():
-                if job["user"] == current_user["email"] and job["result"]:
+            for job in iter_job_states():
+                if job.get("user") == current_user["email"] and job.get("result"):
                     for clip_data in job["result"].get("clips", []):
                         if clip_data.get("clip_number") == clip_id:
                             clip_path = clip_data.get("path")
                             break
             
-            if not clip_path or not os.path.exists(clip_path):
+            clip_stat = stat_file(clip_path)
+            if not clip_stat:
                 raise HTTPException(status_code=404, detail="Clip not found")
             
-            return FileResponse(
-                clip_path,
-                media_type="video/mp4",
-                filename=f"clip_{clip_id}.mp4"
-            )
+            return VideoFileResponse(clip_path, clip_stat, f"clip_{clip_id}.mp4")
     
     except HTTPException:
         raise
@@ -1581,39 +1931,61 @@ async def get_all_clips(
     category: Optional[str] = None,
     sort_by: str = "created_at",
     order: str = "desc",
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    include_total: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all clips for current user with optional filters"""
+    """Get clips for current user with optional filters (paginated; total only on request)"""
     try:
         if not is_database_enabled():
             raise HTTPException(status_code=501, detail="Database not configured")
         
-        db = get_db()
-        try:
-            # Get all jobs for user
-            user_jobs = db.query(DBJob).filter(DBJob.user_email == current_user["email"]).all()
-            job_ids = [job.job_id for job in user_jobs]
+        async with get_async_db() as db:
+            # Timestamps come back pre-formatted from SQL where the dialect supports it
+            created_col = iso_timestamp(DBClip.created_at)
+            posted_col = iso_timestamp(DBClip.posted_at)
+            if created_col is None:
+                created_col, posted_col = DBClip.created_at, DBClip.posted_at
             
-            # Query clips
-            query = db.query(DBClip).filter(DBClip.job_id.in_(job_ids))
+            # Query the user's clips through a single join on jobs, loading only listed columns
+            stmt = (
+                select(DBClip, created_col, posted_col)
+                .options(load_only(
+                    DBClip.id, DBClip.clip_number, DBClip.job_id, DBClip.start_time, DBClip.end_time,
+                    DBClip.duration, DBClip.text, DBClip.hook, DBClip.category, DBClip.virality_score,
+                    DBClip.views, DBClip.revenue, DBClip.platform, DBClip.storage_key
+                ))
+                .join(DBJob, DBJob.job_id == DBClip.job_id)
+                .where(DBJob.user_email == current_user["email"])
+            )
             
             # Apply filters
             if platform:
-                query = query.filter(DBClip.platform == platform)
+                stmt = stmt.where(DBClip.platform == platform)
             if category:
-                query = query.filter(DBClip.category == category)
+                stmt = stmt.where(DBClip.category == category)
             
-            # Apply sorting
+            # Apply sorting; id breaks ties so offset pages neither repeat nor skip rows
             if sort_by == "views":
-                query = query.order_by(DBClip.views.desc() if order == "desc" else DBClip.views.asc())
+                sort_col = DBClip.views
             elif sort_by == "revenue":
-                query = query.order_by(DBClip.revenue.desc() if order == "desc" else DBClip.revenue.asc())
+                sort_col = DBClip.revenue
             elif sort_by == "virality_score":
-                query = query.order_by(DBClip.virality_score.desc() if order == "desc" else DBClip.virality_score.asc())
+                sort_col = DBClip.virality_score
             else:  # created_at
-                query = query.order_by(DBClip.created_at.desc() if order == "desc" else DBClip.created_at.asc())
+                sort_col = DBClip.created_at
+            if order == "desc":
+                stmt = stmt.order_by(sort_col.desc(), DBClip.id.desc())
+            else:
+                stmt = stmt.order_by(sort_col.asc(), DBClip.id.asc())
             
-            clips = query.all()
+            # Count without ordering/paging, and only when the caller asks for it
+            total = None
+            if include_total:
+                count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+                total = (await db.execute(count_stmt)).scalar_one()
+            rows = (await db.execute(stmt.offset(offset).limit(limit))).all()
             
             return {
                 "clips": [
@@ -1626,22 +1998,21 @@ async def get_all_clips(
                         "duration": clip.duration,
                         "text": clip.text,
                         "hook": clip.hook,
-                        "reason": clip.reason,
                         "category": clip.category,
                         "virality_score": clip.virality_score,
                         "views": clip.views,
                         "revenue": clip.revenue,
                         "platform": clip.platform,
-                        "posted_at": clip.posted_at.isoformat() if clip.posted_at else None,
-                        "created_at": clip.created_at.isoformat(),
+                        "posted_at": _as_iso(posted_at),
+                        "created_at": _as_iso(created_at),
                         "storage_key": clip.storage_key
                     }
-                    for clip in clips
+                    for clip, created_at, posted_at in rows
                 ],
-                "total": len(clips)
+                "total": total,
+                "limit": limit,
+                "offset": offset
             }
-        finally:
-            db.close()
     except HTTPException:
         raise
     except Exception as e:
@@ -1660,15 +2031,16 @@ async def get_clip_details(
         
         db = get_db()
         try:
-            clip = db.query(DBClip).filter(DBClip.id == clip_id).first()
+            # Fetch the clip only if it belongs to the current user (single query)
+            clip = (
+                db.query(DBClip)
+                .join(DBJob, DBJob.job_id == DBClip.job_id)
+                .filter(DBClip.id == clip_id, DBJob.user_email == current_user["email"])
+                .first()
+            )
             if not clip:
                 raise HTTPException(status_code=404, detail="Clip not found")
             
-            # Verify ownership
-            job = db.query(DBJob).filter(DBJob.job_id == clip.job_id).first()
-            if not job or job.user_email != current_user["email"]:
-                raise HTTPException(status_code=403, detail="Access denied")
-            
             return {
                 "id": clip.id,
                 "clip_number": clip.clip_number,
@@ -1684,9 +2056,9 @@ async def get_clip_details(
                 "views": clip.views,
                 "revenue": clip.revenue,
                 "platform": clip.platform,
-                "posted_at": clip.posted_at.isoformat() if clip.posted_at else None,
-                "last_updated": clip.last_updated.isoformat() if clip.last_updated else None,
-                "created_at": clip.created_at.isoformat(),
+                "posted_at": clip.posted_at,
+                "last_updated": clip.last_updated,
+                "created_at": clip.created_at,
                 "storage_key": clip.storage_key,
                 "local_path": clip.local_path
             }
@@ -1698,6 +2070,8 @@ async def get_clip_details(
         logger.error(f"Error fetching clip details: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch clip details")
 
+_VALID_PLATFORMS = frozenset({'tiktok', 'youtube', 'instagram', 'facebook', 'twitter', 'other'})
+
 class ClipAnalyticsUpdate(BaseModel):
     views: Optional[int] = None
     revenue: Optional[float] = None
@@ -1706,7 +2080,7 @@ class ClipAnalyticsUpdate(BaseModel):
     
     @validator('platform')
     def validate_platform(cls, v):
-        if v and v not in ['tiktok', 'youtube', 'instagram', 'facebook', 'twitter', 'other']:
+        if v and v not in _VALID_PLATFORMS:
             raise ValueError('Invalid platform')
         return v
 
@@ -1723,15 +2097,16 @@ async def update_clip_analytics(
         
         db = get_db()
         try:
-            clip = db.query(DBClip).filter(DBClip.id == clip_id).first()
+            # Fetch the clip only if it belongs to the current user (single query)
+            clip = (
+                db.query(DBClip)
+                .join(DBJob, DBJob.job_id == DBClip.job_id)
+                .filter(DBClip.id == clip_id, DBJob.user_email == current_user["email"])
+                .first()
+            )
             if not clip:
                 raise HTTPException(status_code=404, detail="Clip not found")
             
-            # Verify ownership
-            job = db.query(DBJob).filter(DBJob.job_id == clip.job_id).first()
-            if not job or job.user_email != current_user["email"]:
-                raise HTTPException(status_code=403, detail="Access denied")
-            
             # Update fields
             if analytics.views is not None:
                 clip.views = analytics.views
@@ -1762,6 +2137,10 @@ async def update_clip_analytics(
         logger.error(f"Error updating clip analytics: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update analytics")
 
+# Keeps in-flight background view refreshes referenced until they finish
+_rollup_refreshes = set()
+
+
 @app.get("/analytics/dashboard")
 async def get_dashboard_analytics(current_user: dict = Depends(get_current_user)):
     """Get dashboard analytics summary"""
@@ -1769,57 +2148,112 @@ async def get_dashboard_analytics(current_user: dict = Depends(get_current_user)
         if not is_database_enabled():
             raise HTTPException(status_code=501, detail="Database not configured")
         
-        db = get_db()
-        try:
-            # Get all user's jobs
-            user_jobs = db.query(DBJob).filter(DBJob.user_email == current_user["email"]).all()
-            job_ids = [job.job_id for job in user_jobs]
-            
-            # Get all clips
-            clips = db.query(DBClip).filter(DBClip.job_id.in_(job_ids)).all()
-            
-            # Calculate stats
-            total_clips = len(clips)
-            total_views = sum(clip.views for clip in clips)
-            total_revenue = sum(clip.revenue for clip in clips)
+        async with get_async_db() as db:
+            # Aggregate in SQL; only the top-5 rows are ever materialized in Python
+            def user_clips(*columns):
+                return (
+                    select(*columns)
+                    .select_from(DBClip)
+                    .join(DBJob, DBJob.job_id == DBClip.job_id)
+                    .where(DBJob.user_email == current_user["email"])
+                )
             
-            # Platform breakdown
-            platform_stats = {}
-            for clip in clips:
-                if clip.platform:
-                    if clip.platform not in platform_stats:
-                        platform_stats[clip.platform] = {"clips": 0, "views": 0, "revenue": 0}
-                    platform_stats[clip.platform]["clips"] += 1
-                    platform_stats[clip.platform]["views"] += clip.views
-                    platform_stats[clip.platform]["revenue"] += clip.revenue
+            totals_columns = (
+                func.count(DBClip.id),
+                func.coalesce(func.sum(DBClip.views), 0),
+                money_sum(DBClip.revenue)
+            )
             
-            # Category breakdown
-            category_stats = {}
-            for clip in clips:
-                if clip.category:
-                    if clip.category not in category_stats:
-                        category_stats[clip.category] = {"clips": 0, "views": 0, "avg_virality": 0}
-                    category_stats[clip.category]["clips"] += 1
-                    category_stats[clip.category]["views"] += clip.views
+            use_rollup = clip_rollup_available()
+            if use_rollup and clip_rollup_stale():
+                # Refresh off the request path and answer this request from live rows,
+                # so the totals never disagree with the live top clips by more than
+                # CLIP_ROLLUP_MAX_AGE seconds
+                refresh = asyncio.ensure_future(asyncio.to_thread(refresh_clip_rollup))
+                _rollup_refreshes.add(refresh)
+                refresh.add_done_callback(_rollup_refreshes.discard)
+                use_rollup = False
             
-            # Calculate average virality per category
-            for category in category_stats:
-                category_clips = [c for c in clips if c.category == category and c.virality_score]
-                if category_clips:
-                    category_stats[category]["avg_virality"] = sum(c.virality_score for c in category_clips) / len(category_clips)
+            if use_rollup:
+                # PostgreSQL: totals and breakdowns come from the per-user materialized view
+                r = user_clip_rollup.c
+                rollup_rows = (await db.execute(
+                    select(r.platform, r.category, r.clips, r.views, r.revenue, r.virality_sum, r.virality_count)
+                    .where(r.user_email == current_user["email"])
+                )).all()
+                
+                total_clips = sum(row.clips for row in rollup_rows)
+                total_views = sum(row.views for row in rollup_rows)
+                total_revenue = round(float(sum(row.revenue for row in rollup_rows)), 2)
+                
+                platform_stats, category_totals = {}, {}
+                for row in rollup_rows:
+                    if row.platform:
+                        stats = platform_stats.setdefault(row.platform, {"clips": 0, "views": 0, "revenue": 0})
+                        stats["clips"] += row.clips
+                        stats["views"] += row.views
+                        stats["revenue"] = round(stats["revenue"] + float(row.revenue), 2)
+                    if row.category:
+                        totals = category_totals.setdefault(row.category, [0, 0, 0.0, 0])
+                        totals[0] += row.clips
+                        totals[1] += row.views
+                        totals[2] += float(row.virality_sum)
+                        totals[3] += row.virality_count
+                category_stats = {
+                    category: {
+                        "clips": clips,
+                        "views": views,
+                        "avg_virality": virality_sum / virality_count if virality_count else 0.0
+                    }
+                    for category, (clips, views, virality_sum, virality_count) in category_totals.items()
+                }
+            else:
+                total_clips, total_views, total_revenue = (await db.execute(user_clips(*totals_columns))).one()
+                total_revenue = round(float(total_revenue), 2)
+                
+                # Platform breakdown
+                platform_rows = await db.execute(
+                    user_clips(DBClip.platform, func.count(DBClip.id), func.sum(DBClip.views), money_sum(DBClip.revenue))
+                    .where(DBClip.platform.isnot(None))
+                    .group_by(DBClip.platform)
+                )
+                platform_stats = {
+                    platform: {"clips": clips, "views": views or 0, "revenue": round(float(revenue or 0), 2)}
+                    for platform, clips, views, revenue in platform_rows
+                }
+                
+                # Category breakdown (virality averaged over clips that have a score)
+                category_rows = await db.execute(
+                    user_clips(
+                        DBClip.category,
+                        func.count(DBClip.id),
+                        func.sum(DBClip.views),
+                        func.avg(func.nullif(DBClip.virality_score, 0))
+                    )
+                    .where(DBClip.category.isnot(None))
+                    .group_by(DBClip.category)
+                )
+                category_stats = {
+                    category: {"clips": clips, "views": views or 0, "avg_virality": float(avg_virality or 0)}
+                    for category, clips, views, avg_virality in category_rows
+                }
             
             # Top performing clips
-            top_clips = sorted(clips, key=lambda x: x.views, reverse=True)[:5]
+            top_clips = (await db.execute(
+                user_clips(DBClip).order_by(DBClip.views.desc()).limit(5)
+            )).scalars().all()
             
             # Recent activity (last 30 days)
             thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            recent_clips = [c for c in clips if c.created_at >= thirty_days_ago]
+            recent_count, recent_views, recent_revenue = (await db.execute(
+                user_clips(*totals_columns).where(DBClip.created_at >= thirty_days_ago)
+            )).one()
             
             return {
                 "summary": {
                     "total_clips": total_clips,
                     "total_views": total_views,
-                    "total_revenue": round(total_revenue, 2),
+                    "total_revenue": total_revenue,
                     "avg_views_per_clip": round(total_views / total_clips, 2) if total_clips > 0 else 0,
                     "avg_revenue_per_clip": round(total_revenue / total_clips, 2) if total_clips > 0 else 0
                 },
@@ -1830,32 +2264,31 @@ async def get_dashboard_analytics(current_user: dict = Depends(get_current_user)
                         "id": clip.id,
                         "hook": clip.hook,
                         "views": clip.views,
-                        "revenue": clip.revenue,
+                        "revenue": round(clip.revenue or 0, 2),
                         "platform": clip.platform,
                         "virality_score": clip.virality_score
                     }
                     for clip in top_clips
                 ],
                 "recent_activity": {
-                    "clips_created": len(recent_clips),
-                    "views_gained": sum(c.views for c in recent_clips),
-                    "revenue_earned": round(sum(c.revenue for c in recent_clips), 2)
+                    "clips_created": recent_count,
+                    "views_gained": recent_views,
+                    "revenue_earned": round(float(recent_revenue), 2)
                 }
             }
-        finally:
-            db.close()
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching dashboard analytics: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch analytics")
 
-@app.get("/health")
-async def health_check():
+health_cache = TTLCache(ttl=5, maxsize=1)
+
+
+def _health_probes() -> dict:
+    """Dependency status for /health (cached briefly; the timestamp is not)"""
     storage = get_storage()
     return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
         "video_processor": "ready" if video_processor else "not configured",
         "ai_model": "Gemini 2.5 Flash Lite" if video_processor else "none",
         "stt_engine": STT_ENGINE,
@@ -1864,10 +2297,64 @@ async def health_check():
     }
 
 
+@app.get("/health")
+async def health_check():
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        **health_cache.get_or_set("probes", _health_probes)
+    }
+
+
 # ============================================================================
 # EMAIL VERIFICATION & PASSWORD RESET
 # ============================================================================
 
+# Per-identity limits for endpoints that trigger emails: (window seconds, max calls)
+EMAIL_ACTION_LIMITS = ((60, 1), (3600, 5))
+_email_action_counts = TTLCache(ttl=3600, maxsize=10000)
+
+
+def allow_email_action(action: str, identity: str) -> bool:
+    """
+    Rate-limit email-triggering actions per email/user before any DB work.
+    Uses Redis counters when available (shared across workers), else an in-process cache.
+    """
+    allowed = True
+    for window, limit in EMAIL_ACTION_LIMITS:
+        key = f"ratelimit:{action}:{identity}:{window}"
+        count = None
+        if redis_conn is not None:
+            try:
+                # One MULTI/EXEC: the key is created with its expiry before the first
+                # INCR, so a counter can never be left without a TTL
+                pipe = redis_conn.pipeline(transaction=True)
+                pipe.set(key, 0, ex=window, nx=True)
+                pipe.incr(key)
+                count = pipe.execute()[1]
+            except Exception as e:
+                logger.warning(f"Redis rate limit check failed: {e}")
+        if count is None:
+            count = _email_action_counts.incr(key, ttl=window)
+        if count > limit:
+            allowed = False
+    return allowed
+
+
+def send_email_in_background(background_tasks: BackgroundTasks, sender_name: str, *args):
+    """
+    Queue an email_service sender to run after the response is sent,
+    so auth endpoints don't wait on SMTP.
+    """
+    def _send():
+        try:
+            import email_service
+            getattr(email_service, sender_name)(*args)
+        except Exception as e:
+            logger.warning(f"Failed to send email ({sender_name}): {e}")
+    background_tasks.add_task(_send)
+
+
 class ForgotPasswordRequest(BaseModel):
     email: EmailStr
 
@@ -1879,35 +2366,34 @@ class VerifyEmailRequest(BaseModel):
     token: str
 
 @app.post("/auth/forgot-password")
-async def forgot_password(request: ForgotPasswordRequest):
+async def forgot_password(request: ForgotPasswordRequest, background_tasks: BackgroundTasks):
     """Send password reset email"""
     if not is_database_enabled():
         raise HTTPException(status_code=503, detail="Database not configured")
     
+    # Throttled: answer with the same generic message without touching the DB
+    if not allow_email_action("forgot-password", request.email.lower()):
+        return {"message": "If that email exists, a reset link has been sent"}
+    
+    # Single UPDATE ... RETURNING; the session is closed before the email is queued
+    token = secrets.token_urlsafe(32)
     db = get_db()
     try:
-        user = db.query(DBUser).filter(DBUser.email == request.email).first()
-        if not user:
-            # Don't reveal if email exists
-            return {"message": "If that email exists, a reset link has been sent"}
-        
-        # Generate reset token
-        import secrets
-        token = secrets.token_urlsafe(32)
-        user.reset_token = token
-        user.reset_token_expires = datetime.utcnow() + timedelta(hours=1)
+        email = db.execute(
+            update(DBUser)
+            .where(DBUser.email == request.email)
+            .values(reset_token=token, reset_token_expires=datetime.utcnow() + timedelta(hours=1))
+            .returning(DBUser.email)
+        ).scalar_one_or_none()
         db.commit()
-        
-        # Send email
-        try:
-            from email_service import send_password_reset_email
-            send_password_reset_email(user.email, token)
-        except Exception as e:
-            logger.warning(f"Failed to send reset email: {e}")
-        
-        return {"message": "If that email exists, a reset link has been sent"}
     finally:
         db.close()
+    
+    # Don't reveal if email exists
+    if email:
+        send_email_in_background(background_tasks, "send_password_reset_email", email, token)
+    
+    return {"message": "If that email exists, a reset link has been sent"}
 
 
 @app.post("/auth/reset-password")
@@ -1916,92 +2402,113 @@ async def reset_password(request: ResetPasswordRequest):
     if not is_database_enabled():
         raise HTTPException(status_code=503, detail="Database not configured")
     
+    # Check the token before doing any bcrypt work, so bogus tokens cost one indexed lookup
     db = get_db()
     try:
-        user = db.query(DBUser).filter(
-            DBUser.reset_token == request.token,
-            DBUser.reset_token_expires > datetime.utcnow()
-        ).first()
-        
-        if not user:
-            raise HTTPException(status_code=400, detail="Invalid or expired reset token")
-        
-        # Update password
-        user.hashed_password = get_password_hash(request.new_password)
-        user.reset_token = None
-        user.reset_token_expires = None
+        user_id = db.execute(
+            select(DBUser.id).where(
+                DBUser.reset_token == request.token,
+                DBUser.reset_token_expires > datetime.utcnow()
+            )
+        ).scalar_one_or_none()
+    finally:
+        db.close()
+    
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="Invalid or expired reset token")
+    
+    # bcrypt is CPU-bound: hash off the event loop and without holding a connection
+    hashed_password = await asyncio.to_thread(get_password_hash, request.new_password)
+    
+    # Consume the token in the same statement, so it can only be used once
+    db = get_db()
+    try:
+        user_id = db.execute(
+            update(DBUser)
+            .where(
+                DBUser.id == user_id,
+                DBUser.reset_token == request.token,
+                DBUser.reset_token_expires > datetime.utcnow()
+            )
+            .values(hashed_password=hashed_password, reset_token=None, reset_token_expires=None)
+            .returning(DBUser.id)
+        ).scalar_one_or_none()
         db.commit()
-        
-        return {"message": "Password reset successfully"}
     finally:
         db.close()
+    
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="Invalid or expired reset token")
+    
+    return {"message": "Password reset successfully"}
 
 
 @app.post("/auth/verify-email")
-async def verify_email(request: VerifyEmailRequest):
+async def verify_email(request: VerifyEmailRequest, background_tasks: BackgroundTasks):
     """Verify email with token"""
     if not is_database_enabled():
         raise HTTPException(status_code=503, detail="Database not configured")
     
     db = get_db()
     try:
-        user = db.query(DBUser).filter(
-            DBUser.verification_token == request.token,
-            DBUser.verification_token_expires > datetime.utcnow()
-        ).first()
-        
-        if not user:
-            raise HTTPException(status_code=400, detail="Invalid or expired verification token")
-        
-        user.email_verified = True
-        user.verification_token = None
-        user.verification_token_expires = None
+        row = db.execute(
+            update(DBUser)
+            .where(
+                DBUser.verification_token == request.token,
+                DBUser.verification_token_expires > datetime.utcnow()
+            )
+            .values(email_verified=True, verification_token=None, verification_token_expires=None)
+            .returning(DBUser.id, DBUser.email, DBUser.credits)
+        ).one_or_none()
         db.commit()
-        
-        # Send welcome email
-        try:
-            from email_service import send_welcome_email
-            send_welcome_email(user.email, user.credits or 3)
-        except Exception as e:
-            logger.warning(f"Failed to send welcome email: {e}")
-        
-        return {"message": "Email verified successfully"}
     finally:
         db.close()
+    
+    if row is None:
+        raise HTTPException(status_code=400, detail="Invalid or expired verification token")
+    
+    # Send welcome email after the response
+    user_id, email, credits = row
+    user_cache.invalidate(user_id)
+    send_email_in_background(background_tasks, "send_welcome_email", email, credits or 3)
+    
+    return {"message": "Email verified successfully"}
 
 
 @app.post("/auth/resend-verification")
-async def resend_verification(current_user: dict = Depends(get_current_user)):
+async def resend_verification(background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)):
     """Resend verification email"""
     if not is_database_enabled():
         raise HTTPException(status_code=503, detail="Database not configured")
     
+    if not allow_email_action("resend-verification", str(current_user["id"])):
+        raise HTTPException(status_code=429, detail="Verification email was sent recently. Please try again later.")
+    
+    token = secrets.token_urlsafe(32)
     db = get_db()
     try:
-        user = db.query(DBUser).filter(DBUser.email == current_user["email"]).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        if user.email_verified:
-            return {"message": "Email already verified"}
-        
-        # Generate new token
-        import secrets
-        token = secrets.token_urlsafe(32)
-        user.verification_token = token
-        user.verification_token_expires = datetime.utcnow() + timedelta(hours=24)
+        email = db.execute(
+            update(DBUser)
+            .where(DBUser.email == current_user["email"], DBUser.email_verified.isnot(True))
+            .values(verification_token=token, verification_token_expires=datetime.utcnow() + timedelta(hours=24))
+            .returning(DBUser.email)
+        ).scalar_one_or_none()
         db.commit()
         
-        # Send email
-        try:
-            from email_service import send_verification_email
-            send_verification_email(user.email, token)
-        except Exception as e:
-            logger.warning(f"Failed to send verification email: {e}")
-        
-        return {"message": "Verification email sent"}
+        # Nothing updated: either already verified or the account is gone
+        user_exists = email is not None or db.query(DBUser.id).filter(DBUser.email == current_user["email"]).first() is not None
     finally:
         db.close()
+    
+    if not user_exists:
+        raise HTTPException(status_code=404, detail="User not found")
+    if email is None:
+        return {"message": "Email already verified"}
+    
+    # Send email after the response
+    send_email_in_background(background_tasks, "send_verification_email", email, token)
+    
+    return {"message": "Verification email sent"}
 
 
 # ============================================================================
@@ -2010,29 +2517,37 @@ async def resend_verification(current_user: dict = Depends(get_current_user)):
 
 @app.get("/user/credits")
 async def get_user_credits(current_user: dict = Depends(get_current_user)):
-    """Get current user's credit balance"""
+    """Get current user's credit balance (cached per user, invalidated on writes)"""
     if not is_database_enabled():
         # In-memory mode: unlimited credits for dev
         return {"credits": 999, "is_dev_mode": True}
     
+    cached = user_cache.get(current_user["id"], "credits")
+    if cached is not None:
+        return cached
+    
+    email = current_user["email"]
     db = get_db()
     try:
-        user = db.query(DBUser).filter(DBUser.email == current_user["email"]).first()
+        # lambda_stmt: the statement is built and compiled once, later calls only bind `email`
+        user = db.execute(lambda_stmt(lambda: select(DBUser).where(DBUser.email == email))).scalars().first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        return {
+        credits = {
             "credits": user.credits or 0,
             "lifetime_purchased": user.lifetime_credits_purchased or 0,
             "tier": user.tier.value if user.tier else "bronze"
         }
+        user_cache.set(current_user["id"], "credits", credits)
+        return credits
     finally:
         db.close()
 
 
 @app.get("/user/profile")
 async def get_user_profile(current_user: dict = Depends(get_current_user)):
-    """Get current user's full profile"""
+    """Get current user's full profile (cached per user, invalidated on writes)"""
     if not is_database_enabled():
         return {
             "email": current_user["email"],
@@ -2044,9 +2559,14 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
             "max_file_size_display": "5GB"
         }
     
+    cached = user_cache.get(current_user["id"], "profile")
+    if cached is not None:
+        return cached
+    
+    email = current_user["email"]
     db = get_db()
     try:
-        user = db.query(DBUser).filter(DBUser.email == current_user["email"]).first()
+        user = db.execute(lambda_stmt(lambda: select(DBUser).where(DBUser.email == email))).scalars().first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -2059,10 +2579,9 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
         
         # Get max file size for this user
         max_file_size = get_user_max_file_size(user.email)
-        max_size_gb = max_file_size / 1024 / 1024 / 1024
-        max_size_display = f"{max_size_gb:.1f}GB" if max_size_gb >= 1 else f"{max_file_size / 1024 / 1024:.0f}MB"
+        max_size_display = file_size_display(max_file_size)
         
-        return {
+        profile = {
             "id": user.id,
             "email": user.email,
             "credits": user.credits or 0,
@@ -2076,12 +2595,14 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
             "display_name": user.display_name,
             "bio": user.bio,
             "is_admin": user.is_admin or False,
-            "created_at": user.created_at.isoformat() if user.created_at else None,
+            "created_at": user.created_at,
             "subscription_plan": subscription_plan,
-            "subscription_expires": user.subscription_expires.isoformat() if hasattr(user, 'subscription_expires') and user.subscription_expires else None,
+            "subscription_expires": user.subscription_expires,
             "max_file_size": max_file_size,
             "max_file_size_display": max_size_display
         }
+        user_cache.set(current_user["id"], "profile", profile)
+        return profile
     finally:
         db.close()
 
@@ -2090,8 +2611,7 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
 async def get_user_limits(current_user: dict = Depends(get_current_user)):
     """Get current user's upload limits and plan features"""
     max_file_size = get_user_max_file_size(current_user["email"])
-    max_size_gb = max_file_size / 1024 / 1024 / 1024
-    max_size_display = f"{max_size_gb:.1f}GB" if max_size_gb >= 1 else f"{max_file_size / 1024 / 1024:.0f}MB"
+    max_size_display = file_size_display(max_file_size)
     
     is_paid = max_file_size == MAX_FILE_SIZE_PAID
     
@@ -2119,20 +2639,29 @@ async def get_user_limits(current_user: dict = Depends(get_current_user)):
 # PRICING INFO (for frontend)
 # ============================================================================
 
+PRICING = {
+    "credit_cost_per_video": 1,
+    "free_credits_on_signup": 3,
+    "packages": [
+        {"credits": 10, "price": 9.99, "per_credit": 1.00, "popular": False},
+        {"credits": 25, "price": 19.99, "per_credit": 0.80, "popular": True},
+        {"credits": 50, "price": 34.99, "per_credit": 0.70, "popular": False},
+        {"credits": 100, "price": 59.99, "per_credit": 0.60, "popular": False},
+    ],
+    "note": "Each credit = 1 video processed (up to 10 clips)"
+}
+# Static: serialized once at import and cacheable by browsers/CDNs
+_PRICING_BODY = json.dumps(PRICING).encode()
+
+
 @app.get("/pricing")
 async def get_pricing():
     """Get pricing information for credits"""
-    return {
-        "credit_cost_per_video": 1,
-        "free_credits_on_signup": 3,
-        "packages": [
-            {"credits": 10, "price": 9.99, "per_credit": 1.00, "popular": False},
-            {"credits": 25, "price": 19.99, "per_credit": 0.80, "popular": True},
-            {"credits": 50, "price": 34.99, "per_credit": 0.70, "popular": False},
-            {"credits": 100, "price": 59.99, "per_credit": 0.60, "popular": False},
-        ],
-        "note": "Each credit = 1 video processed (up to 10 clips)"
-    }
+    return Response(
+        content=_PRICING_BODY,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
 
 
 if __name__ == "__main__":
@@ -2155,35 +2684,31 @@ async def download_clip(
     
     db = get_db()
     try:
-        # Get clip from database
-        clip = db.query(DBClip).filter(DBClip.id == clip_id).first()
+        # Get clip from database, scoped to the current user's jobs
+        clip = (
+            db.query(DBClip)
+            .join(DBJob, DBJob.job_id == DBClip.job_id)
+            .filter(DBClip.id == clip_id, DBJob.user_email == current_user["email"])
+            .first()
+        )
         if not clip:
             raise HTTPException(status_code=404, detail="Clip not found")
         
-        # Get file path (prefer local, fallback to storage)
-        file_path = clip.local_path
-        
-        if not file_path or not os.path.exists(file_path):
-            # Try storage key
-            if clip.storage_key:
-                storage = get_storage()
-                if storage and storage.enabled:
-                    # Generate presigned URL for cloud storage
-                    try:
-                        url = storage.generate_presigned_url(clip.storage_key, expiration=3600)
-                        from fastapi.responses import RedirectResponse
-                        return RedirectResponse(url=url)
-                    except Exception as e:
-                        logger.error(f"Failed to generate presigned URL: {e}")
-            
+        # Prefer a presigned redirect: the bytes then never pass through this process
+        if clip.storage_key:
+            storage = get_storage()
+            if storage and storage.enabled:
+                url = storage.generate_presigned_url(clip.storage_key, expiration=3600)
+                if url:
+                    from fastapi.responses import RedirectResponse
+                    return RedirectResponse(url=url)
+        
+        # Fallback: stream the local file (chunked by Starlette, never loaded into memory)
+        file_stat = stat_file(clip.local_path)
+        if not file_stat:
             raise HTTPException(status_code=404, detail="Clip file not found")
         
-        # Return local file
-        return FileResponse(
-            file_path,
-            media_type="video/mp4",
-            filename=f"clip_{clip_id}.mp4"
-        )
+        return VideoFileResponse(clip.local_path, file_stat, f"clip_{clip_id}.mp4")
         
     finally:
         db.close()
@@ -2,23 +2,37 @@
 Marketplace API endpoints for campaign posting and job management
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
+from bisect import bisect_right
 import json
 
+try:
+    from sqlalchemy import select, insert, update, func, bindparam, lambda_stmt
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+except ImportError:
+    select = insert = update = func = bindparam = lambda_stmt = pg_insert = sqlite_insert = None
+
 from database import (
-    get_db, is_database_enabled,
+    get_async_db, dialect_name, enum_value, is_database_enabled, claim_unique_index_available,
     Campaign, CampaignStatus,
     MarketplaceJob, MarketplaceJobStatus,
     User, UserTier, UserRole,
-    Payout, PayoutStatus,
+    Payout, PayoutStatus, PayoutJob,
     Clip  # For bonus calculation
 )
 
+from cache import TTLCache, user_cache
+
 router = APIRouter(prefix="/marketplace", tags=["marketplace"])
 
+# Public campaign listing: low-volatility and polled by every browsing clipper
+CAMPAIGN_LIST_TTL = 30  # seconds
+campaign_list_cache = TTLCache(ttl=CAMPAIGN_LIST_TTL, maxsize=256)
+
 
 # ============================================================================
 # REQUEST/RESPONSE MODELS
@@ -70,8 +84,12 @@ class JobReviewRequest(BaseModel):
     rating: Optional[int] = None  # 1-5 stars
 
 
+# Bounds the IN (...) list built from a payout request
+MAX_PAYOUT_JOBS = 500
+
+
 class PayoutRequest(BaseModel):
-    job_ids: List[int]
+    job_ids: List[int] = Field(..., min_length=1, max_length=MAX_PAYOUT_JOBS)
 
 
 # ============================================================================
@@ -94,6 +112,26 @@ def calculate_split(tier: str, amount: float) -> tuple:
     return clipper_share, platform_fee
 
 
+# Bonus tiers (views → bonus multiplier), ascending by threshold
+BONUS_TIERS = (
+    (100_000, 1.2),    # 100k views = 20% bonus
+    (500_000, 1.5),    # 500k views = 50% bonus
+    (1_000_000, 2.0),  # 1M views = 100% bonus
+    (5_000_000, 3.0),  # 5M views = 200% bonus
+)
+_BONUS_THRESHOLDS = tuple(threshold for threshold, _ in BONUS_TIERS)
+_BONUS_MULTIPLIERS = (1.0,) + tuple(multiplier for _, multiplier in BONUS_TIERS)
+
+
+def bonus_multiplier_for(views: int) -> float:
+    """Multiplier of the highest tier reached (1.0 below the first threshold)"""
+    return _BONUS_MULTIPLIERS[bisect_right(_BONUS_THRESHOLDS, views)]
+
+
+# Jobs read (and updated) per round-trip when recomputing bonuses
+BONUS_CHUNK_SIZE = 500
+
+
 # Import auth from shared module (no circular import)
 from auth import get_current_user
 
@@ -108,6 +146,15 @@ except ImportError:
     limiter = None
 
 
+async def get_marketplace_db():
+    """Dependency yielding an async DB session (503 when no database is configured)"""
+    if not is_database_enabled():
+        raise HTTPException(status_code=503, detail="Database not configured")
+    # Closing the session returns its connection to the pool (rolling back anything uncommitted)
+    async with get_async_db() as session:
+        yield session
+
+
 # ============================================================================
 # CAMPAIGN ENDPOINTS (CLIENT SIDE)
 # ============================================================================
@@ -116,129 +163,109 @@ except ImportError:
 async def create_campaign(
     request: Request,
     campaign: CampaignCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_marketplace_db)
 ):
     """Create a new campaign (clients only) - Rate limited to 5/hour"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    # Calculate total budget
+    total_budget = campaign.budget_per_clip * campaign.num_clips_needed
     
-    db = get_db()
-    try:
-        # Calculate total budget
-        total_budget = campaign.budget_per_clip * campaign.num_clips_needed
-        
-        # Create campaign
-        db_campaign = Campaign(
-            client_id=current_user["id"],
-            title=campaign.title,
-            description=campaign.description,
-            video_url=campaign.video_url,
-            num_clips_needed=campaign.num_clips_needed,
-            clip_duration=campaign.clip_duration,
-            resolution=campaign.resolution,
-            style_notes=campaign.style_notes,
-            budget_per_clip=campaign.budget_per_clip,
-            total_budget=total_budget,
-            deadline=campaign.deadline,
-            status=CampaignStatus.ACTIVE
-        )
-        
-        db.add(db_campaign)
-        db.commit()
-        db.refresh(db_campaign)
-        
-        return CampaignResponse(
-            id=db_campaign.id,
-            title=db_campaign.title,
-            description=db_campaign.description,
-            video_url=db_campaign.video_url,
-            num_clips_needed=db_campaign.num_clips_needed,
-            clip_duration=db_campaign.clip_duration,
-            resolution=db_campaign.resolution,
-            budget_per_clip=db_campaign.budget_per_clip,
-            total_budget=db_campaign.total_budget,
-            status=db_campaign.status.value,
-            clips_submitted=db_campaign.clips_submitted,
-            clips_approved=db_campaign.clips_approved,
-            created_at=db_campaign.created_at,
-            deadline=db_campaign.deadline
-        )
-    finally:
-        db.close()
-
-
-@router.get("/campaigns", response_model=List[CampaignResponse])
+    # Create campaign
+    db_campaign = Campaign(
+        client_id=current_user["id"],
+        title=campaign.title,
+        description=campaign.description,
+        video_url=campaign.video_url,
+        num_clips_needed=campaign.num_clips_needed,
+        clip_duration=campaign.clip_duration,
+        resolution=campaign.resolution,
+        style_notes=campaign.style_notes,
+        budget_per_clip=campaign.budget_per_clip,
+        total_budget=total_budget,
+        deadline=campaign.deadline,
+        status=CampaignStatus.ACTIVE
+    )
+    
+    db.add(db_campaign)
+    await db.commit()
+    await db.refresh(db_campaign)
+    campaign_list_cache.clear()
+    
+    return CampaignResponse(
+        id=db_campaign.id,
+        title=db_campaign.title,
+        description=db_campaign.description,
+        video_url=db_campaign.video_url,
+        num_clips_needed=db_campaign.num_clips_needed,
+        clip_duration=db_campaign.clip_duration,
+        resolution=db_campaign.resolution,
+        budget_per_clip=db_campaign.budget_per_clip,
+        total_budget=db_campaign.total_budget,
+        status=db_campaign.status.value,
+        clips_submitted=db_campaign.clips_submitted,
+        clips_approved=db_campaign.clips_approved,
+        created_at=db_campaign.created_at,
+        deadline=db_campaign.deadline
+    )
+
+
+# Rows are returned as plain dicts (no per-row model validation); the model only documents the shape
+@router.get("/campaigns", response_model=None, responses={200: {"model": List[CampaignResponse]}})
 async def list_campaigns(
     status: Optional[str] = "active",
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    db=Depends(get_marketplace_db)
 ):
-    """List available campaigns (public for clippers to browse)"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    """List available campaigns (public for clippers to browse; cached for CAMPAIGN_LIST_TTL seconds)"""
+    cache_key = (status, limit, offset)
+    cached = campaign_list_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    db = get_db()
-    try:
-        query = db.query(Campaign)
-        
-        if status:
-            query = query.filter(Campaign.status == CampaignStatus[status.upper()])
-        
-        campaigns = query.order_by(Campaign.created_at.desc()).offset(offset).limit(limit).all()
-        
-        return [
-            CampaignResponse(
-                id=c.id,
-                title=c.title,
-                description=c.description,
-                video_url=c.video_url,
-                num_clips_needed=c.num_clips_needed,
-                clip_duration=c.clip_duration,
-                resolution=c.resolution,
-                budget_per_clip=c.budget_per_clip,
-                total_budget=c.total_budget,
-                status=c.status.value,
-                clips_submitted=c.clips_submitted,
-                clips_approved=c.clips_approved,
-                created_at=c.created_at,
-                deadline=c.deadline
-            )
-            for c in campaigns
-        ]
-    finally:
-        db.close()
+    # Only the columns CampaignResponse needs, as plain rows (no ORM instances)
+    query = select(
+        Campaign.id, Campaign.title, Campaign.description, Campaign.video_url,
+        Campaign.num_clips_needed, Campaign.clip_duration, Campaign.resolution,
+        Campaign.budget_per_clip, Campaign.total_budget, enum_value(Campaign.status, "draft").label("status"),
+        Campaign.clips_submitted, Campaign.clips_approved, Campaign.created_at, Campaign.deadline
+    )
+    
+    if status:
+        query = query.where(Campaign.status == CampaignStatus[status.upper()])
+    
+    campaigns = (await db.execute(
+        query.order_by(Campaign.created_at.desc()).offset(offset).limit(limit)
+    )).all()
+    
+    campaign_list = [c._asdict() for c in campaigns]
+    campaign_list_cache.set(cache_key, campaign_list)
+    return campaign_list
 
 
 @router.get("/campaigns/{campaign_id}", response_model=CampaignResponse)
-async def get_campaign(campaign_id: int):
+async def get_campaign(campaign_id: int, db=Depends(get_marketplace_db)):
     """Get campaign details"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    campaign = await db.get(Campaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
     
-    db = get_db()
-    try:
-        campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-        if not campaign:
-            raise HTTPException(status_code=404, detail="Campaign not found")
-        
-        return CampaignResponse(
-            id=campaign.id,
-            title=campaign.title,
-            description=campaign.description,
-            video_url=campaign.video_url,
-            num_clips_needed=campaign.num_clips_needed,
-            clip_duration=campaign.clip_duration,
-            resolution=campaign.resolution,
-            budget_per_clip=campaign.budget_per_clip,
-            total_budget=campaign.total_budget,
-            status=campaign.status.value,
-            clips_submitted=campaign.clips_submitted,
-            clips_approved=campaign.clips_approved,
-            created_at=campaign.created_at,
-            deadline=campaign.deadline
-        )
-    finally:
-        db.close()
+    return CampaignResponse(
+        id=campaign.id,
+        title=campaign.title,
+        description=campaign.description,
+        video_url=campaign.video_url,
+        num_clips_needed=campaign.num_clips_needed,
+        clip_duration=campaign.clip_duration,
+        resolution=campaign.resolution,
+        budget_per_clip=campaign.budget_per_clip,
+        total_budget=campaign.total_budget,
+        status=campaign.status.value,
+        clips_submitted=campaign.clips_submitted,
+        clips_approved=campaign.clips_approved,
+        created_at=campaign.created_at,
+        deadline=campaign.deadline
+    )
 
 
 # ============================================================================
@@ -248,149 +275,175 @@ async def get_campaign(campaign_id: int):
 @router.post("/jobs/claim")
 async def claim_job(
     request: JobClaimRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_marketplace_db)
 ):
     """Claim a campaign job (clippers only)"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    # Lock the campaign row so the status check and the claim are one atomic step
+    # (lambda_stmt: built/compiled once, later calls only bind the id)
+    campaign_id = request.campaign_id
+    campaign = (await db.execute(
+        lambda_stmt(lambda: select(Campaign).where(Campaign.id == campaign_id).with_for_update())
+    )).scalars().first()
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
     
-    db = get_db()
-    try:
-        # Get campaign
-        campaign = db.query(Campaign).filter(Campaign.id == request.campaign_id).first()
-        if not campaign:
-            raise HTTPException(status_code=404, detail="Campaign not found")
-        
-        if campaign.status != CampaignStatus.ACTIVE:
-            raise HTTPException(status_code=400, detail="Campaign is not active")
-        
-        # Check if user already has a job for this campaign
-        existing = db.query(MarketplaceJob).filter(
-            MarketplaceJob.campaign_id == request.campaign_id,
-            MarketplaceJob.clipper_id == current_user["id"]
-        ).first()
-        
-        if existing:
+    if campaign.status != CampaignStatus.ACTIVE:
+        raise HTTPException(status_code=400, detail="Campaign is not active")
+    
+    # Get user tier for split calculation
+    user = await db.get(User, current_user["id"])
+    tier = user.tier.value if user else "bronze"
+    
+    # Calculate payment split
+    clipper_share, platform_fee = calculate_split(tier, campaign.budget_per_clip)
+    
+    job_values = dict(
+        campaign_id=campaign.id,
+        clipper_id=current_user["id"],
+        agreed_price=campaign.budget_per_clip,
+        clipper_share=clipper_share,
+        platform_fee=platform_fee,
+        status=MarketplaceJobStatus.CLAIMED
+    )
+    
+    # The (campaign_id, clipper_id) unique constraint decides who wins a concurrent claim:
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING yields no row if the pair already exists
+    dialect_insert = {"postgresql": pg_insert, "sqlite": sqlite_insert}.get(dialect_name())
+    if dialect_insert is not None and claim_unique_index_available():
+        row = (await db.execute(
+            dialect_insert(MarketplaceJob)
+            .values(**job_values)
+            .on_conflict_do_nothing(index_elements=["campaign_id", "clipper_id"])
+            .returning(MarketplaceJob.id, MarketplaceJob.tracking_code)
+        )).first()
+        if row is None:
+            await db.rollback()
             raise HTTPException(status_code=400, detail="You already claimed this campaign")
-        
-        # Get user tier for split calculation
-        user = db.query(User).filter(User.id == current_user["id"]).first()
-        tier = user.tier.value if user else "bronze"
-        
-        # Calculate payment split
-        clipper_share, platform_fee = calculate_split(tier, campaign.budget_per_clip)
-        
-        # Create job
-        job = MarketplaceJob(
-            campaign_id=campaign.id,
-            clipper_id=current_user["id"],
-            agreed_price=campaign.budget_per_clip,
-            clipper_share=clipper_share,
-            platform_fee=platform_fee,
-            status=MarketplaceJobStatus.CLAIMED
+        await db.commit()
+        job_id, tracking_code = row
+    else:
+        # Check if user already has a job for this campaign (EXISTS - no row is hydrated)
+        already_claimed = await db.scalar(
+            select(
+                select(MarketplaceJob.id).where(
+                    MarketplaceJob.campaign_id == request.campaign_id,
+                    MarketplaceJob.clipper_id == current_user["id"]
+                ).exists()
+            )
         )
         
-        db.add(job)
-        db.commit()
-        db.refresh(job)
+        if already_claimed:
+            raise HTTPException(status_code=400, detail="You already claimed this campaign")
         
-        return {
-            "job_id": job.id,
-            "campaign_id": campaign.id,
-            "campaign": {
-                "id": campaign.id,
-                "title": campaign.title,
-                "description": campaign.description,
-                "video_url": campaign.video_url,
-                "num_clips_needed": campaign.num_clips_needed,
-                "clip_duration": campaign.clip_duration,
-                "resolution": campaign.resolution
-            },
-            "agreed_price": job.agreed_price,
-            "your_earnings": job.clipper_share,
-            "clipper_share": job.clipper_share,
-            "platform_fee": job.platform_fee,
-            "status": job.status.value,
-            "tracking_code": job.tracking_code
-        }
-    finally:
-        db.close()
+        job = MarketplaceJob(**job_values)
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        job_id, tracking_code = job.id, job.tracking_code
+    
+    return {
+        "job_id": job_id,
+        "campaign_id": campaign.id,
+        "campaign": {
+            "id": campaign.id,
+            "title": campaign.title,
+            "description": campaign.description,
+            "video_url": campaign.video_url,
+            "num_clips_needed": campaign.num_clips_needed,
+            "clip_duration": campaign.clip_duration,
+            "resolution": campaign.resolution
+        },
+        "agreed_price": job_values["agreed_price"],
+        "your_earnings": clipper_share,
+        "clipper_share": clipper_share,
+        "platform_fee": platform_fee,
+        "status": MarketplaceJobStatus.CLAIMED.value,
+        "tracking_code": tracking_code
+    }
 
 
 @router.post("/jobs/submit")
 async def submit_job(
     request: JobSubmitRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_marketplace_db)
 ):
     """Submit completed clip for review"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    # Get job
+    job_id, clipper_id = request.job_id, current_user["id"]
+    job = (await db.execute(
+        lambda_stmt(lambda: select(MarketplaceJob).where(
+            MarketplaceJob.id == job_id,
+            MarketplaceJob.clipper_id == clipper_id
+        ))
+    )).scalars().first()
     
-    db = get_db()
-    try:
-        # Get job
-        job = db.query(MarketplaceJob).filter(
-            MarketplaceJob.id == request.job_id,
-            MarketplaceJob.clipper_id == current_user["id"]
-        ).first()
-        
-        if not job:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        if job.status not in [MarketplaceJobStatus.CLAIMED, MarketplaceJobStatus.IN_PROGRESS]:
-            raise HTTPException(status_code=400, detail="Job cannot be submitted in current status")
-        
-        # Update job
-        job.clip_id = request.clip_id
-        job.youtube_url = request.youtube_url
-        job.status = MarketplaceJobStatus.SUBMITTED
-        job.submitted_at = datetime.utcnow()
-        
-        # Update campaign stats
-        campaign = db.query(Campaign).filter(Campaign.id == job.campaign_id).first()
-        if campaign:
-            campaign.clips_submitted += 1
-        
-        db.commit()
-        
-        return {
-            "message": "Clip submitted for review",
-            "job_id": job.id,
-            "status": job.status.value
-        }
-    finally:
-        db.close()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status not in [MarketplaceJobStatus.CLAIMED, MarketplaceJobStatus.IN_PROGRESS]:
+        raise HTTPException(status_code=400, detail="Job cannot be submitted in current status")
+    
+    # Update job
+    job.clip_id = request.clip_id
+    job.youtube_url = request.youtube_url
+    job.status = MarketplaceJobStatus.SUBMITTED
+    job.submitted_at = datetime.utcnow()
+    
+    # Update campaign stats
+    campaign = await db.get(Campaign, job.campaign_id)
+    if campaign:
+        campaign.clips_submitted += 1
+    
+    await db.commit()
+    
+    return {
+        "message": "Clip submitted for review",
+        "job_id": job.id,
+        "status": job.status.value
+    }
 
 
 @router.get("/jobs/my-jobs")
 async def get_my_jobs(
-    current_user: dict = Depends(get_current_user)
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    before: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_marketplace_db)
 ):
-    """Get clipper's jobs"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    """Get clipper's jobs, newest first (pass the last row's claimed_at as `before` for keyset paging)"""
+    query = (
+        select(
+            MarketplaceJob.id, MarketplaceJob.campaign_id, Campaign.title, MarketplaceJob.status,
+            MarketplaceJob.agreed_price, MarketplaceJob.clipper_share,
+            MarketplaceJob.claimed_at, MarketplaceJob.submitted_at, MarketplaceJob.approved_at
+        )
+        .join(Campaign, Campaign.id == MarketplaceJob.campaign_id)
+        .where(MarketplaceJob.clipper_id == current_user["id"])
+    )
+    if before is not None:
+        query = query.where(MarketplaceJob.claimed_at < before)
     
-    db = get_db()
-    try:
-        jobs = db.query(MarketplaceJob).filter(
-            MarketplaceJob.clipper_id == current_user["id"]
-        ).order_by(MarketplaceJob.claimed_at.desc()).all()
-        
-        return [
-            {
-                "job_id": j.id,
-                "campaign_id": j.campaign_id,
-                "status": j.status.value,
-                "agreed_price": j.agreed_price,
-                "your_earnings": j.clipper_share,
-                "claimed_at": j.claimed_at,
-                "submitted_at": j.submitted_at,
-                "approved_at": j.approved_at
-            }
-            for j in jobs
-        ]
-    finally:
-        db.close()
+    rows = (await db.execute(
+        query.order_by(MarketplaceJob.claimed_at.desc()).offset(offset).limit(limit)
+    )).all()
+    
+    return [
+        {
+            "job_id": j.id,
+            "campaign_id": j.campaign_id,
+            "campaign_title": j.title,
+            "status": j.status.value,
+            "agreed_price": j.agreed_price,
+            "your_earnings": j.clipper_share,
+            "claimed_at": j.claimed_at,
+            "submitted_at": j.submitted_at,
+            "approved_at": j.approved_at
+        }
+        for j in rows
+    ]
 
 
 # ============================================================================
@@ -400,57 +453,53 @@ async def get_my_jobs(
 @router.post("/jobs/review")
 async def review_job(
     request: JobReviewRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_marketplace_db)
 ):
     """Review and approve/reject submitted clip"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    # Get job
+    job = await db.get(MarketplaceJob, request.job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    db = get_db()
-    try:
-        # Get job
-        job = db.query(MarketplaceJob).filter(MarketplaceJob.id == request.job_id).first()
-        if not job:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        # Verify ownership
-        campaign = db.query(Campaign).filter(Campaign.id == job.campaign_id).first()
-        if campaign.client_id != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        if job.status != MarketplaceJobStatus.SUBMITTED:
-            raise HTTPException(status_code=400, detail="Job not in submitted status")
-        
-        # Update job
-        if request.approved:
-            job.status = MarketplaceJobStatus.APPROVED
-            job.approved_at = datetime.utcnow()
-            campaign.clips_approved += 1
-            
-            # Update clipper stats
-            clipper = db.query(User).filter(User.id == job.clipper_id).first()
-            if clipper:
-                clipper.total_clips += 1
-                if request.rating:
-                    # Update rating
-                    total = clipper.rating * clipper.rating_count + request.rating
-                    clipper.rating_count += 1
-                    clipper.rating = total / clipper.rating_count
-        else:
-            job.status = MarketplaceJobStatus.REJECTED
-        
-        job.client_feedback = request.feedback
-        job.client_rating = request.rating
-        
-        db.commit()
-        
-        return {
-            "message": "Review submitted",
-            "job_id": job.id,
-            "status": job.status.value
-        }
-    finally:
-        db.close()
+    # Verify ownership
+    campaign = await db.get(Campaign, job.campaign_id)
+    if campaign.client_id != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if job.status != MarketplaceJobStatus.SUBMITTED:
+        raise HTTPException(status_code=400, detail="Job not in submitted status")
+    
+    # Update job
+    if request.approved:
+        job.status = MarketplaceJobStatus.APPROVED
+        job.approved_at = datetime.utcnow()
+        campaign.clips_approved += 1
+        
+        # Update clipper stats
+        clipper = await db.get(User, job.clipper_id)
+        if clipper:
+            clipper.total_clips += 1
+            if request.rating:
+                # Update rating
+                total = clipper.rating * clipper.rating_count + request.rating
+                clipper.rating_count += 1
+                clipper.rating = total / clipper.rating_count
+    else:
+        job.status = MarketplaceJobStatus.REJECTED
+    
+    job.client_feedback = request.feedback
+    job.client_rating = request.rating
+    
+    await db.commit()
+    if request.approved:
+        user_cache.invalidate(job.clipper_id)
+    
+    return {
+        "message": "Review submitted",
+        "job_id": job.id,
+        "status": job.status.value
+    }
 
 
 # ============================================================================
@@ -460,152 +509,175 @@ async def review_job(
 @router.post("/payouts/request")
 async def request_payout(
     request: PayoutRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_marketplace_db)
 ):
     """Request payout for approved jobs"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
-    
-    db = get_db()
-    try:
-        # Get approved jobs
-        jobs = db.query(MarketplaceJob).filter(
-            MarketplaceJob.id.in_(request.job_ids),
+    # Claim and mark the approved jobs paid in one statement; RETURNING yields exactly the
+    # jobs this request took (a concurrent request can't pay the same job twice)
+    paid_jobs = (await db.execute(
+        update(MarketplaceJob)
+        .where(
+            MarketplaceJob.id.in_(set(request.job_ids)),
             MarketplaceJob.clipper_id == current_user["id"],
             MarketplaceJob.status == MarketplaceJobStatus.APPROVED
-        ).all()
-        
-        if not jobs:
-            raise HTTPException(status_code=400, detail="No approved jobs found")
-        
-        # Calculate total
-        total_amount = sum(j.clipper_share for j in jobs)
-        
-        # Create payout
-        payout = Payout(
-            clipper_id=current_user["id"],
-            amount=total_amount,
-            job_ids=json.dumps([j.id for j in jobs]),
-            status=PayoutStatus.PENDING
         )
-        
-        db.add(payout)
-        
-        # Mark jobs as paid
-        for job in jobs:
-            job.status = MarketplaceJobStatus.PAID
-            job.paid_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(payout)
-        
-        return {
-            "payout_id": payout.id,
-            "amount": payout.amount,
-            "job_count": len(jobs),
-            "status": payout.status.value,
-            "message": "Payout request submitted. You will receive payment within 3-5 business days."
-        }
-    finally:
-        db.close()
+        .values(status=MarketplaceJobStatus.PAID, paid_at=datetime.utcnow())
+        .returning(MarketplaceJob.id, MarketplaceJob.clipper_share)
+        .execution_options(synchronize_session=False)
+    )).all()
+    
+    if not paid_jobs:
+        raise HTTPException(status_code=400, detail="No approved jobs found")
+    
+    # Calculate total from the returned shares (no job rows are loaded)
+    total_amount = sum(share for _, share in paid_jobs)
+    
+    # Create payout and link its jobs through the payout_jobs table. job_ids is still
+    # written too: tables created before payout_jobs keep it NOT NULL (no migrations)
+    payout = Payout(
+        clipper_id=current_user["id"],
+        amount=total_amount,
+        job_ids=json.dumps(sorted(job_id for job_id, _ in paid_jobs)),
+        status=PayoutStatus.PENDING
+    )
+    db.add(payout)
+    await db.flush()
+    
+    await db.execute(
+        insert(PayoutJob),
+        [{"payout_id": payout.id, "job_id": job_id} for job_id, _ in paid_jobs]
+    )
+    
+    await db.commit()
+    
+    return {
+        "payout_id": payout.id,
+        "amount": payout.amount,
+        "job_count": len(paid_jobs),
+        "status": payout.status.value,
+        "message": "Payout request submitted. You will receive payment within 3-5 business days."
+    }
 
 
 @router.get("/payouts/my-payouts")
 async def get_my_payouts(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_marketplace_db)
 ):
     """Get clipper's payout history"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
+    payouts = (await db.execute(
+        select(Payout.id, Payout.amount, Payout.job_ids, Payout.status, Payout.requested_at, Payout.completed_at)
+        .where(Payout.clipper_id == current_user["id"])
+        .order_by(Payout.requested_at.desc())
+    )).all()
     
-    db = get_db()
-    try:
-        payouts = db.query(Payout).filter(
-            Payout.clipper_id == current_user["id"]
-        ).order_by(Payout.requested_at.desc()).all()
-        
-        return [
-            {
-                "payout_id": p.id,
-                "amount": p.amount,
-                "status": p.status.value,
-                "requested_at": p.requested_at,
-                "completed_at": p.completed_at
-            }
-            for p in payouts
-        ]
-    finally:
-        db.close()
+    # Job ids for all listed payouts in one query (payout_jobs only, no job rows)
+    job_ids = {}
+    if payouts:
+        links = await db.execute(
+            select(PayoutJob.payout_id, PayoutJob.job_id)
+            .where(PayoutJob.payout_id.in_([p.id for p in payouts]))
+            .order_by(PayoutJob.job_id)
+        )
+        for payout_id, job_id in links:
+            job_ids.setdefault(payout_id, []).append(job_id)
+    
+    return [
+        {
+            "payout_id": p.id,
+            "amount": p.amount,
+            # Payouts from before payout_jobs only have the JSON column
+            "job_ids": job_ids.get(p.id) or (json.loads(p.job_ids) if p.job_ids else []),
+            "status": p.status.value,
+            "requested_at": p.requested_at,
+            "completed_at": p.completed_at
+        }
+        for p in payouts
+    ]
 
 
 @router.post("/calculate-bonuses")
-async def calculate_performance_bonuses():
+async def calculate_performance_bonuses(db=Depends(get_marketplace_db)):
     """Calculate and distribute performance bonuses based on view milestones"""
-    if not is_database_enabled():
-        raise HTTPException(status_code=503, detail="Database not configured")
-    
-    db = get_db()
-    try:
-        # Bonus tiers (views → bonus multiplier)
-        bonus_tiers = {
-            100000: 1.2,   # 100k views = 20% bonus
-            500000: 1.5,   # 500k views = 50% bonus
-            1000000: 2.0,  # 1M views = 100% bonus
-            5000000: 3.0   # 5M views = 200% bonus
-        }
-        
-        # Get all approved jobs with YouTube videos
-        jobs = db.query(MarketplaceJob).filter(
+    # Approved jobs with YouTube videos, joined to their clip's views in one
+    # query (instead of two lookups per job); only the needed columns are loaded.
+    # Jobs are walked in id-ordered chunks so memory stays bounded as the table grows.
+    query = (
+        select(
+            MarketplaceJob.id, MarketplaceJob.clipper_id,
+            MarketplaceJob.clipper_share, MarketplaceJob.bonus_earned, Clip.views
+        )
+        .join(Clip, Clip.id == MarketplaceJob.clip_id)
+        .where(
             MarketplaceJob.status == MarketplaceJobStatus.APPROVED,
-            MarketplaceJob.youtube_video_id.isnot(None)
-        ).all()
-        
-        bonuses_paid = 0
-        total_bonus_amount = 0.0
-        
-        for job in jobs:
-            if not job.clip_id:
-                continue
-            
-            # Get clip views
-            clip = db.query(Clip).filter(Clip.id == job.clip_id).first()
-            if not clip or clip.views == 0:
-                continue
-            
+            MarketplaceJob.youtube_video_id.isnot(None),
+            Clip.views > 0
+        )
+        .order_by(MarketplaceJob.id)
+        .limit(BONUS_CHUNK_SIZE)
+    )
+    
+    bonuses_paid = 0
+    total_bonus_amount = 0.0
+    clipper_totals = {}  # clipper_id -> [earnings delta, views delta]
+    last_id = 0
+    
+    while True:
+        rows = (await db.execute(query.where(MarketplaceJob.id > last_id))).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        job_updates = []
+        
+        for job_id, clipper_id, clipper_share, bonus_earned, views in rows:
             # Calculate bonus based on highest tier reached
-            bonus_multiplier = 1.0
-            for threshold, multiplier in sorted(bonus_tiers.items()):
-                if clip.views >= threshold:
-                    bonus_multiplier = multiplier
+            bonus_multiplier = bonus_multiplier_for(views)
             
             # Calculate bonus (only if multiplier > 1)
             if bonus_multiplier > 1.0:
-                base_earnings = job.clipper_share
-                bonus_amount = base_earnings * (bonus_multiplier - 1.0)
+                bonus_amount = clipper_share * (bonus_multiplier - 1.0)
                 
                 # Only pay if not already paid
-                if job.bonus_earned < bonus_amount:
-                    new_bonus = bonus_amount - job.bonus_earned
-                    job.bonus_earned = bonus_amount
-                    job.total_views = clip.views
+                if (bonus_earned or 0.0) < bonus_amount:
+                    new_bonus = bonus_amount - (bonus_earned or 0.0)
+                    job_updates.append({"id": job_id, "bonus_earned": bonus_amount, "total_views": views})
                     
-                    # Update clipper total earnings
-                    clipper = db.query(User).filter(User.id == job.clipper_id).first()
-                    if clipper:
-                        clipper.total_earnings += new_bonus
-                        clipper.total_views = (clipper.total_views or 0) + clip.views
+                    totals = clipper_totals.setdefault(clipper_id, [0.0, 0])
+                    totals[0] += new_bonus
+                    totals[1] += views
                     
                     bonuses_paid += 1
                     total_bonus_amount += new_bonus
         
-        db.commit()
-        
-        return {
-            "success": True,
-            "bonuses_paid": bonuses_paid,
-            "total_amount": total_bonus_amount,
-            "message": f"Distributed ${total_bonus_amount:.2f} in bonuses to {bonuses_paid} clippers"
-        }
-        
-    finally:
-        db.close()
+        if job_updates:
+            # One executemany per chunk instead of one UPDATE per changed row
+            await db.execute(update(MarketplaceJob), job_updates)
+        if len(rows) < BONUS_CHUNK_SIZE:
+            break
+    
+    if clipper_totals:
+        users = User.__table__
+        await db.execute(
+            update(users)
+            .where(users.c.id == bindparam("clipper_id"))
+            .values(
+                total_earnings=func.coalesce(users.c.total_earnings, 0.0) + bindparam("earnings"),
+                total_views=func.coalesce(users.c.total_views, 0) + bindparam("views")
+            ),
+            [
+                {"clipper_id": clipper_id, "earnings": earnings, "views": views}
+                for clipper_id, (earnings, views) in clipper_totals.items()
+            ]
+        )
+    
+    await db.commit()
+    for clipper_id in clipper_totals:
+        user_cache.invalidate(clipper_id)
+    
+    return {
+        "success": True,
+        "bonuses_paid": bonuses_paid,
+        "total_amount": total_bonus_amount,
+        "message": f"Distributed ${total_bonus_amount:.2f} in bonuses to {bonuses_paid} clippers"
+    }
@@ -10,20 +10,25 @@ UPDATED January 2025:
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import RedirectResponse
-import httpx
+import asyncio
+import json
 import os
 import secrets
 from urllib.parse import urlencode
 from auth import create_access_token
+from http_pool import get_client
+from redis_client import get_async_redis
+from cache import TTLCache
 from database import get_db, is_database_enabled, User as DBUser
-from passlib.context import CryptContext
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["OAuth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# OAuth users never log in with a password: store an unusable sentinel instead of
+# bcrypt-hashing a random secret (password login rejects it; a reset replaces it)
+OAUTH_PASSWORD_PREFIX = "!oauth:"
 
 # OAuth Configuration
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
@@ -35,8 +40,54 @@ GITHUB_CLIENT_SECRET = os.getenv("GITHUB_CLIENT_SECRET", "")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
 
-# Store OAuth states temporarily (in production, use Redis)
-oauth_states = {}
+# Authorization URLs minus the per-request state, encoded once
+_GOOGLE_AUTH_PREFIX = "https://accounts.google.com/o/oauth2/v2/auth?" + urlencode({
+    "client_id": GOOGLE_CLIENT_ID,
+    "redirect_uri": f"{BACKEND_URL}/auth/google/callback",
+    "response_type": "code",
+    "scope": "openid email profile",
+    "access_type": "offline",
+    "prompt": "select_account"
+})
+_GITHUB_AUTH_PREFIX = "https://github.com/login/oauth/authorize?" + urlencode({
+    "client_id": GITHUB_CLIENT_ID,
+    "redirect_uri": f"{BACKEND_URL}/auth/github/callback",
+    "scope": "user:email"
+})
+
+# OAuth states live in Redis (shared by all workers) with a TTL; the in-process
+# cache is used when Redis isn't configured (local dev) or a call to it fails
+OAUTH_STATE_TTL = 600  # seconds
+oauth_states = TTLCache(ttl=OAUTH_STATE_TTL, maxsize=10_000)
+
+
+async def save_oauth_state(state: str, provider: str):
+    """Remember a login state until its callback arrives (or OAUTH_STATE_TTL passes)"""
+    redis = get_async_redis()
+    if redis is not None:
+        try:
+            await redis.setex(f"oauth_state:{state}", OAUTH_STATE_TTL, json.dumps({"provider": provider}))
+            return
+        except Exception as e:
+            logger.warning(f"Could not store OAuth state in Redis, keeping it in memory: {e}")
+    oauth_states.set(state, {"provider": provider})
+
+
+async def pop_oauth_state(state: str):
+    """Consume a login state (single use); None when unknown or expired"""
+    # A state saved while Redis was failing lives in memory, so check there first
+    local = oauth_states.pop(state)
+    if local is not None:
+        return local
+    redis = get_async_redis()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.getdel(f"oauth_state:{state}")
+    except Exception as e:
+        logger.warning(f"Could not read OAuth state from Redis: {e}")
+        return None
+    return json.loads(raw) if raw is not None else None
 
 
 def get_or_create_oauth_user(email: str, name: str = None, provider: str = "oauth"):
@@ -46,12 +97,10 @@ def get_or_create_oauth_user(email: str, name: str = None, provider: str = "oaut
         try:
             user = db.query(DBUser).filter(DBUser.email == email).first()
             if not user:
-                # Create new user with random password (they'll use OAuth)
-                random_password = secrets.token_urlsafe(32)
-                hashed_password = pwd_context.hash(random_password)
+                # Create new user without a usable password (they'll use OAuth)
                 user = DBUser(
                     email=email,
-                    hashed_password=hashed_password,
+                    hashed_password=f"{OAUTH_PASSWORD_PREFIX}{provider}",
                     disabled=False
                 )
                 db.add(user)
@@ -65,10 +114,9 @@ def get_or_create_oauth_user(email: str, name: str = None, provider: str = "oaut
         # In-memory fallback
         from main import users_db
         if email not in users_db:
-            random_password = secrets.token_urlsafe(32)
             users_db[email] = {
                 "email": email,
-                "hashed_password": pwd_context.hash(random_password),
+                "hashed_password": f"{OAUTH_PASSWORD_PREFIX}{provider}",
                 "disabled": False
             }
             logger.info(f"Created new OAuth user (in-memory): {email}")
@@ -85,20 +133,10 @@ async def google_login():
     
     # Generate state for CSRF protection
     state = secrets.token_urlsafe(32)
-    oauth_states[state] = {"provider": "google"}
-    
-    params = {
-        "client_id": GOOGLE_CLIENT_ID,
-        "redirect_uri": f"{BACKEND_URL}/auth/google/callback",
-        "response_type": "code",
-        "scope": "openid email profile",
-        "state": state,
-        "access_type": "offline",
-        "prompt": "select_account"
-    }
+    await save_oauth_state(state, "google")
     
-    auth_url = f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(params)}"
-    return RedirectResponse(url=auth_url)
+    # state comes from token_urlsafe, so it needs no escaping
+    return RedirectResponse(url=f"{_GOOGLE_AUTH_PREFIX}&state={state}")
 
 
 @router.get("/google/callback")
@@ -110,60 +148,58 @@ async def google_callback(code: str = None, state: str = None, error: str = None
     if not code or not state:
         return RedirectResponse(url=f"{FRONTEND_URL}?error=missing_params")
     
-    # Verify state
-    if state not in oauth_states:
+    # Verify state (consumed atomically, so a state can't be replayed)
+    if await pop_oauth_state(state) is None:
         return RedirectResponse(url=f"{FRONTEND_URL}?error=invalid_state")
     
-    del oauth_states[state]
-    
     try:
         # Exchange code for tokens
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                "https://oauth2.googleapis.com/token",
-                data={
-                    "client_id": GOOGLE_CLIENT_ID,
-                    "client_secret": GOOGLE_CLIENT_SECRET,
-                    "code": code,
-                    "grant_type": "authorization_code",
-                    "redirect_uri": f"{BACKEND_URL}/auth/google/callback"
-                }
-            )
-            
-            if token_response.status_code != 200:
-                logger.error(f"Google token error: {token_response.text}")
-                return RedirectResponse(url=f"{FRONTEND_URL}?error=token_exchange_failed")
-            
-            tokens = token_response.json()
-            access_token = tokens.get("access_token")
-            
-            # Get user info
-            user_response = await client.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            
-            if user_response.status_code != 200:
-                return RedirectResponse(url=f"{FRONTEND_URL}?error=user_info_failed")
-            
-            user_info = user_response.json()
-            email = user_info.get("email")
-            name = user_info.get("name", "")
-            
-            if not email:
-                return RedirectResponse(url=f"{FRONTEND_URL}?error=no_email")
-            
-            # Get or create user
-            user = get_or_create_oauth_user(email, name, "google")
-            
-            # Create JWT token
-            jwt_token = create_access_token(data={"sub": email})
-            
-            # Redirect to frontend with token
-            return RedirectResponse(
-                url=f"{FRONTEND_URL}?token={jwt_token}&email={email}"
-            )
-            
+        client = await get_client()
+        token_response = await client.post(
+            "https://oauth2.googleapis.com/token",
+            data={
+                "client_id": GOOGLE_CLIENT_ID,
+                "client_secret": GOOGLE_CLIENT_SECRET,
+                "code": code,
+                "grant_type": "authorization_code",
+                "redirect_uri": f"{BACKEND_URL}/auth/google/callback"
+            }
+        )
+        
+        if token_response.status_code != 200:
+            logger.error(f"Google token error: {token_response.text}")
+            return RedirectResponse(url=f"{FRONTEND_URL}?error=token_exchange_failed")
+        
+        tokens = token_response.json()
+        access_token = tokens.get("access_token")
+        
+        # Get user info
+        user_response = await client.get(
+            "https://www.googleapis.com/oauth2/v2/userinfo",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+        
+        if user_response.status_code != 200:
+            return RedirectResponse(url=f"{FRONTEND_URL}?error=user_info_failed")
+        
+        user_info = user_response.json()
+        email = user_info.get("email")
+        name = user_info.get("name", "")
+        
+        if not email:
+            return RedirectResponse(url=f"{FRONTEND_URL}?error=no_email")
+        
+        # Get or create user (blocking DB I/O: keep it off the event loop)
+        user = await asyncio.to_thread(get_or_create_oauth_user, email, name, "google")
+        
+        # Create JWT token
+        jwt_token = create_access_token(data={"sub": email})
+        
+        # Redirect to frontend with token
+        return RedirectResponse(
+            url=f"{FRONTEND_URL}?token={jwt_token}&email={email}"
+        )
+        
     except Exception as e:
         logger.error(f"Google OAuth error: {str(e)}")
         return RedirectResponse(url=f"{FRONTEND_URL}?error=oauth_failed")
@@ -179,17 +215,10 @@ async def github_login():
     
     # Generate state for CSRF protection
     state = secrets.token_urlsafe(32)
-    oauth_states[state] = {"provider": "github"}
+    await save_oauth_state(state, "github")
     
-    params = {
-        "client_id": GITHUB_CLIENT_ID,
-        "redirect_uri": f"{BACKEND_URL}/auth/github/callback",
-        "scope": "user:email",
-        "state": state
-    }
-    
-    auth_url = f"https://github.com/login/oauth/authorize?{urlencode(params)}"
-    return RedirectResponse(url=auth_url)
+    # state comes from token_urlsafe, so it needs no escaping
+    return RedirectResponse(url=f"{_GITHUB_AUTH_PREFIX}&state={state}")
 
 
 @router.get("/github/callback")
@@ -201,92 +230,83 @@ async def github_callback(code: str = None, state: str = None, error: str = None
     if not code or not state:
         return RedirectResponse(url=f"{FRONTEND_URL}?error=missing_params")
     
-    # Verify state
-    if state not in oauth_states:
+    # Verify state (consumed atomically, so a state can't be replayed)
+    if await pop_oauth_state(state) is None:
         return RedirectResponse(url=f"{FRONTEND_URL}?error=invalid_state")
     
-    del oauth_states[state]
-    
     try:
-        async with httpx.AsyncClient() as client:
-            # Exchange code for access token
-            token_response = await client.post(
-                "https://github.com/login/oauth/access_token",
-                data={
-                    "client_id": GITHUB_CLIENT_ID,
-                    "client_secret": GITHUB_CLIENT_SECRET,
-                    "code": code
-                },
-                headers={"Accept": "application/json"}
-            )
-            
-            if token_response.status_code != 200:
-                logger.error(f"GitHub token error: {token_response.text}")
-                return RedirectResponse(url=f"{FRONTEND_URL}?error=token_exchange_failed")
-            
-            tokens = token_response.json()
-            access_token = tokens.get("access_token")
-            
-            if not access_token:
-                return RedirectResponse(url=f"{FRONTEND_URL}?error=no_access_token")
-            
-            # Get user info
-            user_response = await client.get(
-                "https://api.github.com/user",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                }
-            )
-            
-            if user_response.status_code != 200:
-                return RedirectResponse(url=f"{FRONTEND_URL}?error=user_info_failed")
-            
-            user_info = user_response.json()
-            
-            # GitHub might not return email in user info, need to fetch separately
-            email = user_info.get("email")
-            
-            if not email:
-                # Fetch emails separately
-                emails_response = await client.get(
-                    "https://api.github.com/user/emails",
-                    headers={
-                        "Authorization": f"Bearer {access_token}",
-                        "Accept": "application/vnd.github.v3+json"
-                    }
-                )
-                
-                if emails_response.status_code == 200:
-                    emails = emails_response.json()
-                    # Get primary email
+        client = await get_client()
+        # Exchange code for access token
+        token_response = await client.post(
+            "https://github.com/login/oauth/access_token",
+            data={
+                "client_id": GITHUB_CLIENT_ID,
+                "client_secret": GITHUB_CLIENT_SECRET,
+                "code": code
+            },
+            headers={"Accept": "application/json"}
+        )
+        
+        if token_response.status_code != 200:
+            logger.error(f"GitHub token error: {token_response.text}")
+            return RedirectResponse(url=f"{FRONTEND_URL}?error=token_exchange_failed")
+        
+        tokens = token_response.json()
+        access_token = tokens.get("access_token")
+        
+        if not access_token:
+            return RedirectResponse(url=f"{FRONTEND_URL}?error=no_access_token")
+        
+        # Fetch the profile and the email list concurrently: the profile email is
+        # null for anyone who keeps theirs private (most users), so both are usually needed
+        github_headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+        user_response, emails_response = await asyncio.gather(
+            client.get("https://api.github.com/user", headers=github_headers),
+            client.get("https://api.github.com/user/emails", headers=github_headers)
+        )
+        
+        if user_response.status_code != 200:
+            return RedirectResponse(url=f"{FRONTEND_URL}?error=user_info_failed")
+        
+        user_info = user_response.json()
+        
+        # GitHub might not return email in user info; use the email list instead
+        email = user_info.get("email")
+        
+        if not email:
+            if emails_response.status_code == 200:
+                emails = emails_response.json()
+                # Get primary email
+                for e in emails:
+                    if e.get("primary") and e.get("verified"):
+                        email = e.get("email")
+                        break
+                # Fallback to first verified email
+                if not email:
                     for e in emails:
-                        if e.get("primary") and e.get("verified"):
+                        if e.get("verified"):
                             email = e.get("email")
                             break
-                    # Fallback to first verified email
-                    if not email:
-                        for e in emails:
-                            if e.get("verified"):
-                                email = e.get("email")
-                                break
-            
-            if not email:
-                return RedirectResponse(url=f"{FRONTEND_URL}?error=no_email")
-            
-            name = user_info.get("name") or user_info.get("login", "")
-            
-            # Get or create user
-            user = get_or_create_oauth_user(email, name, "github")
-            
-            # Create JWT token
-            jwt_token = create_access_token(data={"sub": email})
-            
-            # Redirect to frontend with token
-            return RedirectResponse(
-                url=f"{FRONTEND_URL}?token={jwt_token}&email={email}"
-            )
-            
+        
+        if not email:
+            return RedirectResponse(url=f"{FRONTEND_URL}?error=no_email")
+        
+        name = user_info.get("name") or user_info.get("login", "")
+        
+        # Get or create user (blocking DB I/O: keep it off the event loop)
+        user = await asyncio.to_thread(get_or_create_oauth_user, email, name, "github")
+        
+        # Create JWT token
+        jwt_token = create_access_token(data={"sub": email})
+        
+        # Redirect to frontend with token
+        return RedirectResponse(
+            url=f"{FRONTEND_URL}?token={jwt_token}&email={email}"
+        )
+        
     except Exception as e:
         logger.error(f"GitHub OAuth error: {str(e)}")
         return RedirectResponse(url=f"{FRONTEND_URL}?error=oauth_failed")
@@ -0,0 +1,34 @@
+"""
+Client-side rate limiting for outbound API calls.
+
+A sliding-window limiter blocks callers until fewer than `rpm` requests have
+been made in the last 60 seconds, so bursts (e.g. syncing views for every
+tracked video) are paced instead of tripping the upstream per-minute quota.
+"""
+
+import collections
+import threading
+import time
+
+
+class SlidingWindowLimiter:
+    """Allow at most `rpm` acquisitions in any 60 second window (thread-safe)"""
+
+    def __init__(self, rpm: int, window: float = 60.0):
+        self.rpm = max(1, rpm)
+        self.window = window
+        self.times = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent, then record it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self.times and now - self.times[0] >= self.window:
+                    self.times.popleft()
+                if len(self.times) < self.rpm:
+                    self.times.append(now)
+                    return
+                wait = self.window - (now - self.times[0])
+            time.sleep(wait)
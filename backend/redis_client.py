@@ -0,0 +1,65 @@
+"""
+Shared Redis connection for small cross-worker state (OAuth states, caches).
+
+main.py registers its queue connection with set_redis() when USE_QUEUE is on;
+otherwise a connection is opened lazily from REDIS_URL if that is set. When
+neither is available get_redis() returns None and callers keep state in-process.
+get_async_redis() returns an asyncio client to the same server for use from
+async handlers (or None in the same cases).
+"""
+
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+_client = None
+_client_url = REDIS_URL
+_resolved = False
+_async_client = None
+_lock = threading.Lock()
+
+
+def set_redis(client, url: str = None):
+    """Share an existing connection (e.g. the RQ queue's) instead of opening another"""
+    global _client, _client_url, _resolved
+    with _lock:
+        _client = client
+        if url:
+            _client_url = url
+        _resolved = True
+
+
+def get_redis():
+    """Return the shared Redis client, or None when Redis isn't configured/reachable"""
+    global _client, _resolved
+    if _resolved:
+        return _client
+    with _lock:
+        if not _resolved:
+            if REDIS_URL:
+                try:
+                    from redis import Redis
+                    client = Redis.from_url(REDIS_URL)
+                    client.ping()
+                    _client = client
+                except Exception as e:
+                    logger.warning(f"Could not connect to Redis at {REDIS_URL}: {e}")
+            _resolved = True
+    return _client
+
+
+def get_async_redis():
+    """Return an asyncio Redis client for the shared server, or None without Redis"""
+    global _async_client
+    if get_redis() is None:
+        return None
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                from redis.asyncio import Redis as AsyncRedis
+                _async_client = AsyncRedis.from_url(_client_url)
+    return _async_client
@@ -1,28 +1,83 @@
 """
-Simple scene (camera cut) detection using ffmpeg.
+Simple scene (camera cut) detection.
 
-This module provides a lightweight wrapper around ffmpeg's scene
-detection filter to return a list of timestamps where scene changes
-occur. It relies on the ffmpeg binary being available on PATH.
+Returns a list of timestamps where scene changes occur. Uses PySceneDetect's
+ContentDetector when the `scenedetect` package is installed (detection runs in
+OpenCV/NumPy, no subprocess or log parsing); otherwise falls back to ffmpeg's
+scene detection filter, which relies on the ffmpeg binary being on PATH.
 
-The implementation is intentionally minimal and robust: it parses
+The ffmpeg path is intentionally minimal and robust: it parses
 ffmpeg's stderr output for "showinfo" messages which include
 pts_time for frames that passed the scene threshold.
 """
 import subprocess
-import re
+import os
 import logging
-from typing import List
+import threading
+from functools import lru_cache
+from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Optional: PySceneDetect (pip install scenedetect[opencv])
+try:
+    from scenedetect import detect as _scenedetect_detect, ContentDetector
+    SCENEDETECT_AVAILABLE = True
+except ImportError:
+    SCENEDETECT_AVAILABLE = False
 
-_SHOWINFO_RE = re.compile(r"pts_time:([0-9\.]+)")
+
+# showinfo lines are matched as raw stderr bytes (no per-line decoding)
+_PTS_PREFIX = b"pts_time:"
+_PTS_PREFIX_LEN = len(_PTS_PREFIX)
+# Byte values that can appear in a pts_time number
+_PTS_CHARS = frozenset(b"0123456789.")
+STDERR_CHUNK = 65536
+
+# Optional: Hyperscan (pip install hyperscan) scans whole stderr chunks in one
+# SIMD pass instead of running the regex line by line in the interpreter
+try:
+    import hyperscan
+    _HS_DB = hyperscan.Database()
+    # The trailing non-numeric byte makes each pts_time report a single match end
+    _HS_DB.compile(expressions=[rb"pts_time:[0-9.]+[^0-9.]"], flags=[hyperscan.HS_FLAG_SOM_LEFTMOST])
+    HYPERSCAN_AVAILABLE = True
+except Exception:
+    HYPERSCAN_AVAILABLE = False
+
+SCENE_DETECT_TIMEOUT = 120  # seconds
+
+# Decode on the GPU/iGPU video block when available ("auto", "cuda", "qsv",
+# "videotoolbox", ...); "none" forces software decode
+FFMPEG_HWACCEL = os.getenv("FFMPEG_HWACCEL", "auto").lower()
+# Decode keyframes only: ~10x faster on long videos, but cuts between keyframes are missed
+SCENE_KEYFRAMES_ONLY = os.getenv("SCENE_KEYFRAMES_ONLY", "false").lower() in ("1", "true", "yes")
+
+
+@lru_cache(maxsize=1)
+def _hwaccel_method() -> Optional[str]:
+    """The -hwaccel value to pass, probed once via `ffmpeg -hwaccels` (None = software decode)"""
+    if FFMPEG_HWACCEL in ("", "none", "off", "false"):
+        return None
+    try:
+        out = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-hwaccels"], capture_output=True, text=True, timeout=10
+        ).stdout
+    except Exception:
+        return None
+    # Output: "Hardware acceleration methods:" followed by one method per line
+    methods = {line.strip() for line in out.splitlines()[1:] if line.strip()}
+    if not methods:
+        return None
+    if FFMPEG_HWACCEL == "auto" or FFMPEG_HWACCEL in methods:
+        return FFMPEG_HWACCEL
+    logger.warning(f"FFMPEG_HWACCEL={FFMPEG_HWACCEL} not supported by ffmpeg; using software decode")
+    return None
 
 
 def detect_scenes(video_path: str, scene_threshold: float = 0.4) -> List[float]:
     """
-    Run ffmpeg scene detection and return a sorted list of scene-change timestamps (in seconds).
+    Run scene detection and return a sorted list of scene-change timestamps (in seconds).
 
     Args:
         video_path: path to input video file
@@ -31,37 +86,117 @@ def detect_scenes(video_path: str, scene_threshold: float = 0.4) -> List[float]:
     Returns:
         List of timestamps (float seconds) where scene changes were detected.
     """
+    if SCENEDETECT_AVAILABLE:
+        try:
+            return _detect_scenes_content(video_path, scene_threshold)
+        except Exception as e:
+            logger.warning(f"PySceneDetect failed ({e}); falling back to ffmpeg")
+    return _detect_scenes_ffmpeg(video_path, scene_threshold)
+
+
+def _detect_scenes_content(video_path: str, scene_threshold: float) -> List[float]:
+    """PySceneDetect ContentDetector (same HSV-delta heuristic as ffmpeg's scene score)"""
+    # ContentDetector's threshold is on a 0-100 scale
+    scene_list = _scenedetect_detect(
+        video_path, ContentDetector(threshold=scene_threshold * 100), show_progress=False
+    )
+    # Each scene after the first starts at a cut (scenes come back in order)
+    return [start.get_seconds() for start, _ in scene_list[1:]]
+
+
+def _detect_scenes_ffmpeg(video_path: str, scene_threshold: float) -> List[float]:
+    """ffmpeg select/showinfo filter, parsing pts_time from stderr"""
     timestamps = []
+    last = -1.0
     # Build ffmpeg command: select frames where scene > threshold and showinfo to stderr
-    cmd = [
-        "ffmpeg",
-        "-hide_banner",
+    cmd = ["ffmpeg", "-hide_banner"]
+    hwaccel = _hwaccel_method()
+    if hwaccel:
+        cmd += ["-hwaccel", hwaccel]
+    if SCENE_KEYFRAMES_ONLY:
+        cmd += ["-skip_frame", "nokey"]
+    cmd += [
         "-i", video_path,
+        "-an", "-sn",  # only the video stream is needed
         "-filter_complex", f"select='gt(scene,{scene_threshold})',showinfo",
         "-f", "null",
         "-"
     ]
 
     try:
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        _, stderr = proc.communicate(timeout=120)
-
-        # Parse pts_time from showinfo lines
-        for line in stderr.splitlines():
-            m = _SHOWINFO_RE.search(line)
-            if m:
-                try:
-                    t = float(m.group(1))
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        # Parse showinfo lines as ffmpeg emits them instead of buffering all of stderr;
+        # the timer kills ffmpeg (closing the pipe) if it runs too long
+        timer = threading.Timer(SCENE_DETECT_TIMEOUT, proc.kill)
+        timer.start()
+        try:
+            parse = _iter_pts_times_hyperscan if HYPERSCAN_AVAILABLE else _iter_pts_times
+            for t in parse(proc.stderr):
+                # showinfo reports frames in pts order, so the list stays sorted
+                # and a duplicate can only repeat the previous value
+                if t > last:
                     timestamps.append(t)
-                except Exception:
-                    continue
+                    last = t
+            proc.wait()
+        finally:
+            timed_out = timer.finished.is_set()
+            timer.cancel()
+            proc.stderr.close()
+        if timed_out:
+            logger.warning("ffmpeg scene detection timed out")
     except FileNotFoundError:
         logger.warning("ffmpeg not found in PATH; scene detection disabled")
-    except subprocess.TimeoutExpired:
-        proc.kill()
-        logger.warning("ffmpeg scene detection timed out")
     except Exception as e:
         logger.exception(f"Scene detection failed: {e}")
 
-    timestamps = sorted(set(timestamps))
     return timestamps
+
+
+def _iter_pts_times(stream):
+    """Yield showinfo pts_time values line by line (fixed-prefix find, no regex engine)"""
+    for line in stream:
+        start = line.find(_PTS_PREFIX)
+        if start < 0:
+            continue
+        start += _PTS_PREFIX_LEN
+        end = start
+        n = len(line)
+        while end < n and line[end] in _PTS_CHARS:
+            end += 1
+        try:
+            yield float(line[start:end])
+        except ValueError:
+            continue
+
+
+def _iter_pts_times_hyperscan(stream):
+    """Yield showinfo pts_time values, scanning stderr a chunk of complete lines at a time"""
+    found = []
+
+    def on_match(_id, start, end, _flags, block):
+        found.append(block[start + _PTS_PREFIX_LEN:end - 1])
+
+    def scan(block):
+        _HS_DB.scan(block, match_event_handler=on_match, context=block)
+        values = []
+        for raw in found:
+            try:
+                values.append(float(raw))
+            except ValueError:
+                continue
+        found.clear()
+        return values
+
+    carry = b""
+    while True:
+        chunk = stream.read1(STDERR_CHUNK)
+        if not chunk:
+            break
+        data = carry + chunk
+        cut = data.rfind(b"\n") + 1
+        # The partial last line is carried over so no match straddles two scans
+        block, carry = data[:cut], data[cut:]
+        if block:
+            yield from scan(block)
+    if carry:
+        yield from scan(carry + b"\n")
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 """
-Script to add credits to a user
-Usage: python scripts/add_credits.py user@email.com 10
+Script to add credits to users
+Usage: python scripts/add_credits.py user@email.com 10 [other@email.com 5 ...]
+       python scripts/add_credits.py --batch grants.csv   (email,amount per line)
 """
 
+import csv
 import sys
 import os
+from functools import lru_cache
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,9 +17,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from database import init_database, get_db, is_database_enabled, User
+from cache import invalidate_users_out_of_process
 
-def add_credits(email: str, amount: int):
-    """Add credits to a user"""
+@lru_cache(maxsize=1)
+def _ensure_db() -> bool:
+    """Build the engine once per process (batch runs reuse it)"""
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
         print("ERROR: DATABASE_URL not set in .env")
@@ -27,37 +32,64 @@ def add_credits(email: str, amount: int):
     if not is_database_enabled():
         print("ERROR: Database not connected")
         return False
+    return True
+
+
+def add_credits_batch(grants) -> int:
+    """Add credits for each (email, amount) pair in one transaction; returns users updated"""
+    if not _ensure_db():
+        return 0
+    
+    from sqlalchemy import update, func
     
     db = get_db()
+    user_ids = []
     try:
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            print(f"ERROR: User '{email}' not found")
-            return False
-        
-        old_credits = user.credits or 0
-        user.credits = old_credits + amount
+        for email, amount in grants:
+            # Atomic server-side increment: one round-trip, safe under concurrent grants
+            row = db.execute(
+                update(User)
+                .where(User.email == email)
+                .values(credits=func.coalesce(User.credits, 0) + amount)
+                .returning(User.id, User.credits)
+            ).one_or_none()
+            if row is None:
+                print(f"ERROR: User '{email}' not found")
+                continue
+            
+            user_id, new_credits = row
+            print(f"SUCCESS: Added {amount} credits to '{email}'")
+            print(f"  Previous balance: {new_credits - amount}")
+            print(f"  New balance: {new_credits}")
+            user_ids.append(user_id)
         db.commit()
-        
-        print(f"SUCCESS: Added {amount} credits to '{email}'")
-        print(f"  Previous balance: {old_credits}")
-        print(f"  New balance: {user.credits}")
-        return True
     finally:
         db.close()
+    
+    # The API caches /user/credits and /user/profile; drop the stale entries
+    invalidate_users_out_of_process(user_ids)
+    return len(user_ids)
+
+
+def add_credits(email: str, amount: int):
+    """Add credits to a user"""
+    return add_credits_batch([(email, amount)]) == 1
+
+
+def read_batch_file(path: str):
+    """Parse `email,amount` lines (blank lines and # comments are skipped)"""
+    grants = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].strip().startswith("#"):
+                continue
+            grants.append((row[0].strip(), int(row[1])))
+    return grants
 
 
 def check_credits(email: str):
     """Check a user's credit balance"""
-    database_url = os.getenv("DATABASE_URL")
-    if not database_url:
-        print("ERROR: DATABASE_URL not set in .env")
-        return
-    
-    init_database(database_url)
-    
-    if not is_database_enabled():
-        print("ERROR: Database not connected")
+    if not _ensure_db():
         return
     
     db = get_db()
@@ -78,21 +110,39 @@ def check_credits(email: str):
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python scripts/add_credits.py <email> <amount>  - Add credits to user")
+        print("  python scripts/add_credits.py <email> <amount> [<email> <amount> ...]  - Add credits to users")
+        print("  python scripts/add_credits.py --batch <file.csv>  - Add credits from email,amount lines")
         print("  python scripts/add_credits.py <email> --check   - Check user's credits")
         sys.exit(1)
     
+    if sys.argv[1] == "--batch":
+        if len(sys.argv) < 3:
+            print("ERROR: --batch needs a CSV file")
+            sys.exit(1)
+        try:
+            grants = read_batch_file(sys.argv[2])
+        except (OSError, ValueError, IndexError) as e:
+            print(f"ERROR: Could not read batch file: {e}")
+            sys.exit(1)
+        updated = add_credits_batch(grants)
+        print(f"Updated {updated}/{len(grants)} users")
+        sys.exit(0 if updated == len(grants) else 1)
+    
     email = sys.argv[1]
     
     if len(sys.argv) >= 3:
         if sys.argv[2] == "--check":
             check_credits(email)
         else:
+            pairs = sys.argv[1:]
+            if len(pairs) % 2:
+                print("ERROR: Expected <email> <amount> pairs")
+                sys.exit(1)
             try:
-                amount = int(sys.argv[2])
-                add_credits(email, amount)
+                grants = [(pairs[i], int(pairs[i + 1])) for i in range(0, len(pairs), 2)]
             except ValueError:
                 print("ERROR: Amount must be a number")
                 sys.exit(1)
+            add_credits_batch(grants)
     else:
         check_credits(email)
@@ -3,7 +3,7 @@
 Create a development user for the Clip Generator backend.
 
 Usage:
-  python create_dev_user.py --email dev@localhost --password 'DevPass123!'
+  python create_dev_user.py --email dev@localhost --password 'DevPass123!' [--cost 12]
 
 If a DATABASE_URL is present in `backend/.env` this script will attempt to
 connect and insert the user into the `users` table. If no database is
@@ -25,9 +25,9 @@ from dotenv import load_dotenv
 
 load_dotenv(ROOT_DIR / '.env')
 
-from passlib.context import CryptContext
+from hashing import get_context, bcrypt_cost, DEFAULT_SCRIPT_COST as DEFAULT_COST
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_ctx = get_context(DEFAULT_COST)
 
 
 def clean_db_url(url: str) -> str:
@@ -96,8 +96,13 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--email', '-e', default='dev@localhost')
     parser.add_argument('--password', '-p', default='DevPass123!')
+    parser.add_argument('--cost', type=bcrypt_cost, default=DEFAULT_COST,
+                        help='bcrypt rounds (default 12; 4 with CLIP_DEV_MODE=1 - unsafe for production)')
     args = parser.parse_args()
 
+    global pwd_ctx
+    pwd_ctx = get_context(args.cost)
+
     # Prefer DATABASE_URL from environment (.env)
     database_url = os.getenv('DATABASE_URL', '').strip()
 
@@ -3,7 +3,7 @@
 Insert a dev user directly into the SQL database using bcrypt for hashing.
 
 Usage:
-  python insert_user_bcrypt.py --email dev@localhost --password DevPass123!
+  python insert_user_bcrypt.py --email dev@localhost --password DevPass123! [--cost 12]
 
 This script bypasses passlib to avoid environment-specific bcrypt/backends issues.
 """
@@ -18,6 +18,8 @@ sys.path.insert(0, str(ROOT))
 from dotenv import load_dotenv
 load_dotenv(ROOT / '.env')
 
+from hashing import bcrypt_cost, DEFAULT_SCRIPT_COST as DEFAULT_COST
+
 def clean(s: str) -> str:
     return (s or '').strip().strip('"').strip("'")
 
@@ -25,6 +27,8 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--email', '-e', default='dev@localhost')
     parser.add_argument('--password', '-p', default='DevPass123!')
+    parser.add_argument('--cost', type=bcrypt_cost, default=DEFAULT_COST,
+                        help='bcrypt rounds (default 12; 4 with CLIP_DEV_MODE=1 - unsafe for production)')
     args = parser.parse_args()
 
     database_url = clean(os.getenv('DATABASE_URL', ''))
@@ -57,7 +61,7 @@ def main():
             return
 
         # bcrypt hash
-        hashed = bcrypt.hashpw(args.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        hashed = bcrypt.hashpw(args.password.encode('utf-8'), bcrypt.gensalt(rounds=args.cost)).decode('utf-8')
         user = database.User(email=args.email, hashed_password=hashed, disabled=False)
         db.add(user)
         db.commit()
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 """
-Script to make a user an admin
-Usage: python scripts/make_admin.py user@email.com
+Script to make users admins
+Usage: python scripts/make_admin.py user@email.com [other@email.com ...]
 """
 
 import sys
 import os
+from functools import lru_cache
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,9 +15,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from database import init_database, get_db, is_database_enabled, User
+from cache import invalidate_users_out_of_process
 
-def make_admin(email: str):
-    """Make a user an admin"""
+@lru_cache(maxsize=1)
+def _ensure_db() -> bool:
+    """Build the engine once per process (batch runs reuse it)"""
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
         print("ERROR: DATABASE_URL not set in .env")
@@ -27,34 +30,46 @@ def make_admin(email: str):
     if not is_database_enabled():
         print("ERROR: Database not connected")
         return False
+    return True
+
+
+def make_admins(emails) -> int:
+    """Make each user an admin in one transaction; returns users updated"""
+    if not _ensure_db():
+        return 0
+    
+    from sqlalchemy import update
     
     db = get_db()
+    user_ids = []
     try:
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            print(f"ERROR: User '{email}' not found")
-            return False
-        
-        user.is_admin = True
+        for email in emails:
+            # Single UPDATE; the returned id tells us whether the user exists
+            user_id = db.execute(
+                update(User).where(User.email == email).values(is_admin=True).returning(User.id)
+            ).scalar_one_or_none()
+            if user_id is None:
+                print(f"ERROR: User '{email}' not found")
+                continue
+            print(f"SUCCESS: User '{email}' is now an admin")
+            user_ids.append(user_id)
         db.commit()
-        
-        print(f"SUCCESS: User '{email}' is now an admin")
-        return True
     finally:
         db.close()
+    
+    # The API caches /user/profile (which includes is_admin); drop the stale entries
+    invalidate_users_out_of_process(user_ids)
+    return len(user_ids)
+
+
+def make_admin(email: str):
+    """Make a user an admin"""
+    return make_admins([email]) == 1
 
 
 def list_admins():
     """List all admin users"""
-    database_url = os.getenv("DATABASE_URL")
-    if not database_url:
-        print("ERROR: DATABASE_URL not set in .env")
-        return
-    
-    init_database(database_url)
-    
-    if not is_database_enabled():
-        print("ERROR: Database not connected")
+    if not _ensure_db():
         return
     
     db = get_db()
@@ -73,7 +88,7 @@ def list_admins():
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python scripts/make_admin.py <email>  - Make user an admin")
+        print("  python scripts/make_admin.py <email> [<email> ...]  - Make users admins")
         print("  python scripts/make_admin.py --list   - List all admins")
         sys.exit(1)
     
@@ -82,4 +97,4 @@ if __name__ == "__main__":
     if arg == "--list":
         list_admins()
     else:
-        make_admin(arg)
+        make_admins(sys.argv[1:])
@@ -0,0 +1,127 @@
+"""
+OpenAI Batch API queue for viral-segment requests
+
+Chat completion requests submitted here are collected for up to `max_wait`
+seconds (or until `max_items` are waiting) and sent as one Batch API job,
+which is billed at half the synchronous price. Batches complete within
+OpenAI's 24h window, typically minutes, so this only suits offline workers
+that can wait; interactive jobs should keep using the synchronous call.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchQueue:
+    """
+    Collects chat completion request bodies and submits them as OpenAI batches
+
+    Usage:
+        queue = BatchQueue(client)
+        response_body = queue.submit_and_wait({"model": ..., "messages": [...]})
+    """
+
+    def __init__(self, client, max_items: int = 50, max_wait: float = 10.0, poll_interval: float = 15.0):
+        self.client = client
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self._pending: List[Tuple[str, Dict, Future]] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def submit(self, body: Dict) -> Future:
+        """Queue one /v1/chat/completions request body; the future resolves to the response body"""
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((uuid.uuid4().hex, body, future))
+            if len(self._pending) >= self.max_items:
+                batch = self._take_pending()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._start(batch)
+        return future
+
+    def submit_and_wait(self, body: Dict, timeout: Optional[float] = None) -> Dict:
+        return self.submit(body).result(timeout=timeout)
+
+    def flush(self):
+        """Send whatever is waiting now"""
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._start(batch)
+
+    def _take_pending(self) -> List[Tuple[str, Dict, Future]]:
+        # Caller holds self._lock
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _start(self, batch: List[Tuple[str, Dict, Future]]):
+        threading.Thread(target=self._run_batch, args=(batch,), daemon=True).start()
+
+    def _run_batch(self, batch: List[Tuple[str, Dict, Future]]):
+        futures = {custom_id: future for custom_id, _, future in batch}
+        try:
+            lines = [
+                json.dumps({"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_ENDPOINT, "body": body})
+                for custom_id, body, _ in batch
+            ]
+            input_file = self.client.files.create(
+                file=("segments.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            job = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=CHAT_COMPLETIONS_ENDPOINT,
+                completion_window="24h"
+            )
+            logger.info(f"Submitted OpenAI batch {job.id} with {len(batch)} requests")
+
+            while job.status not in _TERMINAL_STATUSES:
+                time.sleep(self.poll_interval)
+                job = self.client.batches.retrieve(job.id)
+
+            if job.status != "completed" or not job.output_file_id:
+                raise RuntimeError(f"OpenAI batch {job.id} ended with status {job.status}")
+
+            for line in self.client.files.content(job.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                future = futures.pop(result.get("custom_id"), None)
+                if future is None:
+                    continue
+                response = result.get("response") or {}
+                if result.get("error") or response.get("status_code") != 200:
+                    future.set_exception(RuntimeError(f"Batch request failed: {result.get('error') or response}"))
+                else:
+                    future.set_result(response["body"])
+
+            # Requests that errored out are reported in the error file, not the output file
+            for future in futures.values():
+                future.set_exception(RuntimeError(f"No result for request in OpenAI batch {job.id}"))
+
+        except Exception as e:
+            logger.error(f"OpenAI batch failed: {e}")
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
@@ -9,24 +9,158 @@ UPDATED January 2025:
 """
 
 import os
-import boto3
-from botocore.exceptions import ClientError, BotoCoreError
-from botocore.config import Config
-from typing import Optional
+import asyncio
+import hashlib
+import threading
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import List, Optional, Tuple
 import logging
 
+from cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
-# Retry configuration for transient failures
-BOTO_CONFIG = Config(
-    retries={
-        'max_attempts': 3,
-        'mode': 'adaptive'  # Adaptive retry mode (2025 best practice)
-    },
-    connect_timeout=10,
-    read_timeout=30,
-    max_pool_connections=25
-)
+# boto3/botocore are imported on first StorageManager use (_load_boto), not at
+# module import: botocore loads its service models on import, which processes
+# without storage configured (and import checks) shouldn't pay for.
+boto3 = None
+aioboto3 = None
+ClientError = BotoCoreError = None
+Config = TransferConfig = None
+BOTO_CONFIG = TRANSFER_CONFIG = DOWNLOAD_TRANSFER_CONFIG = None
+_boto_lock = threading.Lock()
+
+# Presigned URLs are reused until this many seconds before they expire
+PRESIGNED_URL_MARGIN = 300
+
+_CONTENT_TYPES = {
+    '.mp4': 'video/mp4',
+    '.mov': 'video/quicktime',
+    '.avi': 'video/x-msvideo',
+    '.mkv': 'video/x-matroska',
+    '.webm': 'video/webm',
+}
+
+# Optional: native asyncio S3 client for concurrent uploads from async code paths
+AIOBOTO3_AVAILABLE = find_spec("aioboto3") is not None
+
+# Connection pool per client; must exceed MULTIPART_CONCURRENCY so parallel parts never wait for a socket
+MAX_POOL_CONNECTIONS = 50
+
+# Files uploaded at once by upload_many; each may use up to
+# MULTIPART_CONCURRENCY pool connections for its parts
+MAX_PARALLEL_UPLOADS = int(os.getenv("STORAGE_MAX_PARALLEL_UPLOADS", "8"))
+
+# Skip re-uploading objects whose size and ETag already match the local file.
+# Off by default: object keys include a fresh job id / uuid, so only a retry of
+# the same job (e.g. an RQ retry) can hit, and every other upload pays a HEAD
+SKIP_UNCHANGED_UPLOADS = os.getenv("STORAGE_SKIP_UNCHANGED", "false").lower() in ("1", "true", "yes")
+
+# Route AWS S3 transfers through the S3 Transfer Acceleration edge network.
+# Off by default: requests fail if the bucket doesn't have acceleration enabled.
+USE_ACCELERATE = os.getenv("STORAGE_USE_ACCELERATE", "false").lower() in ("1", "true", "yes")
+
+# Multipart settings for clip/video transfers: parts are sent in parallel threads
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+MULTIPART_CONCURRENCY = 20
+
+# Upload part size scales with the file (~100 parts) within these bounds: short
+# clips go up in one or two requests, full source videos keep enough parts in
+# flight to use MULTIPART_CONCURRENCY, and huge files stay far below S3's 10k-part cap
+MIN_UPLOAD_CHUNKSIZE = 8 * 1024 * 1024
+MAX_UPLOAD_CHUNKSIZE = 64 * 1024 * 1024
+
+# Optional: AWS CRT transfer client (pip install boto3[crt]) for large downloads.
+# It fetches byte ranges in parallel from native code. Opt-in with STORAGE_USE_CRT,
+# and only used against AWS itself: custom endpoints (R2, Spaces, MinIO) keep
+# the classic transfer manager.
+CRT_AVAILABLE = find_spec("awscrt") is not None
+USE_CRT_DOWNLOADS = CRT_AVAILABLE and os.getenv("STORAGE_USE_CRT", "false").lower() in ("1", "true", "yes")
+
+
+def _load_boto():
+    """Import boto3/botocore (and aioboto3 when installed) and build the shared configs, once"""
+    global boto3, aioboto3, ClientError, BotoCoreError, Config, TransferConfig
+    global BOTO_CONFIG, TRANSFER_CONFIG, DOWNLOAD_TRANSFER_CONFIG
+    if BOTO_CONFIG is not None:
+        return
+    with _boto_lock:
+        if BOTO_CONFIG is not None:
+            return
+        import boto3 as _boto3
+        from botocore.exceptions import ClientError as _ClientError, BotoCoreError as _BotoCoreError
+        from botocore.config import Config as _Config
+        from boto3.s3.transfer import TransferConfig as _TransferConfig
+        if AIOBOTO3_AVAILABLE:
+            import aioboto3 as _aioboto3
+            aioboto3 = _aioboto3
+        boto3, ClientError, BotoCoreError = _boto3, _ClientError, _BotoCoreError
+        Config, TransferConfig = _Config, _TransferConfig
+        
+        TRANSFER_CONFIG = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=MULTIPART_CONCURRENCY,
+            max_io_queue=200,
+            use_threads=True
+        )
+        DOWNLOAD_TRANSFER_CONFIG = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=MULTIPART_CONCURRENCY,
+            max_io_queue=200,
+            use_threads=True,
+            preferred_transfer_client="crt" if USE_CRT_DOWNLOADS else "auto"
+        )
+        # Retry configuration for transient failures (assigned last: it marks loading as done)
+        BOTO_CONFIG = Config(
+            retries={
+                'max_attempts': 3,
+                'mode': 'adaptive'  # Adaptive retry mode (2025 best practice)
+            },
+            connect_timeout=10,
+            read_timeout=30,
+            max_pool_connections=MAX_POOL_CONNECTIONS
+        )
+
+
+def _upload_chunksize(size: int) -> int:
+    """Multipart part size (and threshold) for uploading a file of `size` bytes, in whole MiB"""
+    chunk = (size // 100) & ~(1024 * 1024 - 1)
+    return max(MIN_UPLOAD_CHUNKSIZE, min(MAX_UPLOAD_CHUNKSIZE, chunk))
+
+
+@lru_cache(maxsize=None)
+def _upload_transfer_config(chunksize: int):
+    """TransferConfig for uploads split into `chunksize` parts (few distinct sizes, so cached)"""
+    return TransferConfig(
+        multipart_threshold=chunksize,
+        multipart_chunksize=chunksize,
+        max_concurrency=MULTIPART_CONCURRENCY,
+        max_io_queue=200,
+        use_threads=True
+    )
+
+
+def _s3_etag(path: str) -> str:
+    """
+    The ETag S3 assigns when this file is uploaded by upload_file: the MD5 for a single
+    PUT, or MD5-of-part-MD5s plus '-<parts>' for a multipart upload
+    """
+    size = os.path.getsize(path)
+    chunksize = _upload_chunksize(size)
+    with open(path, 'rb') as f:
+        if size < chunksize:
+            md5 = hashlib.md5()
+            while chunk := f.read(1024 * 1024):
+                md5.update(chunk)
+            return md5.hexdigest()
+        part_digests = []
+        while part := f.read(chunksize):
+            part_digests.append(hashlib.md5(part).digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
 
 
 class StorageManager:
@@ -46,7 +180,8 @@ class StorageManager:
         access_key: str,
         secret_key: str,
         endpoint_url: Optional[str] = None,
-        region: str = "auto"
+        region: str = "auto",
+        validate_on_init: bool = False
     ):
         """
         Initialize storage manager
@@ -57,14 +192,36 @@ class StorageManager:
             secret_key: S3 secret access key
             endpoint_url: Custom endpoint (for R2, Spaces, etc.)
             region: AWS region (use 'auto' for Cloudflare R2)
+            validate_on_init: Check the bucket with a HEAD request now (otherwise
+                call validate(); a missing bucket also surfaces on the first upload)
         """
         self.bucket_name = bucket_name
         self.enabled = bool(bucket_name and access_key and secret_key)
+        self._presigned_urls = TTLCache(ttl=3600 - PRESIGNED_URL_MARGIN, maxsize=10_000)
         
         if not self.enabled:
             logger.warning("Storage not configured - files will be stored locally (not recommended for production)")
             return
         
+        self._client_kwargs = {
+            'endpoint_url': endpoint_url,
+            'aws_access_key_id': access_key,
+            'aws_secret_access_key': secret_key,
+            'region_name': region,
+        }
+        _load_boto()
+        
+        # Transfer Acceleration only exists on AWS S3 (and the bucket must have it enabled)
+        self._boto_config = BOTO_CONFIG
+        if endpoint_url is None and USE_ACCELERATE:
+            self._boto_config = BOTO_CONFIG.merge(Config(s3={'use_accelerate_endpoint': True}))
+        
+        # The CRT download client is only used when enabled and talking to AWS S3
+        self._download_config = DOWNLOAD_TRANSFER_CONFIG if endpoint_url is None else TRANSFER_CONFIG
+        
+        # One aioboto3 session per manager (sessions are reusable; clients are per call)
+        self._aio_session = aioboto3.Session() if AIOBOTO3_AVAILABLE else None
+        
         try:
             # Initialize S3 client with retry configuration
             self.s3_client = boto3.client(
@@ -73,16 +230,44 @@ class StorageManager:
                 aws_access_key_id=access_key,
                 aws_secret_access_key=secret_key,
                 region_name=region,
-                config=BOTO_CONFIG
+                config=self._boto_config
             )
             
-            # Test connection
-            self.s3_client.head_bucket(Bucket=bucket_name)
+            # Public URLs only vary by key: resolve the endpoint host once
+            endpoint_host = self.s3_client._endpoint.host
+            if endpoint_host:
+                # Custom endpoint (R2, Spaces, etc.)
+                self._url_prefix = f"{endpoint_host}/{bucket_name}"
+            else:
+                # AWS S3
+                self._url_prefix = f"https://{bucket_name}.s3.amazonaws.com"
+            
             logger.info(f"Storage initialized: {bucket_name}")
             
         except (ClientError, BotoCoreError) as e:
             logger.error(f"Storage initialization failed: {e}")
             self.enabled = False
+            return
+        
+        if validate_on_init and not self.validate():
+            self.enabled = False
+    
+    def validate(self) -> bool:
+        """
+        Check that the bucket exists and the credentials can reach it (one HEAD request)
+        
+        Returns:
+            True if the bucket is reachable, False otherwise
+        """
+        if not self.enabled:
+            return False
+        
+        try:
+            self.s3_client.head_bucket(Bucket=self.bucket_name)
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Storage validation failed for {self.bucket_name}: {e}")
+            return False
     
     def upload_file(self, local_path: str, remote_key: str) -> Optional[str]:
         """
@@ -99,13 +284,18 @@ class StorageManager:
             logger.warning(f"Storage disabled - file not uploaded: {local_path}")
             return None
         
+        if self._already_uploaded(local_path, remote_key):
+            logger.info(f"Unchanged, skipped upload: {remote_key}")
+            return self._generate_url(remote_key)
+        
         try:
             # Upload file
             self.s3_client.upload_file(
                 local_path,
                 self.bucket_name,
                 remote_key,
-                ExtraArgs={'ContentType': self._get_content_type(local_path)}
+                ExtraArgs={'ContentType': self._get_content_type(local_path)},
+                Config=_upload_transfer_config(_upload_chunksize(os.path.getsize(local_path)))
             )
             
             # Generate URL
@@ -117,6 +307,59 @@ class StorageManager:
             logger.error(f"Upload failed: {e}")
             return None
     
+    async def async_upload_file(self, local_path: str, remote_key: str) -> Optional[str]:
+        """
+        Upload file to storage without blocking the event loop
+        
+        Uses aioboto3 when installed, otherwise runs upload_file in a worker thread.
+        Intended to be fanned out with asyncio.gather for multi-clip jobs.
+        
+        Returns:
+            Public URL of uploaded file, or None if failed
+        """
+        if not self.enabled:
+            logger.warning(f"Storage disabled - file not uploaded: {local_path}")
+            return None
+        
+        if not AIOBOTO3_AVAILABLE:
+            return await asyncio.to_thread(self.upload_file, local_path, remote_key)
+        
+        if await asyncio.to_thread(self._already_uploaded, local_path, remote_key):
+            logger.info(f"Unchanged, skipped upload: {remote_key}")
+            return self._generate_url(remote_key)
+        
+        try:
+            async with self._aio_session.client('s3', config=self._boto_config, **self._client_kwargs) as s3:
+                await s3.upload_file(
+                    local_path,
+                    self.bucket_name,
+                    remote_key,
+                    ExtraArgs={'ContentType': self._get_content_type(local_path)},
+                    Config=_upload_transfer_config(_upload_chunksize(os.path.getsize(local_path)))
+                )
+            url = self._generate_url(remote_key)
+            logger.info(f"Uploaded: {remote_key}")
+            return url
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Upload failed: {e}")
+            return None
+    
+    async def upload_many(self, pairs: List[Tuple[str, str]]) -> list:
+        """
+        Upload several (local_path, remote_key) pairs concurrently
+        
+        At most MAX_PARALLEL_UPLOADS run at once so the shared connection pool isn't
+        exhausted. Results are in input order: a URL, None on failure, or the
+        exception an upload raised.
+        """
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_UPLOADS)
+        
+        async def upload(local_path: str, remote_key: str):
+            async with semaphore:
+                return await self.async_upload_file(local_path, remote_key)
+        
+        return await asyncio.gather(*(upload(lp, rk) for lp, rk in pairs), return_exceptions=True)
+    
     def download_file(self, remote_key: str, local_path: str) -> bool:
         """
         Download file from storage
@@ -132,13 +375,37 @@ class StorageManager:
             return False
         
         try:
-            self.s3_client.download_file(self.bucket_name, remote_key, local_path)
+            self.s3_client.download_file(self.bucket_name, remote_key, local_path, Config=self._download_config)
             logger.info(f"Downloaded: {remote_key}")
             return True
         except ClientError as e:
             logger.error(f"Download failed: {e}")
             return False
     
+    async def async_download_file(self, remote_key: str, local_path: str) -> bool:
+        """
+        Download file from storage without blocking the event loop
+        
+        Uses aioboto3 when installed, otherwise runs download_file in a worker thread.
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.enabled:
+            return False
+        
+        if not AIOBOTO3_AVAILABLE:
+            return await asyncio.to_thread(self.download_file, remote_key, local_path)
+        
+        try:
+            async with self._aio_session.client('s3', config=self._boto_config, **self._client_kwargs) as s3:
+                await s3.download_file(self.bucket_name, remote_key, local_path, Config=TRANSFER_CONFIG)
+            logger.info(f"Downloaded: {remote_key}")
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Download failed: {e}")
+            return False
+    
     def delete_file(self, remote_key: str) -> bool:
         """
         Delete file from storage
@@ -160,10 +427,35 @@ class StorageManager:
             logger.error(f"Delete failed: {e}")
             return False
     
+    async def async_delete_file(self, remote_key: str) -> bool:
+        """
+        Delete file from storage without blocking the event loop
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.enabled:
+            return False
+        
+        if not AIOBOTO3_AVAILABLE:
+            return await asyncio.to_thread(self.delete_file, remote_key)
+        
+        try:
+            async with self._aio_session.client('s3', config=self._boto_config, **self._client_kwargs) as s3:
+                await s3.delete_object(Bucket=self.bucket_name, Key=remote_key)
+            logger.info(f"Deleted: {remote_key}")
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Delete failed: {e}")
+            return False
+    
     def generate_presigned_url(self, remote_key: str, expiration: int = 3600) -> Optional[str]:
         """
         Generate temporary download URL
         
+        URLs are cached and reused until PRESIGNED_URL_MARGIN seconds before
+        they expire, so repeat downloads skip signing.
+        
         Args:
             remote_key: Key/path in bucket
             expiration: URL validity in seconds (default 1 hour)
@@ -174,38 +466,53 @@ class StorageManager:
         if not self.enabled:
             return None
         
+        cache_key = (remote_key, expiration)
+        url = self._presigned_urls.get(cache_key)
+        if url is not None:
+            return url
+        
         try:
             url = self.s3_client.generate_presigned_url(
                 'get_object',
                 Params={'Bucket': self.bucket_name, 'Key': remote_key},
                 ExpiresIn=expiration
             )
+            if expiration > PRESIGNED_URL_MARGIN:
+                self._presigned_urls.set(cache_key, url, ttl=expiration - PRESIGNED_URL_MARGIN)
             return url
         except ClientError as e:
             logger.error(f"Presigned URL generation failed: {e}")
             return None
     
+    def _already_uploaded(self, local_path: str, remote_key: str) -> bool:
+        """
+        True when remote_key already holds exactly this file (a retried job re-uploading)
+        
+        One HEAD request; the local file is only hashed when the sizes match.
+        """
+        if not SKIP_UNCHANGED_UPLOADS:
+            return False
+        try:
+            meta = self.s3_client.head_object(Bucket=self.bucket_name, Key=remote_key)
+        except (ClientError, BotoCoreError):
+            return False  # not there (404) or not checkable: upload as usual
+        try:
+            if meta.get('ContentLength') != os.path.getsize(local_path):
+                return False
+            return meta.get('ETag', '').strip('"') == _s3_etag(local_path)
+        except OSError:
+            return False
+    
     def _generate_url(self, remote_key: str) -> str:
         """Generate public URL for file"""
-        if hasattr(self, 's3_client') and self.s3_client._endpoint.host:
-            # Custom endpoint (R2, Spaces, etc.)
-            endpoint = self.s3_client._endpoint.host
-            return f"{endpoint}/{self.bucket_name}/{remote_key}"
-        else:
-            # AWS S3
-            return f"https://{self.bucket_name}.s3.amazonaws.com/{remote_key}"
+        return f"{self._url_prefix}/{remote_key}"
     
     def _get_content_type(self, filename: str) -> str:
         """Determine content type from filename"""
-        ext = os.path.splitext(filename)[1].lower()
-        content_types = {
-            '.mp4': 'video/mp4',
-            '.mov': 'video/quicktime',
-            '.avi': 'video/x-msvideo',
-            '.mkv': 'video/x-matroska',
-            '.webm': 'video/webm',
-        }
-        return content_types.get(ext, 'application/octet-stream')
+        # Only the extension matters here, so skip splitext's full path parsing; a
+        # dot in a directory name just yields an unknown "extension" (octet-stream)
+        _, dot, ext = filename.rpartition('.')
+        return _CONTENT_TYPES.get(dot + ext.lower(), 'application/octet-stream')
 
 
 # Singleton instance
@@ -217,11 +524,12 @@ def init_storage(
     access_key: str,
     secret_key: str,
     endpoint_url: Optional[str] = None,
-    region: str = "auto"
+    region: str = "auto",
+    validate_on_init: bool = False
 ) -> StorageManager:
-    """Initialize global storage manager"""
+    """Initialize global storage manager (the bucket is not contacted unless validate_on_init)"""
     global _storage_manager
-    _storage_manager = StorageManager(bucket_name, access_key, secret_key, endpoint_url, region)
+    _storage_manager = StorageManager(bucket_name, access_key, secret_key, endpoint_url, region, validate_on_init)
     return _storage_manager
 
 
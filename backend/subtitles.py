@@ -1,23 +1,26 @@
 """
 Subtitle generation utilities for SRT and VTT formats.
 """
+import mmap
 import os
-import datetime
+import re
 from typing import Dict, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# SRT uses comma for milliseconds; VTT uses dot (only in timestamps, not cue text)
+_SRT_TIMESTAMP_COMMA = re.compile(rb"(\d{2}:\d{2}:\d{2}),(\d{3})")
+
 
 def _format_timestamp(seconds: float) -> str:
     """Format seconds to SRT timestamp (HH:MM:SS,mmm)"""
-    td = datetime.timedelta(seconds=seconds)
-    total_seconds = int(td.total_seconds())
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    secs = total_seconds % 60
-    millis = int((td.total_seconds() - int(td.total_seconds())) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+    # Integer math on rounded milliseconds (no timedelta; 0.29s is 290ms, not 289)
+    ms = int(seconds * 1000 + 0.5)
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{ms:03d}"
 
 
 def create_srt_from_transcription(transcription: Dict, out_path: str) -> str:
@@ -47,18 +50,17 @@ def create_srt_from_transcription(transcription: Dict, out_path: str) -> str:
             idx += 10
         segments = segs
 
-    # Write SRT
-    with open(out_path, "w", encoding="utf-8") as f:
-        for i, seg in enumerate(segments, start=1):
-            start_ts = _format_timestamp(seg.get("start", 0.0))
-            end_ts = _format_timestamp(seg.get("end", seg.get("start", 0.0) + 3.0))
-            text = seg.get("text", "").strip()
-            # sanitize newlines
-            text = text.replace("\n", " ")
+    # Build the whole SRT body, then encode and write it in one call
+    parts = []
+    for i, seg in enumerate(segments, start=1):
+        start_ts = _format_timestamp(seg.get("start", 0.0))
+        end_ts = _format_timestamp(seg.get("end", seg.get("start", 0.0) + 3.0))
+        # sanitize newlines
+        text = seg.get("text", "").strip().replace("\n", " ")
+        parts.append(f"{i}\n{start_ts} --> {end_ts}\n{text}\n\n")
 
-            f.write(f"{i}\n")
-            f.write(f"{start_ts} --> {end_ts}\n")
-            f.write(f"{text}\n\n")
+    with open(out_path, "wb") as f:
+        f.write("".join(parts).encode("utf-8"))
 
     logger.info(f"Wrote SRT: {out_path}")
     return out_path
@@ -66,11 +68,15 @@ def create_srt_from_transcription(transcription: Dict, out_path: str) -> str:
 
 def create_vtt_from_srt(srt_path: str, vtt_path: str) -> str:
     """Convert a simple SRT file into a VTT file by adjusting header and timestamp format."""
-    with open(srt_path, "r", encoding="utf-8") as sf, open(vtt_path, "w", encoding="utf-8") as vf:
-        vf.write("WEBVTT\n\n")
-        for line in sf:
-            # SRT uses comma for milliseconds; VTT uses dot
-            vf.write(line.replace(",", "."))
+    with open(srt_path, "rb") as sf:
+        if os.fstat(sf.fileno()).st_size:
+            # Map the file and convert it in one C-level pass, no decode/encode
+            with mmap.mmap(sf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                body = _SRT_TIMESTAMP_COMMA.sub(rb"\1.\2", mm)
+        else:
+            body = b""  # mmap can't map an empty file
+    with open(vtt_path, "wb") as vf:
+        vf.write(b"WEBVTT\n\n" + body)
 
     logger.info(f"Wrote VTT: {vtt_path}")
     return vtt_path
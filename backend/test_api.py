@@ -7,6 +7,8 @@ If dependencies are not installed, run:
 """
 import sys
 import os
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -42,74 +44,49 @@ def check_dependencies():
 if not check_dependencies():
     sys.exit(1)
 
+# (module, names it must export), reported in this order
+IMPORT_CHECKS = [
+    ("main", ["app"]),
+    ("auth", ["get_current_user", "create_access_token"]),
+    ("database", ["init_database", "get_db", "is_database_enabled"]),
+    ("storage", ["init_storage", "get_storage"]),
+    ("gemini_processor", ["GeminiVideoProcessor"]),
+    ("subtitles", ["create_srt_from_transcription", "create_vtt_from_srt"]),
+    ("ffmpeg_helpers", ["extract_audio_to_wav", "fast_clip_copy"]),
+    ("scene_detection", ["detect_scenes"]),
+    ("emotion_detector", ["detect_audio_hype_events"]),
+]
+
+
+def _try_import(module_name, names):
+    """Import a module and check its exports; returns (module, error or None)"""
+    try:
+        module = importlib.import_module(module_name)
+        for name in names:
+            getattr(module, name)
+        return module_name, None
+    except Exception as e:
+        return module_name, e
+
+
 def test_imports():
     """Test that all modules can be imported"""
     print("Testing imports...")
     
-    try:
-        from main import app
-        print("  ✓ main.py imports successfully")
-    except Exception as e:
-        print(f"  ✗ main.py import failed: {e}")
-        return False
-    
-    try:
-        from auth import get_current_user, create_access_token
-        print("  ✓ auth.py imports successfully")
-    except Exception as e:
-        print(f"  ✗ auth.py import failed: {e}")
-        return False
-    
-    try:
-        from database import init_database, get_db, is_database_enabled
-        print("  ✓ database.py imports successfully")
-    except Exception as e:
-        print(f"  ✗ database.py import failed: {e}")
-        return False
-    
-    try:
-        from storage import init_storage, get_storage
-        print("  ✓ storage.py imports successfully")
-    except Exception as e:
-        print(f"  ✗ storage.py import failed: {e}")
-        return False
-    
-    try:
-        from gemini_processor import GeminiVideoProcessor
-        print("  ✓ gemini_processor.py imports successfully")
-    except Exception as e:
-        print(f"  ✗ gemini_processor.py import failed: {e}")
-        return False
+    # Imports run in parallel (finding/compiling overlaps; the import lock still
+    # serializes module execution); results are printed in a fixed order
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda check: _try_import(*check), IMPORT_CHECKS))
     
-    try:
-        from subtitles import create_srt_from_transcription, create_vtt_from_srt
-        print("  ✓ subtitles.py imports successfully")
-    except Exception as e:
-        print(f"  ✗ subtitles.py import failed: {e}")
-        return False
-    
-    try:
-        from ffmpeg_helpers import extract_audio_to_wav, fast_clip_copy
-        print("  ✓ ffmpeg_helpers.py imports successfully")
-    except Exception as e:
-        print(f"  ✗ ffmpeg_helpers.py import failed: {e}")
-        return False
-    
-    try:
-        from scene_detection import detect_scenes
-        print("  ✓ scene_detection.py imports successfully")
-    except Exception as e:
-        print(f"  ✗ scene_detection.py import failed: {e}")
-        return False
-    
-    try:
-        from emotion_detector import detect_audio_hype_events
-        print("  ✓ emotion_detector.py imports successfully")
-    except Exception as e:
-        print(f"  ✗ emotion_detector.py import failed: {e}")
-        return False
+    ok = True
+    for module_name, error in results:
+        if error is None:
+            print(f"  ✓ {module_name}.py imports successfully")
+        else:
+            print(f"  ✗ {module_name}.py import failed: {error}")
+            ok = False
     
-    return True
+    return ok
 
 
 def test_app_routes():
@@ -4,12 +4,42 @@ Run this to check if your API key works before processing videos
 """
 
 import os
+import sys
+import time
+import hashlib
+from pathlib import Path
 from dotenv import load_dotenv
 import google.generativeai as genai
 
 load_dotenv()
 
-def test_gemini_connection():
+# A successful run is remembered per API key for this long (skip with --force)
+CACHE_DIR = Path.home() / ".cache" / "clipgen"
+CACHE_MAX_AGE = 24 * 3600  # seconds
+
+
+def _marker_path(api_key: str) -> Path:
+    # Only a short hash of the key is written to disk
+    key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    return CACHE_DIR / f"gemini_ok_{key_hash}"
+
+
+def _recently_passed(api_key: str) -> bool:
+    try:
+        return time.time() - _marker_path(api_key).stat().st_mtime < CACHE_MAX_AGE
+    except OSError:
+        return False
+
+
+def _remember_pass(api_key: str):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _marker_path(api_key).touch()
+    except OSError:
+        pass
+
+
+def test_gemini_connection(force: bool = False):
     print("=" * 50)
     print("  Gemini 2.5 Flash Lite Connection Test")
     print("=" * 50)
@@ -29,6 +59,11 @@ def test_gemini_connection():
     print(f"✓ API key found: {api_key[:10]}...{api_key[-4:]}")
     print()
     
+    if not force and _recently_passed(api_key):
+        print("✓ cached OK: this key passed within the last 24h (use --force to re-run the live calls)")
+        print()
+        return True
+    
     # Configure Gemini
     try:
         genai.configure(api_key=api_key)
@@ -101,6 +136,8 @@ Return ONLY the JSON array, no other text.""",
         print(f"❌ ERROR with JSON generation: {e}")
         return False
     
+    _remember_pass(api_key)
+    
     print("=" * 50)
     print("  ✅ All Tests Passed!")
     print("=" * 50)
@@ -113,7 +150,7 @@ Return ONLY the JSON array, no other text.""",
     return True
 
 if __name__ == "__main__":
-    success = test_gemini_connection()
+    success = test_gemini_connection(force="--force" in sys.argv)
     if not success:
         print()
         print("Please fix the errors above and try again.")
@@ -20,20 +20,20 @@ try:
     ffmpeg_path = shutil.which('ffmpeg')
     print('ffmpeg on PATH:' , ffmpeg_path if ffmpeg_path else 'not found')
 
-    # Import processor and instantiate without running __init__
+    # Downloader-only processor (no Gemini key needed)
     from gemini_processor import GeminiVideoProcessor
-    proc = object.__new__(GeminiVideoProcessor)
+    proc = GeminiVideoProcessor.download_only()
 
     # Call the downloader
     print('Attempting download...')
-    # If there's a cookies.txt file in this folder, read and pass it to the downloader
-    cookies_text = None
-    if os.path.exists('cookies.txt'):
+    # If there's a non-empty cookies.txt in this folder, hand its path to yt-dlp
+    # (read in place, rather than loaded here and copied to a temp file)
+    cookiefile_path = None
+    if os.path.exists('cookies.txt') and os.path.getsize('cookies.txt') > 0:
         print('Found cookies.txt, using it for download')
-        with open('cookies.txt', 'r', encoding='utf-8') as cf:
-            cookies_text = cf.read()
+        cookiefile_path = os.path.abspath('cookies.txt')
 
-    path = proc.download_video_from_url(URL, cookies_text=cookies_text)
+    path = proc.download_video_from_url(URL, cookiefile_path=cookiefile_path)
 
     if path and os.path.exists(path):
         size = os.path.getsize(path)
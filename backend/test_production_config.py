@@ -3,6 +3,7 @@ Production Configuration Test
 Verifies database and storage connections
 """
 
+import asyncio
 import os
 from dotenv import load_dotenv
 from database import init_database, is_database_enabled
@@ -11,52 +12,52 @@ import google.generativeai as genai
 
 load_dotenv()
 
-def test_production_config():
-    print("=" * 60)
-    print("  Production Configuration Test")
-    print("=" * 60)
-    print()
-    
-    all_passed = True
-    
-    # Test 1: Gemini API
-    print("[1/4] Testing Gemini API...")
+# Each check returns (passed, output lines). The checks are independent network
+# round-trips, so they run concurrently and are printed in order afterwards.
+
+def _gemini_ping(gemini_key):
+    genai.configure(api_key=gemini_key)
+    model = genai.GenerativeModel('gemini-2.5-flash-lite')
+    return model.generate_content("Say 'OK'")
+
+async def _test_gemini():
+    lines = ["[1/4] Testing Gemini API..."]
     gemini_key = os.getenv("GEMINI_API_KEY")
     if not gemini_key:
-        print("  ❌ GEMINI_API_KEY not set")
-        all_passed = False
-    else:
-        try:
-            genai.configure(api_key=gemini_key)
-            model = genai.GenerativeModel('gemini-2.5-flash-lite')
-            response = model.generate_content("Say 'OK'")
-            print(f"  ✓ Gemini API working: {response.text[:50]}")
-        except Exception as e:
-            print(f"  ❌ Gemini API failed: {e}")
-            all_passed = False
-    print()
-    
-    # Test 2: Database
-    print("[2/4] Testing Database...")
+        lines.append("  ❌ GEMINI_API_KEY not set")
+        return False, lines
+    try:
+        response = await asyncio.to_thread(_gemini_ping, gemini_key)
+        lines.append(f"  ✓ Gemini API working: {response.text[:50]}")
+        return True, lines
+    except Exception as e:
+        lines.append(f"  ❌ Gemini API failed: {e}")
+        return False, lines
+
+async def _test_db():
+    lines = ["[2/4] Testing Database..."]
     db_url = os.getenv("DATABASE_URL")
     if not db_url:
-        print("  ⚠ DATABASE_URL not set (will use in-memory storage)")
-        print("  ℹ For production, set up Neon: https://neon.tech")
-    else:
-        try:
-            success = init_database(db_url)
-            if success and is_database_enabled():
-                print("  ✓ Database connected successfully")
-            else:
-                print("  ❌ Database connection failed")
-                all_passed = False
-        except Exception as e:
-            print(f"  ❌ Database error: {e}")
-            all_passed = False
-    print()
-    
-    # Test 3: Cloud Storage
-    print("[3/4] Testing Cloud Storage...")
+        lines.append("  ⚠ DATABASE_URL not set (will use in-memory storage)")
+        lines.append("  ℹ For production, set up Neon: https://neon.tech")
+        return True, lines
+    try:
+        success = await asyncio.to_thread(init_database, db_url)
+        if success and is_database_enabled():
+            lines.append("  ✓ Database connected successfully")
+            return True, lines
+        lines.append("  ❌ Database connection failed")
+        return False, lines
+    except Exception as e:
+        lines.append(f"  ❌ Database error: {e}")
+        return False, lines
+
+def _storage_ping(bucket, access_key, secret_key, endpoint, region):
+    storage = init_storage(bucket, access_key, secret_key, endpoint, region)
+    return bool(storage and storage.validate())
+
+async def _test_storage():
+    lines = ["[3/4] Testing Cloud Storage..."]
     bucket = os.getenv("STORAGE_BUCKET")
     access_key = os.getenv("STORAGE_ACCESS_KEY")
     secret_key = os.getenv("STORAGE_SECRET_KEY")
@@ -64,32 +65,51 @@ def test_production_config():
     region = os.getenv("STORAGE_REGION", "auto")
     
     if not bucket or not access_key or not secret_key:
-        print("  ⚠ Storage not configured (will use local files)")
-        print("  ℹ For production, set up Cloudflare R2 or AWS S3")
-    else:
-        try:
-            storage = init_storage(bucket, access_key, secret_key, endpoint, region)
-            if storage and storage.enabled:
-                print(f"  ✓ Storage connected: {bucket}")
-            else:
-                print("  ❌ Storage connection failed")
-                all_passed = False
-        except Exception as e:
-            print(f"  ❌ Storage error: {e}")
-            all_passed = False
-    print()
-    
-    # Test 4: Secret Key
-    print("[4/4] Testing Secret Key...")
+        lines.append("  ⚠ Storage not configured (will use local files)")
+        lines.append("  ℹ For production, set up Cloudflare R2 or AWS S3")
+        return True, lines
+    try:
+        if await asyncio.to_thread(_storage_ping, bucket, access_key, secret_key, endpoint, region):
+            lines.append(f"  ✓ Storage connected: {bucket}")
+            return True, lines
+        lines.append("  ❌ Storage connection failed")
+        return False, lines
+    except Exception as e:
+        lines.append(f"  ❌ Storage error: {e}")
+        return False, lines
+
+async def _test_secret():
+    lines = ["[4/4] Testing Secret Key..."]
     secret_key = os.getenv("SECRET_KEY")
     if not secret_key or secret_key == "your-secret-key-change-in-production":
-        print("  ❌ SECRET_KEY not set or using default")
-        print("  ℹ Generate with: python -c \"import secrets; print(secrets.token_urlsafe(32))\"")
-        all_passed = False
-    else:
-        print("  ✓ SECRET_KEY configured")
+        lines.append("  ❌ SECRET_KEY not set or using default")
+        lines.append("  ℹ Generate with: python -c \"import secrets; print(secrets.token_urlsafe(32))\"")
+        return False, lines
+    lines.append("  ✓ SECRET_KEY configured")
+    return True, lines
+
+async def _run_checks():
+    return await asyncio.gather(_test_gemini(), _test_db(), _test_storage(), _test_secret())
+
+def test_production_config():
+    print("=" * 60)
+    print("  Production Configuration Test")
+    print("=" * 60)
     print()
     
+    results = asyncio.run(_run_checks())
+    all_passed = True
+    for passed, lines in results:
+        for line in lines:
+            print(line)
+        print()
+        all_passed = all_passed and passed
+    
+    gemini_key = os.getenv("GEMINI_API_KEY")
+    db_url = os.getenv("DATABASE_URL")
+    bucket = os.getenv("STORAGE_BUCKET")
+    secret_key = os.getenv("SECRET_KEY")
+    
     # Summary
     print("=" * 60)
     if all_passed:
@@ -41,3 +41,27 @@ def test_create_srt_and_vtt():
 			os.remove(vtt_path)
 		except Exception:
 			pass
+
+
+def test_vtt_keeps_commas_in_cue_text():
+	transcription = {"segments": [{"start": 61.25, "end": 62.5, "text": "Well, hello there."}]}
+
+	srt_fd, srt_path = tempfile.mkstemp(suffix=".srt")
+	os.close(srt_fd)
+	vtt_fd, vtt_path = tempfile.mkstemp(suffix=".vtt")
+	os.close(vtt_fd)
+
+	try:
+		subtitles.create_srt_from_transcription(transcription, srt_path)
+		subtitles.create_vtt_from_srt(srt_path, vtt_path)
+		with open(vtt_path, "r", encoding="utf-8") as f:
+			vtt_content = f.read()
+		assert "00:01:01.250 --> 00:01:02.500" in vtt_content
+		assert "Well, hello there." in vtt_content
+
+	finally:
+		for path in (srt_path, vtt_path):
+			try:
+				os.remove(path)
+			except Exception:
+				pass
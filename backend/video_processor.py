@@ -1,51 +1,246 @@
 import os
 import json
+import time
+import hashlib
+import shutil
 import tempfile
-import whisper
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 import openai
-from pytube import YouTube
-from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
-from moviepy.video.fx.crop import crop
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 import requests
 
+import ffmpeg_helpers
+
+# Speech-to-text engines: openai-whisper (reference PyTorch implementation) and
+# faster-whisper (CTranslate2, int8 + VAD); whichever the processor is set to use.
+# Both (and yt-dlp/pytube) are imported where they're used: whisper pulls in torch, which
+# would make every import of this module, worker start and test collection slow.
+WHISPER_AVAILABLE = find_spec("whisper") is not None
+FASTER_WHISPER_AVAILABLE = find_spec("faster_whisper") is not None
+YTDLP_AVAILABLE = find_spec("yt_dlp") is not None
+
+
+# STT models shared by every VideoProcessor in the process (keyed by engine), so a
+# second processor, e.g. in a long-lived worker, doesn't load another copy
+_STT_MODELS: Dict[str, object] = {}
+_STT_MODEL_LOCK = threading.Lock()
+
+# Parsed viral-segment responses, keyed on everything that shapes the completion;
+# re-running a video reuses the answer instead of paying for another LLM call
+_SEGMENT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "clipgen_segcache")
+_SEGMENT_CACHE_TTL = 7 * 24 * 3600
+_SEGMENT_MODEL = "gpt-4o-mini"
+_SEGMENT_TEMPERATURE = 0.7
+
+# Send segment requests through the OpenAI Batch API (half price, but results can
+# take minutes); only for offline workers, see segment_batcher
+OPENAI_USE_BATCH = os.getenv("OPENAI_USE_BATCH", "false").lower() in ("1", "true", "yes")
+_batch_queue = None
+_batch_queue_lock = threading.Lock()
+
+_SEGMENT_SYSTEM_PROMPT = '''You are a viral video expert. Analyze the video transcription in the user message and identify the most engaging moments; the user message says how many.
+
+Look for:
+- Controversial or surprising statements
+- Emotional peaks (excitement, shock, humor)
+- Quotable moments
+- Story climaxes or revelations
+- Strong opinions or hot takes
+
+For each moment, provide:
+1. Start time in seconds (as a number)
+2. End time in seconds (as a number)
+3. The exact text from that segment
+4. A brief reason why it's viral-worthy
+
+Return ONLY a valid JSON object with this structure:
+{
+  "segments": [
+    {
+      "start": 10.5,
+      "end": 25.3,
+      "text": "exact quote from video",
+      "reason": "why this is viral"
+    }
+  ]
+}'''
+
+
+class _SegmentStream:
+    """
+    Incremental parser for the streamed {"segments": [{...}, ...]} response:
+    feed() text fragments as they arrive and get back each segment object
+    as soon as its closing brace has been received
+    """
+    
+    def __init__(self):
+        self._buf = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, text: str) -> List[Dict]:
+        done = []
+        for ch in text:
+            if self._depth >= 2:
+                self._buf.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+                if self._depth == 2:
+                    # Start of a segment (depth 1 is the wrapping object)
+                    self._buf = ["{"]
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 1:
+                    done.append(json.loads("".join(self._buf)))
+                    self._buf = []
+        return done
+
+
+def _segment_cache_path(transcription: str, num_clips: int) -> str:
+    key = hashlib.blake2b(
+        f"{_SEGMENT_MODEL}|{num_clips}|{_SEGMENT_TEMPERATURE}|{_SEGMENT_SYSTEM_PROMPT}|{transcription}".encode("utf-8"),
+        digest_size=20
+    ).hexdigest()
+    return os.path.join(_SEGMENT_CACHE_DIR, key + ".json")
+
+
+def _load_cached_segments(path: str) -> Optional[List[Dict]]:
+    try:
+        if time.time() - os.path.getmtime(path) > _SEGMENT_CACHE_TTL:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store_cached_segments(path: str, segments: List[Dict]):
+    try:
+        os.makedirs(_SEGMENT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(segments, f)
+        os.replace(tmp_path, path)  # readers never see a partial file
+    except OSError as e:
+        print(f"Could not cache segments: {e}")
+
+
+def _render_one_clip(
+    video_path: str,
+    segment: Dict,
+    index: int,
+    clip_duration: int,
+    target_resolution: tuple,
+    threads: Optional[int] = None
+) -> Dict:
+    """Render segment `index` of a job; each call seeks on its own, so clips render independently"""
+    fd, output_path = tempfile.mkstemp(suffix=f"_clip_{index+1}.mp4")
+    os.close(fd)
+    
+    # Adjust end time based on desired clip duration
+    start = segment["start"]
+    end = min(segment["end"], start + clip_duration)
+    
+    clip_path = VideoProcessor.generate_clip(
+        video_path=video_path,
+        start_time=start,
+        end_time=end,
+        text=segment["text"][:100],  # Limit subtitle length
+        output_path=output_path,
+        resolution=target_resolution,
+        add_subtitles=True,
+        threads=threads
+    )
+    
+    return {
+        "clip_number": index + 1,
+        "path": clip_path,
+        "start_time": start,
+        "end_time": end,
+        "text": segment["text"],
+        "reason": segment.get("reason", ""),
+        "duration": end - start
+    }
+
 
 class VideoProcessor:
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, stt_engine: str = "whisper"):
         self.openai_api_key = openai_api_key
         self.whisper_model = None
+        self.stt_engine = stt_engine  # "whisper" or "faster-whisper"
         openai.api_key = openai_api_key
     
+    def _use_faster_whisper(self) -> bool:
+        return self.stt_engine == "faster-whisper" and FASTER_WHISPER_AVAILABLE
+    
     def load_whisper_model(self):
         """Load Whisper model for transcription"""
         if self.whisper_model is None:
-            print("Loading Whisper model...")
-            self.whisper_model = whisper.load_model("base")
+            engine = "faster-whisper" if self._use_faster_whisper() else "whisper"
+            with _STT_MODEL_LOCK:
+                if engine not in _STT_MODELS:
+                    print(f"Loading Whisper model ({engine})...")
+                    if engine == "faster-whisper":
+                        import ctranslate2
+                        from faster_whisper import WhisperModel
+                        # int8_float16 needs a GPU; CTranslate2 only supports plain int8 on CPU
+                        if ctranslate2.get_cuda_device_count() > 0:
+                            device, compute_type = "cuda", "int8_float16"
+                        else:
+                            device, compute_type = "cpu", "int8"
+                        _STT_MODELS[engine] = WhisperModel("base", device=device, compute_type=compute_type)
+                    elif WHISPER_AVAILABLE:
+                        import whisper
+                        _STT_MODELS[engine] = whisper.load_model("base")
+                    else:
+                        raise RuntimeError("No speech-to-text engine available. Install openai-whisper or faster-whisper.")
+                self.whisper_model = _STT_MODELS[engine]
         return self.whisper_model
     
     def download_youtube_video(self, url: str) -> str:
         """Download YouTube video and return local path"""
         try:
-            yt = YouTube(url)
-            stream = (
-                yt.streams.filter(file_extension="mp4", progressive=True)
-                .order_by("resolution")
-                .desc()
-                .first()
-            )
+            temp_dir = tempfile.mkdtemp(prefix="clipgen_yt_")
             
-            # Create temp file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-            temp_path = temp_file.name
-            temp_file.close()
+            if not YTDLP_AVAILABLE:
+                # Fallback: pytube, single connection
+                from pytube import YouTube
+                yt = YouTube(url)
+                stream = (
+                    yt.streams.filter(file_extension="mp4", progressive=True)
+                    .order_by("resolution")
+                    .desc()
+                    .first()
+                )
+                return stream.download(output_path=temp_dir, filename="video.mp4")
             
-            # Download to temp location
-            stream.download(
-                output_path=os.path.dirname(temp_path),
-                filename=os.path.basename(temp_path)
-            )
+            import yt_dlp
+            ydl_opts = {
+                "format": "best[ext=mp4][height<=1080]/best[ext=mp4]/best",
+                "outtmpl": os.path.join(temp_dir, "video.%(ext)s"),
+                "noplaylist": True,
+                "quiet": True,
+            }
+            # Split the download across parallel connections when aria2c is installed
+            if shutil.which("aria2c"):
+                ydl_opts["external_downloader"] = {"default": "aria2c"}
+                ydl_opts["external_downloader_args"] = {"aria2c": ["-x", "16", "-s", "16", "-k", "1M"]}
             
-            return temp_path
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=True)
+                return ydl.prepare_filename(info)
         except Exception as e:
             raise Exception(f"Failed to download YouTube video: {str(e)}")
     
@@ -54,14 +249,14 @@ class VideoProcessor:
         try:
             temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
             temp_path = temp_file.name
+            temp_file.close()
             
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            
-            with open(temp_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            with requests.get(url, stream=True) as response:
+                response.raise_for_status()
+                # 16MB block copies of the decoded stream instead of 8KB Python iterations
+                response.raw.decode_content = True
+                with open(temp_path, 'wb') as f:
+                    shutil.copyfileobj(response.raw, f, length=16 * 1024 * 1024)
             
             return temp_path
         except Exception as e:
@@ -72,150 +267,116 @@ class VideoProcessor:
         try:
             model = self.load_whisper_model()
             print(f"Transcribing video: {video_path}")
-            result = model.transcribe(video_path)
+            # Decode the audio in-process when PyAV is available; otherwise the
+            # engine is given the path and decodes it with ffmpeg itself
+            audio = ffmpeg_helpers.decode_audio_16k(video_path)
+            source = audio if audio is not None else video_path
+            if self._use_faster_whisper():
+                # VAD skips silence; not conditioning on previous text stops one
+                # misheard window from derailing the rest of the transcript
+                segment_generator, info = model.transcribe(
+                    source,
+                    vad_filter=True,
+                    vad_parameters=dict(min_silence_duration_ms=500),
+                    condition_on_previous_text=False
+                )
+                segments = [
+                    {"start": float(seg.start), "end": float(seg.end), "text": seg.text}
+                    for seg in segment_generator
+                ]
+                return {"text": "".join(seg["text"] for seg in segments).strip(), "segments": segments}
+            result = model.transcribe(source)
             return result
         except Exception as e:
             raise Exception(f"Transcription failed: {str(e)}")
     
     def get_viral_segments(self, transcription: str, num_clips: int = 5) -> List[Dict]:
         """Use GPT to identify viral-worthy segments"""
+        return list(self.stream_viral_segments(transcription, num_clips))
+    
+    def stream_viral_segments(self, transcription: str, num_clips: int = 5) -> Iterator[Dict]:
+        """
+        Like get_viral_segments, but streams the completion and yields each
+        segment as soon as it has been received, so work on it can start early
+        """
+        cache_path = _segment_cache_path(transcription, num_clips)
+        cached = _load_cached_segments(cache_path)
+        if cached is not None:
+            print("Using cached viral segments")
+            yield from cached
+            return
+        
         try:
             client = openai.OpenAI(api_key=self.openai_api_key)
             
-            prompt = f'''You are a viral video expert. Analyze this video transcription and identify the top {num_clips} most engaging moments.
-
-Look for:
-- Controversial or surprising statements
-- Emotional peaks (excitement, shock, humor)
-- Quotable moments
-- Story climaxes or revelations
-- Strong opinions or hot takes
-
-For each moment, provide:
-1. Start time in seconds (as a number)
-2. End time in seconds (as a number)
-3. The exact text from that segment
-4. A brief reason why it's viral-worthy
-
-Return ONLY a valid JSON array with this structure:
-[
-  {{
-    "start": 10.5,
-    "end": 25.3,
-    "text": "exact quote from video",
-    "reason": "why this is viral"
-  }}
-]
-
-Transcription:
-{transcription}
-
-Return only the JSON array, no other text.'''
-
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that returns only valid JSON."},
-                    {"role": "user", "content": prompt}
+            # Stable instructions first, the per-video transcription last: the
+            # identical prefix is what OpenAI's automatic prompt caching can reuse
+            request = {
+                "model": _SEGMENT_MODEL,
+                "messages": [
+                    {"role": "system", "content": _SEGMENT_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Number of moments: {num_clips}\n\nTranscription:\n{transcription}"}
                 ],
-                temperature=0.7
-            )
+                "temperature": _SEGMENT_TEMPERATURE,
+                "response_format": {"type": "json_object"},
+            }
             
-            content = response.choices[0].message.content.strip()
+            if OPENAI_USE_BATCH:
+                body = self._batch_queue(client).submit_and_wait(request)
+                segments = json.loads(body["choices"][0]["message"]["content"])["segments"][:num_clips]
+                _store_cached_segments(cache_path, segments)
+                yield from segments
+                return
             
-            # Remove markdown code blocks if present
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-                content = content.strip()
+            response = client.chat.completions.create(**request, stream=True)
             
-            segments = json.loads(content)
-            return segments
+            parser = _SegmentStream()
+            segments = []
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                for segment in parser.feed(chunk.choices[0].delta.content or ""):
+                    if len(segments) < num_clips:
+                        segments.append(segment)
+                        yield segment
+            
+            _store_cached_segments(cache_path, segments)
             
         except Exception as e:
             raise Exception(f"AI segment selection failed: {str(e)}")
     
+    @staticmethod
+    def _batch_queue(client):
+        """Process-wide batch queue, so requests from concurrent jobs share batches"""
+        global _batch_queue
+        with _batch_queue_lock:
+            if _batch_queue is None:
+                from segment_batcher import BatchQueue
+                _batch_queue = BatchQueue(client)
+            return _batch_queue
+    
+    @staticmethod
     def generate_clip(
-        self,
         video_path: str,
         start_time: float,
         end_time: float,
         text: str,
         output_path: str,
         resolution: tuple = (1080, 1920),  # Portrait by default
-        add_subtitles: bool = True
+        add_subtitles: bool = True,
+        threads: Optional[int] = None
     ) -> str:
-        """Generate a single clip with optional subtitles"""
+        """Generate a single clip with optional subtitles (one ffmpeg process, no Python-side frames)"""
         try:
-            # Load video
-            video = VideoFileClip(video_path)
-            
-            # Ensure end time doesn't exceed video duration
-            end_time = min(end_time, video.duration)
-            
-            # Extract clip
-            clip = video.subclip(start_time, end_time)
-            
-            # Resize and crop to target resolution
-            target_width, target_height = resolution
-            
-            # Calculate scaling
-            scale = max(target_width / clip.w, target_height / clip.h)
-            clip_resized = clip.resize(scale)
-            
-            # Crop to exact dimensions
-            clip_cropped = crop(
-                clip_resized,
-                width=target_width,
-                height=target_height,
-                x_center=clip_resized.w / 2,
-                y_center=clip_resized.h / 2
-            )
-            
-            # Add subtitles if requested
-            if add_subtitles and text:
-                # Create text clip
-                txt_clip = TextClip(
-                    text,
-                    fontsize=40,
-                    color='white',
-                    font='Arial-Bold',
-                    stroke_color='black',
-                    stroke_width=2,
-                    method='caption',
-                    size=(int(target_width * 0.9), None),
-                    align='center'
-                )
-                
-                # Position at bottom
-                txt_clip = txt_clip.set_position(('center', target_height - 150))
-                txt_clip = txt_clip.set_duration(clip_cropped.duration)
-                
-                # Composite
-                final_clip = CompositeVideoClip([clip_cropped, txt_clip])
-            else:
-                final_clip = clip_cropped
-            
-            # Write output
-            final_clip.write_videofile(
+            return ffmpeg_helpers.render_clip(
+                video_path,
+                start_time,
+                end_time,
+                resolution,
                 output_path,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile=tempfile.mktemp(suffix='.m4a'),
-                remove_temp=True,
-                verbose=False,
-                logger=None
+                caption=text if add_subtitles else None,
+                threads=threads
             )
-            
-            # Cleanup
-            video.close()
-            clip.close()
-            if add_subtitles and text:
-                final_clip.close()
-            
-            return output_path
-            
         except Exception as e:
             raise Exception(f"Clip generation failed: {str(e)}")
     
@@ -243,40 +404,24 @@ Return only the JSON array, no other text.'''
             transcription_result = self.transcribe_video(video_path)
             full_text = transcription_result["text"]
             
-            # Step 2: Get viral segments
-            print("Step 2: Identifying viral segments with AI...")
-            segments = self.get_viral_segments(full_text, num_clips)
-            
-            # Step 3: Generate clips
-            print("Step 3: Generating clips...")
-            generated_clips = []
-            
-            for i, segment in enumerate(segments):
-                output_path = tempfile.mktemp(suffix=f"_clip_{i+1}.mp4")
-                
-                # Adjust end time based on desired clip duration
-                start = segment["start"]
-                end = min(segment["end"], start + clip_duration)
-                
-                clip_path = self.generate_clip(
-                    video_path=video_path,
-                    start_time=start,
-                    end_time=end,
-                    text=segment["text"][:100],  # Limit subtitle length
-                    output_path=output_path,
-                    resolution=target_resolution,
-                    add_subtitles=True
-                )
-                
-                generated_clips.append({
-                    "clip_number": i + 1,
-                    "path": clip_path,
-                    "start_time": start,
-                    "end_time": end,
-                    "text": segment["text"],
-                    "reason": segment.get("reason", ""),
-                    "duration": end - start
-                })
+            # Steps 2+3: Identify viral segments and generate clips, overlapped:
+            # each segment starts rendering as soon as the model has streamed it.
+            # Clips render concurrently, one ffmpeg process each (the encode runs in
+            # ffmpeg, so threads suffice); the cores are split between them
+            print("Step 2: Identifying viral segments with AI (clips render as they arrive)...")
+            segments = []
+            cores = os.cpu_count() or 1
+            workers = max(1, min(num_clips, cores))
+            threads = max(1, cores // workers)
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                futures = []
+                for i, segment in enumerate(self.stream_viral_segments(full_text, num_clips)):
+                    segments.append(segment)
+                    futures.append(
+                        ex.submit(_render_one_clip, video_path, segment, i, clip_duration, target_resolution, threads)
+                    )
+                print("Step 3: Finishing clips...")
+                generated_clips = [f.result() for f in futures]
             
             return {
                 "success": True,
@@ -4,106 +4,207 @@ Creates watermarked versions of clips for non-paid users
 """
 
 import os
+import re
+import shutil
+import subprocess
 import tempfile
 import logging
+from functools import lru_cache
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# ffmpeg burns the watermarks in with drawtext; MoviePy is only the fallback
+FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None
+
+# Shared encoder selection (hardware H.264 when available)
+try:
+    import ffmpeg_helpers
+except ImportError:
+    ffmpeg_helpers = None
+
 # Try to import moviepy
 try:
-    from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
+    from moviepy.editor import VideoFileClip, ImageClip, CompositeVideoClip
     MOVIEPY_AVAILABLE = True
 except ImportError:
     MOVIEPY_AVAILABLE = False
     logger.warning("MoviePy not available - watermarking disabled")
 
 
-def create_watermarked_preview(
-    input_path: str,
-    output_path: Optional[str] = None,
-    watermark_text: str = "ClipGen Preview",
-    opacity: float = 0.7
-) -> Optional[str]:
+# Small repeated marks (relative top-left corner) around the large centered one
+WATERMARK_POSITIONS = [
+    ('center', 'center'),
+    (0.2, 0.3),
+    (0.8, 0.3),
+    (0.2, 0.7),
+    (0.8, 0.7),
+]
+
+
+# Fallback font files when fontconfig can't resolve Arial (Linux, macOS, Windows)
+_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+
+@lru_cache(maxsize=1)
+def find_font_file() -> Optional[str]:
     """
-    Create a watermarked preview version of a clip
+    A TrueType font for the watermark text: WATERMARK_FONT, else what fontconfig
+    picks for Arial (the family the burned-in subtitles ask for), else a common
+    system font. None if nothing is found.
+    """
+    configured = os.getenv("WATERMARK_FONT")
+    if configured and os.path.isfile(configured):
+        return configured
     
-    Args:
-        input_path: Path to original clip
-        output_path: Path for watermarked output (auto-generated if None)
-        watermark_text: Text to overlay
-        opacity: Watermark opacity (0-1)
+    if shutil.which("fc-match"):
+        try:
+            matched = subprocess.run(
+                ["fc-match", "-f", "%{file}", "Arial:bold"],
+                capture_output=True, text=True, timeout=5
+            ).stdout.strip()
+            if matched and os.path.isfile(matched):
+                return matched
+        except Exception:
+            pass
     
-    Returns:
-        Path to watermarked file, or None if failed
+    for candidate in _FONT_CANDIDATES:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _load_font(size: int):
+    from PIL import ImageFont
+    for name in (find_font_file(), "arial.ttf"):
+        if not name:
+            continue
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+
+def _build_watermark_overlay(width: int, height: int, watermark_text: str, opacity: float) -> str:
     """
-    if not MOVIEPY_AVAILABLE:
-        logger.warning("MoviePy not available, returning original path")
-        return input_path
+    Render every watermark into one transparent PNG the size of the video,
+    so compositing costs one alpha blend per frame instead of one per text layer
+    """
+    from PIL import Image, ImageDraw
     
-    if not os.path.exists(input_path):
-        logger.error(f"Input file not found: {input_path}")
-        return None
+    overlay = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
     
-    if output_path is None:
-        base, ext = os.path.splitext(input_path)
-        output_path = f"{base}_preview{ext}"
+    def draw_text(pos, font, alpha, stroke_width):
+        bbox = draw.textbbox((0, 0), watermark_text, font=font, stroke_width=stroke_width)
+        text_w, text_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        if pos[0] == 'center':
+            xy = ((width - text_w) // 2, (height - text_h) // 2)
+        else:
+            xy = (int(pos[0] * width), int(pos[1] * height))
+        draw.text(
+            xy, watermark_text, font=font,
+            fill=(255, 255, 255, alpha),
+            stroke_width=stroke_width, stroke_fill=(0, 0, 0, alpha)
+        )
+    
+    small_font = _load_font(30)
+    for pos in WATERMARK_POSITIONS:
+        draw_text(pos, small_font, int(255 * opacity * 0.5), 1)
+    
+    # Large centered mark last so it sits on top
+    draw_text(('center', 'center'), _load_font(50), int(255 * opacity), 2)
+    
+    fd, png_path = tempfile.mkstemp(suffix="_watermark.png")
+    os.close(fd)
+    overlay.save(png_path, "PNG")
+    return png_path
+
+
+def _drawtext_escape(text: str) -> str:
+    """Escape text for a drawtext option value, then for the filtergraph around it"""
+    text = re.sub(r"([\\':])", r"\\\1", text)
+    return re.sub(r"([\\'\[\],;])", r"\\\1", text)
+
+
+def _watermark_filter(watermark_text: str, opacity: float) -> str:
+    """One filter chain drawing every watermark in a single pass over each frame"""
+    text = _drawtext_escape(watermark_text)
+    # An explicit font file: drawtext's default needs fontconfig support in the ffmpeg build
+    font_file = find_font_file()
+    font = f"fontfile={_drawtext_escape(font_file.replace(os.sep, '/'))}:" if font_file else ""
+    
+    def drawtext(x, y, fontsize, alpha, borderw):
+        return (
+            f"drawtext={font}text={text}:expansion=none:fontcolor=white:bordercolor=black:"
+            f"borderw={borderw}:fontsize={fontsize}:x={x}:y={y}:alpha={alpha:.3f}"
+        )
+    
+    filters = []
+    for pos in WATERMARK_POSITIONS:
+        if pos[0] == 'center':
+            x, y = "(w-text_w)/2", "(h-text_h)/2"
+        else:
+            x, y = f"w*{pos[0]}", f"h*{pos[1]}"
+        filters.append(drawtext(x, y, 30, opacity * 0.5, 1))
+    
+    # Large centered mark last so it sits on top
+    filters.append(drawtext("(w-text_w)/2", "(h-text_h)/2", 50, opacity, 2))
+    return ",".join(filters)
+
+
+def _watermark_with_ffmpeg(input_path: str, output_path: str, watermark_text: str, opacity: float) -> Optional[str]:
+    def build_cmd(encoder_args):
+        return [
+            "ffmpeg", "-y",
+            "-i", input_path,
+            "-vf", _watermark_filter(watermark_text, opacity),
+            *encoder_args,
+            "-c:a", "copy",
+            output_path,
+        ]
     
+    try:
+        if ffmpeg_helpers:
+            ffmpeg_helpers.run_encode(build_cmd)
+        else:
+            subprocess.run(build_cmd(["-c:v", "libx264", "-preset", "veryfast"]), check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Watermarking failed: {e.stderr.decode(errors='ignore')[-500:]}")
+        return None
+    
+    logger.info(f"Created watermarked preview: {output_path}")
+    return output_path
+
+
+def _watermark_with_moviepy(input_path: str, output_path: str, watermark_text: str, opacity: float) -> Optional[str]:
+    temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.m4a')
+    temp_audio.close()
     try:
         # Load video
         video = VideoFileClip(input_path)
         
-        # Create watermark text
-        txt_clip = TextClip(
-            watermark_text,
-            fontsize=50,
-            color='white',
-            font='Arial-Bold',
-            stroke_color='black',
-            stroke_width=2
-        ).set_opacity(opacity)
-        
-        # Position in center
-        txt_clip = txt_clip.set_position('center')
-        txt_clip = txt_clip.set_duration(video.duration)
-        
-        # Create diagonal repeating watermark effect
-        watermarks = []
-        positions = [
-            ('center', 'center'),
-            (0.2, 0.3),
-            (0.8, 0.3),
-            (0.2, 0.7),
-            (0.8, 0.7),
-        ]
-        
-        for pos in positions:
-            wm = TextClip(
-                watermark_text,
-                fontsize=30,
-                color='white',
-                font='Arial',
-                stroke_color='black',
-                stroke_width=1
-            ).set_opacity(opacity * 0.5)
-            
-            if isinstance(pos[0], float):
-                wm = wm.set_position((pos[0], pos[1]), relative=True)
-            else:
-                wm = wm.set_position(pos)
-            
-            wm = wm.set_duration(video.duration)
-            watermarks.append(wm)
+        # All watermarks pre-rendered into a single overlay image
+        overlay_path = _build_watermark_overlay(video.w, video.h, watermark_text, opacity)
+        overlay = ImageClip(overlay_path).set_duration(video.duration)
         
         # Composite
-        final = CompositeVideoClip([video] + watermarks + [txt_clip])
+        final = CompositeVideoClip([video, overlay])
         
         # Write output
         final.write_videofile(
             output_path,
             codec='libx264',
             audio_codec='aac',
-            temp_audiofile=tempfile.mktemp(suffix='.m4a'),
+            temp_audiofile=temp_audio.name,
             remove_temp=True,
             verbose=False,
             logger=None
@@ -112,6 +213,7 @@ def create_watermarked_preview(
         # Cleanup
         video.close()
         final.close()
+        os.remove(overlay_path)
         
         logger.info(f"Created watermarked preview: {output_path}")
         return output_path
@@ -119,6 +221,48 @@ def create_watermarked_preview(
     except Exception as e:
         logger.error(f"Watermarking failed: {e}")
         return None
+    finally:
+        if os.path.exists(temp_audio.name):
+            os.unlink(temp_audio.name)
+
+
+def create_watermarked_preview(
+    input_path: str,
+    output_path: Optional[str] = None,
+    watermark_text: str = "ClipGen Preview",
+    opacity: float = 0.7
+) -> Optional[str]:
+    """
+    Create a watermarked preview version of a clip
+    
+    Args:
+        input_path: Path to original clip
+        output_path: Path for watermarked output (auto-generated if None)
+        watermark_text: Text to overlay
+        opacity: Watermark opacity (0-1)
+    
+    Returns:
+        Path to watermarked file, or None if failed
+    """
+    if not FFMPEG_AVAILABLE and not MOVIEPY_AVAILABLE:
+        logger.warning("Neither ffmpeg nor MoviePy available, returning original path")
+        return input_path
+    
+    if not os.path.exists(input_path):
+        logger.error(f"Input file not found: {input_path}")
+        return None
+    
+    if output_path is None:
+        base, ext = os.path.splitext(input_path)
+        output_path = f"{base}_preview{ext}"
+    
+    if FFMPEG_AVAILABLE:
+        result = _watermark_with_ffmpeg(input_path, output_path, watermark_text, opacity)
+        # e.g. an ffmpeg build without drawtext/libfreetype: composite with MoviePy instead
+        if result is not None or not MOVIEPY_AVAILABLE:
+            return result
+        logger.warning("ffmpeg watermarking failed, falling back to MoviePy")
+    return _watermark_with_moviepy(input_path, output_path, watermark_text, opacity)
 
 
 def create_preview_thumbnail(
@@ -152,15 +296,12 @@ def create_preview_thumbnail(
         frame = video.get_frame(frame_time)
         
         # Save frame
-        from PIL import Image, ImageDraw, ImageFont
+        from PIL import Image, ImageDraw
         img = Image.fromarray(frame)
         
         # Add watermark
         draw = ImageDraw.Draw(img)
-        try:
-            font = ImageFont.truetype("arial.ttf", 40)
-        except:
-            font = ImageFont.load_default()
+        font = _load_font(40)
         
         text = "ClipGen Preview"
         bbox = draw.textbbox((0, 0), text, font=font)
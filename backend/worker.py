@@ -12,6 +12,10 @@ Usage (PowerShell):
 
 Usage (Bash):
     REDIS_URL="redis://localhost:6379/0" python backend/worker.py
+
+Options:
+    --workers N   run N worker processes (default: RQ_WORKERS env, 1)
+    --preload     load the STT model before taking the first job
 """
 import os
 import sys
@@ -25,23 +29,30 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Worker processes to run. Each one keeps its imports and models loaded between
+# jobs, and every job already runs multi-threaded ffmpeg/STT, so keep this small.
+RQ_WORKERS = int(os.getenv("RQ_WORKERS", "1"))
+LISTEN = ["default"]
 
 # Graceful shutdown handler
 def handle_shutdown(signum, frame):
     logger.info("Received shutdown signal, finishing current job...")
     sys.exit(0)
 
-if __name__ == "__main__":
-    try:
-        from redis import Redis
-        from rq import Worker, Queue, Connection
-    except ImportError as e:
-        logger.error("Missing dependencies for RQ worker. Install with: pip install redis rq")
-        raise
+def _preload():
+    """Load the job module and its STT model once, so every job in this process reuses them"""
+    import main
+    if main.video_processor is not None:
+        main.video_processor.load_whisper_model()
+        logger.info(f"Preloaded STT model ({main.video_processor.stt_engine})")
 
-    # Register signal handlers for graceful shutdown
-    signal.signal(signal.SIGTERM, handle_shutdown)
-    signal.signal(signal.SIGINT, handle_shutdown)
+def _run_worker(preload: bool = False):
+    """
+    Run one non-forking RQ worker. SimpleWorker executes jobs in this process
+    instead of forking per job, so imports and models persist across jobs.
+    """
+    from redis import Redis
+    from rq import SimpleWorker, Queue
 
     try:
         redis_conn = Redis.from_url(REDIS_URL)
@@ -52,9 +63,51 @@ if __name__ == "__main__":
         logger.error(f"Failed to connect to Redis: {e}")
         sys.exit(1)
 
-    listen = ["default"]
+    if preload:
+        _preload()
+
+    worker = SimpleWorker([Queue(name, connection=redis_conn) for name in LISTEN], connection=redis_conn)
+    logger.info(f"Starting RQ worker listening on queues: {LISTEN}")
+    worker.work(with_scheduler=True)  # Enable scheduler for delayed jobs
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description="Clip Generator RQ worker")
+    parser.add_argument("--workers", type=int, default=RQ_WORKERS, help="worker processes (default: RQ_WORKERS or 1)")
+    parser.add_argument("--preload", action="store_true", help="load the STT model before taking jobs")
+    args = parser.parse_args()
+
+    try:
+        import redis  # noqa: F401
+        import rq  # noqa: F401
+    except ImportError as e:
+        logger.error("Missing dependencies for RQ worker. Install with: pip install redis rq")
+        raise
+
+    if args.workers <= 1:
+        # Register signal handlers for graceful shutdown
+        signal.signal(signal.SIGTERM, handle_shutdown)
+        signal.signal(signal.SIGINT, handle_shutdown)
+        _run_worker(args.preload)
+    else:
+        procs = [
+            multiprocessing.Process(target=_run_worker, args=(args.preload,), name=f"rq-worker-{i + 1}")
+            for i in range(args.workers)
+        ]
+        for proc in procs:
+            proc.start()
+        logger.info(f"Started {len(procs)} RQ worker processes")
+
+        # Each child shuts down gracefully on its own signal; pass SIGTERM along
+        def stop_children(signum, frame):
+            logger.info("Received shutdown signal, stopping workers...")
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
 
-    with Connection(redis_conn):
-        worker = Worker(map(Queue, listen))
-        logger.info(f"Starting RQ worker listening on queues: {listen}")
-        worker.work(with_scheduler=True)  # Enable scheduler for delayed jobs
+        signal.signal(signal.SIGTERM, stop_children)
+        signal.signal(signal.SIGINT, stop_children)
+        for proc in procs:
+            proc.join()
@@ -11,10 +11,19 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
 import os
+import json
+import tempfile
+import hashlib
+import mimetypes
+import asyncio
 import logging
+import threading
 from datetime import datetime, timedelta
 import uuid
 
+from cache import TTLCache
+from rate_limit import SlidingWindowLimiter
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/youtube", tags=["youtube"])
@@ -25,18 +34,34 @@ try:
     from google_auth_oauthlib.flow import InstalledAppFlow
     from google.auth.transport.requests import Request
     from googleapiclient.discovery import build
-    from googleapiclient.http import MediaFileUpload
+    from googleapiclient.http import MediaIoBaseUpload
     from googleapiclient.errors import HttpError
-    import pickle
+    import google_auth_httplib2
+    import httplib2
     YOUTUBE_AVAILABLE = True
 except ImportError:
     YOUTUBE_AVAILABLE = False
     logger.warning("YouTube API not available. Install: pip install google-auth google-auth-oauthlib google-auth-httplib2 google-api-python-client")
 
+# xxh3 hashes at memory speed; blake2b (stdlib) is the fallback
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
 # YouTube API scopes
 SCOPES = ['https://www.googleapis.com/auth/youtube.upload', 
           'https://www.googleapis.com/auth/youtube.readonly']
 
+# Resumable upload chunk size. Must be a multiple of 256 KiB; large chunks keep the
+# connection busy (far fewer round-trips) while bounding memory, unlike chunksize=-1
+# which buffers the whole file
+_UPLOAD_CHUNK_ALIGN = 256 * 1024
+YOUTUBE_CHUNK_SIZE = int(os.getenv("YT_CHUNK_SIZE", str(100 * 1024 * 1024)))
+YOUTUBE_CHUNK_SIZE = max(_UPLOAD_CHUNK_ALIGN, YOUTUBE_CHUNK_SIZE - YOUTUBE_CHUNK_SIZE % _UPLOAD_CHUNK_ALIGN)
+logger.info(f"YouTube upload chunk size: {YOUTUBE_CHUNK_SIZE // 1024} KiB")
+
 # Models
 class YouTubeUploadRequest(BaseModel):
     clip_id: int
@@ -56,18 +81,121 @@ class YouTubeVideoStats(BaseModel):
     updated_at: datetime
 
 
-def get_youtube_service():
-    """Get authenticated YouTube service"""
+# Retries for transient API failures (429/5xx, connection errors). googleapiclient's
+# num_retries backs off exponentially with random jitter between attempts
+YOUTUBE_NUM_RETRIES = int(os.getenv("YT_NUM_RETRIES", "5"))
+
+# OAuth token storage: authorized-user JSON (replaces the old pickle, which is read
+# once to migrate)
+TOKEN_PATH = 'youtube_token.json'
+LEGACY_TOKEN_PATH = 'youtube_token.pickle'
+
+# Paces every YouTube Data API request (across endpoints and threads) to stay
+# under the per-minute quota
+YT_LIMITER = SlidingWindowLimiter(rpm=int(os.getenv("YT_RPM", "300")))
+
+# Recent /stats responses by video ID; counts barely move minute to minute, and a
+# hit costs no quota. View syncs refresh it for every video they fetch
+video_stats_cache = TTLCache(ttl=int(os.getenv("YT_STATS_TTL", "60")), maxsize=10000)
+
+# Most IDs videos().list accepts in one call
+YOUTUBE_LIST_MAX_IDS = 50
+
+# Built API client and its credentials, reused until the credentials stop being valid
+_SERVICE_CACHE = {"service": None, "creds": None}
+_service_lock = threading.Lock()
+
+
+def invalidate_youtube_service():
+    """Drop the cached client (e.g. after a 401) so the next call reloads credentials"""
+    with _service_lock:
+        _SERVICE_CACHE["service"] = None
+        _SERVICE_CACHE["creds"] = None
+
+
+def _invalidate_on_auth_error(e: Exception):
+    if YOUTUBE_AVAILABLE and isinstance(e, HttpError) and e.resp.status == 401:
+        invalidate_youtube_service()
+
+
+def _cached_service():
+    """(service, creds), rebuilding both when the credentials are no longer valid"""
     if not YOUTUBE_AVAILABLE:
         raise HTTPException(status_code=503, detail="YouTube API not configured")
     
-    creds = None
-    token_path = 'youtube_token.pickle'
+    with _service_lock:
+        cached_creds = _SERVICE_CACHE["creds"]
+        if _SERVICE_CACHE["service"] is not None and cached_creds is not None and cached_creds.valid:
+            return _SERVICE_CACHE["service"], cached_creds
+        
+        service, creds = _build_youtube_service(cached_creds)
+        _SERVICE_CACHE["service"] = service
+        _SERVICE_CACHE["creds"] = creds
+        return service, creds
+
+
+def get_youtube_service():
+    """Get authenticated YouTube service (cached; rebuilt when the credentials expire)"""
+    return _cached_service()[0]
+
+
+def _authorized_http():
+    """
+    A fresh authorized HTTP transport. httplib2 connections aren't thread-safe, so
+    requests executed off the event loop thread (uploads) get their own
+    """
+    creds = _cached_service()[1]
+    return google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+
+
+_thread_http = threading.local()
+
+
+def _execute(request_obj) -> dict:
+    """
+    Run an API request (blocking: rate limit wait, HTTP, retry backoff sleeps) on the
+    calling worker thread with that thread's own authorized transport
+    """
+    creds = _cached_service()[1]
+    if getattr(_thread_http, "creds", None) is not creds:
+        _thread_http.http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+        _thread_http.creds = creds
+    YT_LIMITER.acquire()
+    return request_obj.execute(http=_thread_http.http, num_retries=YOUTUBE_NUM_RETRIES)
+
+
+def load_youtube_credentials():
+    """Saved credentials, or None if the app hasn't been authorized yet"""
+    if os.path.exists(TOKEN_PATH):
+        with open(TOKEN_PATH, 'r') as token:
+            return Credentials.from_authorized_user_info(json.load(token), SCOPES)
     
-    # Load saved credentials
-    if os.path.exists(token_path):
-        with open(token_path, 'rb') as token:
+    if os.path.exists(LEGACY_TOKEN_PATH):
+        import pickle
+        
+        logger.info(f"Migrating {LEGACY_TOKEN_PATH} to {TOKEN_PATH}")
+        with open(LEGACY_TOKEN_PATH, 'rb') as token:
             creds = pickle.load(token)
+        save_youtube_credentials(creds)
+        os.remove(LEGACY_TOKEN_PATH)
+        return creds
+    
+    return None
+
+
+def save_youtube_credentials(creds):
+    """Write credentials atomically so a crash mid-write can't corrupt the token"""
+    tmp_path = f"{TOKEN_PATH}.tmp"
+    with open(tmp_path, 'w') as token:
+        token.write(creds.to_json())
+    os.replace(tmp_path, TOKEN_PATH)
+
+
+def _build_youtube_service(creds=None):
+    """Load (or refresh) credentials and build the API client; returns (service, creds)"""
+    # Load saved credentials
+    if creds is None:
+        creds = load_youtube_credentials()
     
     # Refresh or get new credentials
     if not creds or not creds.valid:
@@ -81,10 +209,54 @@ def get_youtube_service():
             )
         
         # Save credentials
-        with open(token_path, 'wb') as token:
-            pickle.dump(creds, token)
+        save_youtube_credentials(creds)
     
-    return build('youtube', 'v3', credentials=creds)
+    return build('youtube', 'v3', credentials=creds), creds
+
+
+def _file_digest(path: str) -> str:
+    """128-bit content hash of a file, read in 1 MiB blocks"""
+    h = xxhash.xxh3_128() if XXHASH_AVAILABLE else hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _open_for_upload(path: str):
+    """
+    Open a file for a chunked upload: unbuffered, so each chunk is read straight into
+    the one bytes object that gets sent (no extra chunk-sized read buffer), with a
+    sequential-access hint so the kernel reads ahead
+    """
+    fh = open(path, 'rb', buffering=0)
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+    return fh
+
+
+def _do_resumable_upload(request_obj, http=None) -> dict:
+    """Send a resumable upload chunk by chunk (blocking) and return the final response"""
+    response = None
+    while response is None:
+        YT_LIMITER.acquire()
+        status, response = request_obj.next_chunk(http=http, num_retries=YOUTUBE_NUM_RETRIES)
+        if status:
+            logger.info(f"Upload progress: {int(status.progress() * 100)}%")
+    return response
+
+
+def _link_marketplace_job(db, MarketplaceJob, job_id, video_id: str, youtube_url: str, tracking_code: str):
+    """Record the YouTube video on a marketplace job (no-op when the job doesn't exist)"""
+    job = db.query(MarketplaceJob).filter(MarketplaceJob.id == job_id).first()
+    if job:
+        job.youtube_video_id = video_id
+        job.youtube_url = youtube_url
+        job.tracking_code = tracking_code
+        db.commit()
 
 
 @router.post("/upload")
@@ -97,19 +269,47 @@ async def upload_to_youtube(
         raise HTTPException(status_code=503, detail="YouTube API not available")
     
     try:
-        from database import get_db, Clip, MarketplaceJob
+        from database import get_db, Clip, MarketplaceJob, YouTubeUpload
         
         db = get_db()
+        downloaded_file = None
         try:
             # Get clip file
-            clip = db.query(Clip).filter(Clip.id == request.clip_id).first()
+            clip = await asyncio.to_thread(lambda: db.query(Clip).filter(Clip.id == request.clip_id).first())
             if not clip:
                 raise HTTPException(status_code=404, detail="Clip not found")
             
-            video_file = clip.local_path or clip.storage_key
+            video_file = clip.local_path
+            if (not video_file or not os.path.exists(video_file)) and clip.storage_key:
+                # Local copy was removed after the storage upload: fetch it back for this upload
+                from storage import get_storage
+                storage = get_storage()
+                if storage and storage.enabled:
+                    fd, downloaded_file = tempfile.mkstemp(suffix=os.path.splitext(clip.storage_key)[1] or ".mp4")
+                    os.close(fd)
+                    if await storage.async_download_file(clip.storage_key, downloaded_file):
+                        video_file = downloaded_file
             if not video_file or not os.path.exists(video_file):
                 raise HTTPException(status_code=404, detail="Clip file not found")
             
+            # The same file already on YouTube (e.g. a retried request): return that
+            # upload instead of sending it again
+            content_hash = await asyncio.to_thread(_file_digest, video_file)
+            existing = await asyncio.to_thread(lambda: db.get(YouTubeUpload, content_hash))
+            if existing:
+                logger.info(f"Clip {request.clip_id} already uploaded to YouTube: {existing.video_id}")
+                # Still link the requested job, so view sync and bonuses see it
+                await asyncio.to_thread(
+                    _link_marketplace_job, db, MarketplaceJob, request.job_id,
+                    existing.video_id, existing.youtube_url, existing.tracking_code
+                )
+                return {
+                    "success": True,
+                    "video_id": existing.video_id,
+                    "youtube_url": existing.youtube_url,
+                    "tracking_code": existing.tracking_code
+                }
+            
             # Generate tracking code
             tracking_code = f"CLIP-{request.job_id}-{uuid.uuid4().hex[:8]}"
             
@@ -132,34 +332,41 @@ async def upload_to_youtube(
                 }
             }
             
-            media = MediaFileUpload(video_file, chunksize=-1, resumable=True)
-            
-            request_obj = youtube.videos().insert(
-                part=','.join(body.keys()),
-                body=body,
-                media_body=media
-            )
-            
-            response = None
-            while response is None:
-                status, response = request_obj.next_chunk()
-                if status:
-                    logger.info(f"Upload progress: {int(status.progress() * 100)}%")
+            mimetype = mimetypes.guess_type(video_file)[0] or 'video/mp4'
+            fh = _open_for_upload(video_file)
+            try:
+                media = MediaIoBaseUpload(fh, mimetype=mimetype, chunksize=YOUTUBE_CHUNK_SIZE, resumable=True)
+                
+                request_obj = youtube.videos().insert(
+                    part=','.join(body.keys()),
+                    body=body,
+                    media_body=media
+                )
+                
+                # The upload blocks for as long as the transfer takes: run it in a worker
+                # thread so the event loop keeps serving other requests meanwhile
+                response = await asyncio.to_thread(_do_resumable_upload, request_obj, _authorized_http())
+            finally:
+                fh.close()
             
             video_id = response['id']
             youtube_url = f"https://youtube.com/watch?v={video_id}"
             
             # Update job with YouTube info
-            job = db.query(MarketplaceJob).filter(MarketplaceJob.id == request.job_id).first()
-            if job:
-                job.youtube_video_id = video_id
-                job.youtube_url = youtube_url
-                job.tracking_code = tracking_code
-                db.commit()
+            await asyncio.to_thread(
+                _link_marketplace_job, db, MarketplaceJob, request.job_id, video_id, youtube_url, tracking_code
+            )
             
             # Update clip with YouTube info
             clip.platform = 'youtube'
             clip.posted_at = datetime.utcnow()
+            db.merge(YouTubeUpload(
+                content_hash=content_hash,
+                clip_id=clip.id,
+                video_id=video_id,
+                youtube_url=youtube_url,
+                tracking_code=tracking_code
+            ))
             db.commit()
             
             logger.info(f"Uploaded to YouTube: {video_id}")
@@ -173,18 +380,37 @@ async def upload_to_youtube(
             
         finally:
             db.close()
+            if downloaded_file and os.path.exists(downloaded_file):
+                os.remove(downloaded_file)
             
     except Exception as e:
+        _invalidate_on_auth_error(e)
         logger.error(f"YouTube upload failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _cache_video_stats(video_id: str, stats: dict) -> dict:
+    result = {
+        "video_id": video_id,
+        "views": int(stats.get('viewCount', 0)),
+        "likes": int(stats.get('likeCount', 0)),
+        "comments": int(stats.get('commentCount', 0)),
+        "updated_at": datetime.utcnow()
+    }
+    video_stats_cache.set(video_id, result)
+    return result
+
+
 @router.get("/stats/{video_id}")
 async def get_video_stats(video_id: str):
     """Get YouTube video statistics"""
     if not YOUTUBE_AVAILABLE:
         raise HTTPException(status_code=503, detail="YouTube API not available")
     
+    cached = video_stats_cache.get(video_id)
+    if cached is not None:
+        return cached
+    
     try:
         youtube = get_youtube_service()
         
@@ -192,22 +418,15 @@ async def get_video_stats(video_id: str):
             part='statistics',
             id=video_id
         )
-        response = request.execute()
+        response = await asyncio.to_thread(_execute, request)
         
         if not response['items']:
             raise HTTPException(status_code=404, detail="Video not found")
         
-        stats = response['items'][0]['statistics']
-        
-        return {
-            "video_id": video_id,
-            "views": int(stats.get('viewCount', 0)),
-            "likes": int(stats.get('likeCount', 0)),
-            "comments": int(stats.get('commentCount', 0)),
-            "updated_at": datetime.utcnow()
-        }
+        return _cache_video_stats(video_id, response['items'][0]['statistics'])
         
     except Exception as e:
+        _invalidate_on_auth_error(e)
         logger.error(f"Failed to get stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -223,44 +442,64 @@ async def sync_all_views():
         
         db = get_db()
         try:
-            # Get all jobs with YouTube videos
-            jobs = db.query(MarketplaceJob).filter(
+            # Get all jobs with YouTube videos (just the two columns the sync needs)
+            jobs = db.query(MarketplaceJob.youtube_video_id, MarketplaceJob.clip_id).filter(
                 MarketplaceJob.youtube_video_id.isnot(None)
             ).all()
             
             youtube = get_youtube_service()
-            updated_count = 0
             
+            # Several jobs can point at the same video
+            clip_ids_by_video = {}
             for job in jobs:
+                if job.clip_id:
+                    clip_ids_by_video.setdefault(job.youtube_video_id, []).append(job.clip_id)
+            video_ids = list(clip_ids_by_video)
+            
+            # One IN query for every clip instead of a SELECT per job
+            all_clip_ids = {clip_id for ids in clip_ids_by_video.values() for clip_id in ids}
+            existing_clip_ids = {
+                row.id for row in db.query(Clip.id).filter(Clip.id.in_(all_clip_ids)).all()
+            } if all_clip_ids else set()
+            
+            updates = {}
+            now = datetime.utcnow()
+            
+            # videos.list takes up to 50 comma-separated IDs per call (1 quota unit per call)
+            for offset in range(0, len(video_ids), YOUTUBE_LIST_MAX_IDS):
+                batch = video_ids[offset:offset + YOUTUBE_LIST_MAX_IDS]
                 try:
-                    # Get video stats
-                    request = youtube.videos().list(
+                    response = await asyncio.to_thread(_execute, youtube.videos().list(
                         part='statistics',
-                        id=job.youtube_video_id
-                    )
-                    response = request.execute()
-                    
-                    if response['items']:
-                        stats = response['items'][0]['statistics']
-                        views = int(stats.get('viewCount', 0))
-                        
-                        # Update clip views
-                        if job.clip_id:
-                            clip = db.query(Clip).filter(Clip.id == job.clip_id).first()
-                            if clip:
-                                clip.views = views
-                                clip.last_updated = datetime.utcnow()
-                                
-                                # Calculate revenue (example: $0.01 per view)
-                                clip.revenue = views * 0.01
-                                
-                                updated_count += 1
-                        
-                        db.commit()
-                        
+                        id=','.join(batch),
+                        maxResults=YOUTUBE_LIST_MAX_IDS
+                    ))
                 except Exception as e:
-                    logger.error(f"Failed to sync job {job.id}: {e}")
+                    _invalidate_on_auth_error(e)
+                    logger.error(f"Failed to sync videos {batch[0]}..{batch[-1]}: {e}")
                     continue
+                
+                for item in response.get('items', []):
+                    views = _cache_video_stats(item['id'], item['statistics'])["views"]
+                    for clip_id in clip_ids_by_video.get(item['id'], []):
+                        if clip_id in existing_clip_ids:
+                            updates[clip_id] = {
+                                "id": clip_id,
+                                "views": views,
+                                "last_updated": now,
+                                # Calculate revenue (example: $0.01 per view)
+                                "revenue": views * 0.01,
+                            }
+            
+            # Write every clip in one transaction
+            if updates:
+                try:
+                    db.bulk_update_mappings(Clip, list(updates.values()))
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+            updated_count = len(updates)
             
             return {
                 "success": True,
@@ -272,6 +511,7 @@ async def sync_all_views():
             db.close()
             
     except Exception as e:
+        _invalidate_on_auth_error(e)
         logger.error(f"View sync failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -284,5 +524,5 @@ async def setup_youtube_auth():
     
     return {
         "message": "Run this command to authenticate:",
-        "command": "python -m backend.youtube_setup"
+        "command": "python backend/youtube_setup.py"
     }
@@ -1,25 +1,26 @@
 """
 YouTube OAuth setup script
 Run this once to authenticate: python backend/youtube_setup.py
+(or python -m backend.youtube_setup from the repo root)
 """
 
 import os
-import pickle
+import sys
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
-SCOPES = ['https://www.googleapis.com/auth/youtube.upload', 
-          'https://www.googleapis.com/auth/youtube.readonly']
+# Backend modules import each other as top-level modules: make that work however
+# this script is started
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from youtube_integration import SCOPES, TOKEN_PATH, load_youtube_credentials, save_youtube_credentials
 
 def setup_youtube_auth():
     """Run OAuth flow to get YouTube credentials"""
-    creds = None
-    token_path = 'youtube_token.pickle'
-    
     # Check if we already have credentials
-    if os.path.exists(token_path):
-        with open(token_path, 'rb') as token:
-            creds = pickle.load(token)
+    creds = load_youtube_credentials()
     
     # If no valid credentials, run OAuth flow
     if not creds or not creds.valid:
@@ -49,15 +50,16 @@ def setup_youtube_auth():
             creds = flow.run_local_server(port=8080)
         
         # Save credentials
-        with open(token_path, 'wb') as token:
-            pickle.dump(creds, token)
+        save_youtube_credentials(creds)
         
         print("\n✅ YouTube authentication successful!")
-        print(f"Credentials saved to: {token_path}")
+        print(f"Credentials saved to: {TOKEN_PATH}")
         return True
     else:
         print("✅ YouTube already authenticated!")
         return True
 
 if __name__ == "__main__":
+    # The API server runs from backend/: keep client_secrets.json and the token there
+    os.chdir(BACKEND_DIR)
     setup_youtube_auth()
@@ -1,16 +1,27 @@
 import os
+import shutil
+import subprocess
 import requests
 import tempfile
-from typing import Tuple
 import json
+import logging
+import time
+from importlib.util import find_spec
+from concurrent.futures import ThreadPoolExecutor
 
 import streamlit as st
-import whisper
-import openai
-from pytube import YouTube
-from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
-from moviepy.video.fx.crop import crop
-from moviepy.video.tools.subtitles import SubtitlesClip
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Heavy modules (whisper/torch, faster-whisper, openai, yt-dlp/pytube) are imported inside
+# the functions that use them, so the first render doesn't wait on them.
+# faster-whisper (CTranslate2, int8) is several times faster than the reference
+# PyTorch implementation on CPU; openai-whisper is the fallback
+FASTER_WHISPER_AVAILABLE = find_spec("faster_whisper") is not None
+# yt-dlp is faster and more robust than pytube for YouTube downloads
+YTDLP_AVAILABLE = find_spec("yt_dlp") is not None
 
 
 # ─── App Config ───
@@ -30,18 +41,52 @@ OPENAI_API_KEY = st.secrets.get("OPENAI_API_KEY", "")
 
 
 # ─── Daily-cached fetchers (TTL = 24 h) ───
-@st.cache_data(ttl=24 * 60 * 60)
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    # Shared across reruns so connections to the media APIs and download hosts are reused.
+    # Transient 429/5xx responses are retried with exponential backoff (plus
+    # jitter), honouring Retry-After when the API sends one
+    session = requests.Session()
+    retry = Retry(
+        total=5,
+        backoff_factor=1,
+        backoff_jitter=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_json(name: str, url: str):
+    # One failing media API must not break the page: log it (without the URL,
+    # which carries the API key) and let the caller show nothing for it
+    try:
+        r = get_http_session().get(url, timeout=15)
+        r.raise_for_status()
+        return r.json()
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("%s request failed: %s", name, type(e).__name__)
+        return None
+
+
 def fetch_trending_gifs(limit: int = 12):
     if not GIPHY_API_KEY:
         return []
     url = f"https://api.giphy.com/v1/gifs/trending?api_key={GIPHY_API_KEY}&limit={limit}"
+    data = fetch_json("GIPHY", url)
+    if data is None:
+        return []
     return [
         item["images"]["downsized_medium"]["url"]
-        for item in requests.get(url).json().get("data", [])
+        for item in data.get("data", [])
     ]
 
 
-@st.cache_data(ttl=24 * 60 * 60)
 def fetch_free_sounds(limit: int = 8):
     if not FREESOUND_API_KEY:
         return []
@@ -50,12 +95,14 @@ def fetch_free_sounds(limit: int = 8):
         f"?query=&sort=downloads_desc&fields=name,previews"
         f"&page_size={limit}&token={FREESOUND_API_KEY}"
     )
-    results = requests.get(url).json().get("results", [])
+    data = fetch_json("Freesound", url)
+    if data is None:
+        return []
+    results = data.get("results", [])
     return [{"name": r["name"], "preview": r["previews"]["preview-lq-mp3"]}
             for r in results]
 
 
-@st.cache_data(ttl=24 * 60 * 60)
 def fetch_logo_templates(limit: int = 8):
     if not PIXABAY_API_KEY:
         return []
@@ -63,15 +110,47 @@ def fetch_logo_templates(limit: int = 8):
         "https://pixabay.com/api/"
         f"?key={PIXABAY_API_KEY}&q=logo+template&image_type=vector&per_page={limit}"
     )
-    hits = requests.get(url).json().get("hits", [])
+    data = fetch_json("Pixabay", url)
+    if data is None:
+        return []
+    hits = data.get("hits", [])
     return [h["previewURL"] for h in hits]
 
 
+@st.cache_data(ttl=24 * 60 * 60)
+def fetch_all_media():
+    # The three APIs are independent: fetch them concurrently so a cold cache
+    # costs the slowest request rather than the sum of all three
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        gifs = pool.submit(fetch_trending_gifs)
+        sounds = pool.submit(fetch_free_sounds)
+        logos = pool.submit(fetch_logo_templates)
+        return {"gifs": gifs.result(), "sounds": sounds.result(), "logos": logos.result()}
+
+
 # ─── Clip-Gen Model Loading ───
 @st.cache_resource
-def load_models() -> Tuple[object, object]:
-    whisper_model = whisper.load_model("tiny")
-    return whisper_model
+def load_models() -> object:
+    if FASTER_WHISPER_AVAILABLE:
+        from faster_whisper import WhisperModel
+
+        return WhisperModel("tiny", device="auto", compute_type="int8")
+    import whisper
+
+    return whisper.load_model("tiny")
+
+
+def transcribe(model, video_path: str) -> dict:
+    """Transcribe with either backend into openai-whisper's {"text", "segments"} shape"""
+    if not FASTER_WHISPER_AVAILABLE:
+        return model.transcribe(video_path)
+    # vad_filter skips silent stretches instead of decoding them
+    segments_iter, _info = model.transcribe(video_path, beam_size=1, vad_filter=True)
+    segments = [
+        {"start": seg.start, "end": seg.end, "text": seg.text}
+        for seg in segments_iter
+    ]
+    return {"text": "".join(seg["text"] for seg in segments).strip(), "segments": segments}
 
 # ─── GPT-5 mini segment selection ───
 def get_viral_segments(transcription: str, num_clips: int) -> list:
@@ -79,6 +158,8 @@ def get_viral_segments(transcription: str, num_clips: int) -> list:
         st.error("Please add your OpenAI API key to the Streamlit secrets.")
         st.stop()
 
+    import openai
+
     client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
     prompt = f'''
@@ -109,32 +190,124 @@ Transcription:
 
 # ─── Helpers: download sources ───
 def download_youtube(url: str) -> str:
-    yt = YouTube(url)
-    stream = (
-        yt.streams.filter(file_extension="mp4", progressive=True)
-        .order_by("resolution")
-        .desc()
-        .first()
-    )
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    # pytube's download writes to filename in output_path
-    stream.download(
-        output_path=os.path.dirname(
-            tmp.name), filename=os.path.basename(
-            tmp.name))
+    temp_dir = tempfile.mkdtemp(prefix="clipgen_yt_")
+    if not YTDLP_AVAILABLE:
+        # Fallback: pytube, single connection
+        from pytube import YouTube
+
+        yt = YouTube(url)
+        stream = (
+            yt.streams.filter(file_extension="mp4", progressive=True)
+            .order_by("resolution")
+            .desc()
+            .first()
+        )
+        return stream.download(output_path=temp_dir, filename="video.mp4")
+
+    import yt_dlp
+
+    ydl_opts = {
+        "format": "best[ext=mp4][protocol^=https]/best[ext=mp4]/best",
+        "outtmpl": os.path.join(temp_dir, "video.%(ext)s"),
+        "noplaylist": True,
+        "quiet": True,
+        # Fetch fragmented formats over parallel connections
+        "concurrent_fragment_downloads": 4,
+        # Space out metadata requests so YouTube doesn't throttle us
+        "sleep_interval_requests": 1,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        return ydl.prepare_filename(info)
+
+
+def download_url(url: str, progress: dict = None) -> str:
+    suffix = os.path.splitext(url)[1] or ".mp4"
+    with get_http_session().get(url, stream=True, timeout=(5, 30)) as r:
+        r.raise_for_status()
+        if progress is not None:
+            progress["total"] = int(r.headers.get("Content-Length") or 0)
+        # Read straight from the raw socket stream (gzip/deflate still decoded)
+        r.raw.decode_content = True
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=suffix) as tmp:
+            for chunk in iter(lambda: r.raw.read(1024 * 1024), b""):
+                tmp.write(chunk)
+                if progress is not None:
+                    progress["done"] += len(chunk)
     return tmp.name
 
 
-def download_url(url: str) -> str:
-    suffix = os.path.splitext(url)[1] or ".mp4"
-    tmp = tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=suffix)
-    r = requests.get(url, stream=True)
-    r.raise_for_status()
-    for chunk in r.iter_content(chunk_size=8192):
-        if chunk:
-            tmp.write(chunk)
-    tmp.close()
-    return tmp.name
+# ─── Helpers: background downloads ───
+@st.cache_resource
+def get_download_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=2)
+
+
+def start_download(kind: str, link: str):
+    """
+    Start (or reuse) a background download for this session. Downloads are kept
+    per link in session_state, so reruns don't fetch the same video again.
+    """
+    downloads = st.session_state.setdefault("downloads", {})
+    key = (kind, link)
+    if key not in downloads:
+        progress = {"done": 0, "total": 0}
+        if kind == "youtube":
+            future = get_download_pool().submit(download_youtube, link)
+        else:
+            future = get_download_pool().submit(download_url, link, progress)
+        downloads[key] = (future, progress)
+    return key
+
+
+def wait_for_download(key, label: str) -> str:
+    future, progress = st.session_state["downloads"][key]
+    if not future.done():
+        bar = st.progress(0.0, text=label)
+        while not future.done():
+            if progress["total"]:
+                bar.progress(min(progress["done"] / progress["total"], 1.0), text=label)
+            time.sleep(0.25)
+        bar.empty()
+    try:
+        return future.result()
+    except Exception:
+        # Let a rerun retry the download
+        del st.session_state["downloads"][key]
+        raise
+
+
+# ─── Helpers: clip export ───
+def _srt_time(seconds: float) -> str:
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+def export_formats(video_path: str, start: float, duration: float, caption: str, outputs: list):
+    """
+    Cut one segment into every (path, width, height) in `outputs` with a single
+    ffmpeg run: the source is decoded and captioned once, then split, scaled to
+    cover and center-cropped per output.
+    """
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".srt", delete=False) as srt:
+        srt.write(f"1\n{_srt_time(0)} --> {_srt_time(duration)}\n{caption}\n")
+    srt_path = srt.name.replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+
+    graph = [f"[0:v]subtitles='{srt_path}':force_style='Fontname=Arial,Fontsize=24',"
+             f"split={len(outputs)}" + "".join(f"[v{i}]" for i in range(len(outputs)))]
+    for i, (_, w, h) in enumerate(outputs):
+        wider = f"gt(a,{w}/{h})"
+        graph.append(f"[v{i}]scale='if({wider},-2,{w})':'if({wider},{h},-2)',crop={w}:{h}[o{i}]")
+
+    cmd = ["ffmpeg", "-y", "-hwaccel", "auto", "-ss", str(start), "-t", str(duration),
+           "-i", video_path, "-filter_complex", ";".join(graph)]
+    for i, (path, _, _) in enumerate(outputs):
+        cmd += ["-map", f"[o{i}]", "-map", "0:a?", "-c:v", "libx264", "-preset", "veryfast",
+                "-c:a", "aac", "-movflags", "+faststart", path]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+    finally:
+        os.remove(srt.name)
 
 
 # ─── Clip-Gen UI ───
@@ -150,6 +323,7 @@ RESOLUTION_MAP = {
 
 mode = st.radio("Video input", ("Upload file", "YouTube URL", "Direct URL"))
 video_path = None
+download = None
 if mode == "Upload file":
     vid = st.file_uploader(
         "Choose a video",
@@ -167,13 +341,10 @@ if mode == "Upload file":
             "3gp",
             "ts"])
     if vid:
-        tmp = tempfile.NamedTemporaryFile(
-            mode="wb",
-            delete=False,
-            suffix=os.path.splitext(
-                vid.name)[1])
-        tmp.write(vid.read())
-        tmp.close()
+        # Copy in 1 MiB chunks rather than materialising the whole upload as one bytes object
+        with tempfile.NamedTemporaryFile(
+                mode="wb", delete=False, suffix=os.path.splitext(vid.name)[1]) as tmp:
+            shutil.copyfileobj(vid, tmp, length=1024 * 1024)
         video_path = tmp.name
     else:
         st.stop()
@@ -181,27 +352,30 @@ if mode == "Upload file":
 elif mode == "YouTube URL":
     link = st.text_input("YouTube URL")
     if link:
-        with st.spinner("Downloading from YouTube…"):
-            video_path = download_youtube(link)
+        download = start_download("youtube", link)
+        download_label = "Downloading from YouTube…"
     else:
         st.stop()
 
 else:
     link = st.text_input("Direct video URL")
     if link:
-        with st.spinner("Downloading from URL…"):
-            video_path = download_url(link)
+        download = start_download("url", link)
+        download_label = "Downloading from URL…"
     else:
         st.stop()
 
 
-# Load Whisper & sentiment models
+# Load Whisper model while a URL download continues in the background
+# (segments are scored by the OpenAI call, not a local sentiment model)
 whisper_model = load_models()
+if download:
+    video_path = wait_for_download(download, download_label)
 
 
 if st.button("Process & Show Top Segments"):
     with st.spinner("Transcribing…"):
-        result = whisper_model.transcribe(video_path)
+        result = transcribe(whisper_model, video_path)
 
     # Score & pick top segments
     segments = get_viral_segments(result["text"], NUM_CLIPS)
@@ -225,46 +399,24 @@ if st.button("Process & Show Top Segments"):
 
     # Generate & export
     if st.button("Generate & Export Clips"):
-        vfile = VideoFileClip(video_path)
         for choice in selected:
             idx = int(choice.split(":")[0]) - 1
             seg = segments[idx]
-            start = seg["start"]
-            end = min(start + clip_len, vfile.duration)
-
-            clip = vfile.subclip(start, end)
-            subtitle = SubtitlesClip(
-                [((0, end - start), seg["text"])],
-                lambda t: TextClip(
-                    seg["text"], fontsize=24, font="Arial", method="caption", size=(int(clip.w * 0.8), None)
-                ),
-            )
-            final = CompositeVideoClip(
-                [clip, subtitle.set_pos(("center", "bottom"))])
 
+            outputs = []
             for res in res_opts:
                 w, h = RESOLUTION_MAP[res]
-                for tag, (ow, oh) in {
-                    "landscape": (
-                        w, h), "portrait": (
-                        h, w), "square": (
-                        h, h)}.items():
-                    out_clip = final.resize(width=ow)
-                    out_clip = crop(
-                        out_clip,
-                        width=ow,
-                        height=oh,
-                        x_center=out_clip.w / 2,
-                        y_center=out_clip.h / 2)
+                for tag, (ow, oh) in {"landscape": (w, h), "portrait": (h, w), "square": (h, h)}.items():
                     out_path = tempfile.NamedTemporaryFile(
                         delete=False, suffix=f"_{res}_{tag}.mp4").name
-                    out_clip.write_videofile(
-                        out_path,
-                        codec="libx264",
-                        audio_codec="aac",
-                        verbose=False,
-                        logger=None)
-                    st.video(out_path)
+                    outputs.append((out_path, ow, oh))
+            if not outputs:
+                continue
+
+            # -t past the end of the source just stops at EOF
+            export_formats(video_path, seg["start"], clip_len, seg["text"], outputs)
+            for out_path, _, _ in outputs:
+                st.video(out_path)
 
         st.success("Clips generated and formatted!")
 
@@ -272,23 +424,17 @@ if st.button("Process & Show Top Segments"):
 # ─── Daily Media Assets UI ───
 st.markdown("---")
 st.subheader("🎯 Trending Media (refreshes every 24 h)")
+media = fetch_all_media()
 
 with st.expander("📺 Trending GIFs"):
-    gifs = fetch_trending_gifs()
+    gifs = media["gifs"]
     if gifs:
-        st.image(
-            gifs,
-            width=150,
-            caption=[
-                f"GIF #{
-                    i +
-                    1}" for i in range(
-                    len(gifs))])
+        st.image(gifs, width=150, caption=[f"GIF #{i + 1}" for i in range(len(gifs))])
     else:
         st.info("Add GIPHY_API_KEY to Secrets to see GIFs.")
 
 with st.expander("🔊 Copyright-Free Sounds"):
-    sounds = fetch_free_sounds()
+    sounds = media["sounds"]
     if sounds:
         for s in sounds:
             st.write(f"• {s['name']}")
@@ -297,15 +443,8 @@ with st.expander("🔊 Copyright-Free Sounds"):
         st.info("Add FREESOUND_API_KEY to Secrets to see sounds.")
 
 with st.expander("🎨 Free Logo Templates"):
-    logos = fetch_logo_templates()
+    logos = media["logos"]
     if logos:
-        st.image(
-            logos,
-            width=150,
-            caption=[
-                f"Logo #{
-                    i +
-                    1}" for i in range(
-                    len(logos))])
+        st.image(logos, width=150, caption=[f"Logo #{i + 1}" for i in range(len(logos))])
     else:
         st.info("Add PIXABAY_API_KEY to Secrets to see logo templates.")
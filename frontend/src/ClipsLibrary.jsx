@@ -3,9 +3,14 @@ import { Download, Edit2, Search, Filter, TrendingUp, Eye, DollarSign } from 'lu
 import './ClipsLibrary.css';
 import { API_URL } from './config';
 
+// /clips is paginated; pages are appended with "Load more"
+const PAGE_SIZE = 50;
+
 function ClipsLibrary({ token }) {
   const [clips, setClips] = useState([]);
+  const [totalClips, setTotalClips] = useState(0);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [filterPlatform, setFilterPlatform] = useState('');
@@ -23,14 +28,19 @@ function ClipsLibrary({ token }) {
     fetchClips();
   }, [token, filterPlatform, filterCategory, sortBy]);
 
-  const fetchClips = async () => {
+  const fetchClips = async (offset = 0) => {
     try {
-      setLoading(true);
+      if (offset === 0) setLoading(true);
+      else setLoadingMore(true);
       const params = new URLSearchParams();
       if (filterPlatform) params.append('platform', filterPlatform);
       if (filterCategory) params.append('category', filterCategory);
       params.append('sort_by', sortBy);
       params.append('order', 'desc');
+      params.append('limit', PAGE_SIZE);
+      params.append('offset', offset);
+      // Only the first page pays for the COUNT
+      if (offset === 0) params.append('include_total', 'true');
 
       const response = await fetch(`${API_URL}/clips?${params}`, {
         headers: {
@@ -43,12 +53,18 @@ function ClipsLibrary({ token }) {
       }
 
       const data = await response.json();
-      setClips(data.clips);
+      if (offset === 0) {
+        setClips(data.clips);
+        setTotalClips(data.total ?? data.clips.length);
+      } else {
+        setClips(prev => [...prev, ...data.clips]);
+      }
       setError(null);
     } catch (err) {
       setError(err.message);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -141,7 +157,7 @@ function ClipsLibrary({ token }) {
       <div className="library-header">
         <div>
           <h1>Clips Library</h1>
-          <p className="library-subtitle">{clips.length} total clips</p>
+          <p className="library-subtitle">{totalClips} total clips</p>
         </div>
       </div>
 
@@ -275,6 +291,18 @@ function ClipsLibrary({ token }) {
         </div>
       )}
 
+      {clips.length < totalClips && (
+        <div className="clips-load-more">
+          <button
+            className="btn-secondary"
+            onClick={() => fetchClips(clips.length)}
+            disabled={loadingMore}
+          >
+            {loadingMore ? 'Loading...' : `Load more (${totalClips - clips.length} remaining)`}
+          </button>
+        </div>
+      )}
+
       {/* Edit Analytics Modal */}
       {editingClip && (
         <div className="modal-overlay" onClick={() => setEditingClip(null)}>